@@ -3,23 +3,32 @@
 
 import datetime
 import time
+# Точка отсчета для замера времени запуска (PP_STARTUP_BENCH)
+STARTUP_TIME = time.perf_counter()
 import os
 import re
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, simpledialog
 import subprocess
 import threading
+import queue
 import socket
-from urllib.parse import urlencode, quote_plus
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from urllib.parse import urlencode, quote_plus, urlsplit, urlunsplit, parse_qsl
 import platform
 import json
+import csv
+import zlib
 import sys
+import difflib
+import hashlib
+import tempfile
+import atexit
+import argparse
+import contextlib
+import logging
+from logging.handlers import RotatingFileHandler
+
+# selenium и lxml импортируются внутри функций, которые их используют:
+# окно появляется без ожидания их загрузки, а загружаются они при первой обработке.
+# Интерфейс вместе с tkinter - в pp_gui.py, он импортируется только для запуска с окном.
 
 def get_data_path(filename):
     """Получить правильный путь к файлам данных в собранном приложении"""
@@ -32,13 +41,81 @@ def get_data_path(filename):
     
     return os.path.join(base_path, filename)
 
-BASE_URL_SPEED = "https://servicedesk.service-online.live/traders-speed"
-BASE_URL_ADS = "https://servicedesk.service-online.live/trader/ads"
-BASE_URL_CONVERSION = "https://servicedesk.service-online.live/trader-conversions"
-BASE_URL_DEALS = "https://servicedesk.service-online.live/trader/deals"
-BASE_URL_BANK_STATEMENTS = "https://servicedesk.service-online.live/trader/bank-statements"
+# Адрес servicedesk можно подменить переменной окружения PP_SERVICEDESK_URL
+# (например, на локальный стенд benchmarks/fake_servicedesk.py)
+DEFAULT_SERVICEDESK_URL = "https://servicedesk.service-online.live"
+
+def set_servicedesk_url(url: str):
+    """Переключить все BASE_URL_* на другой адрес servicedesk"""
+    global SERVICEDESK_URL, BASE_URL_SPEED, BASE_URL_ADS, BASE_URL_CONVERSION, BASE_URL_DEALS, BASE_URL_BANK_STATEMENTS
+    
+    SERVICEDESK_URL = url.rstrip('/')
+    BASE_URL_SPEED = f"{SERVICEDESK_URL}/traders-speed"
+    BASE_URL_ADS = f"{SERVICEDESK_URL}/trader/ads"
+    BASE_URL_CONVERSION = f"{SERVICEDESK_URL}/trader-conversions"
+    BASE_URL_DEALS = f"{SERVICEDESK_URL}/trader/deals"
+    BASE_URL_BANK_STATEMENTS = f"{SERVICEDESK_URL}/trader/bank-statements"
+
+set_servicedesk_url(os.environ.get("PP_SERVICEDESK_URL") or DEFAULT_SERVICEDESK_URL)
+
 LINES_PER_PAGE = 20
+# Размер страницы для постраничной загрузки - чем больше, тем меньше переходов
+MAX_LINES_PER_PAGE = 100
+# Предохранитель от бесконечного перелистывания
+MAX_TABLE_PAGES = 50
+# Выписки старше самой свежей более чем на столько дней не дочитываем.
+# None - читаются все страницы: иначе трейдеры с давней выпиской выпадают из пункта 8
+BANK_STATEMENTS_LOOKBACK_DAYS = None
 DEBUGGING_PORT = 9222
+# Как часто интерфейс забирает накопленные сообщения лога и прогресса
+UI_DRAIN_INTERVAL_MS = 100
+UI_DRAIN_MAX_EVENTS = 500
+# Начиная с этого количества отфильтрованных СП в дереве создаются только видимые строки
+TREE_VIRTUAL_THRESHOLD = 2000
+# В окне лога хранятся только последние строки, полная история сеанса - в logs/session_*.txt
+LOG_VIEW_MAX_LINES = 2000
+# Сколько последних файлов logs/session_*.txt хранить, более старые удаляются при запуске
+SESSION_LOG_KEEP = 30
+# Изменения групп и списка СП, сделанные подряд, сохраняются одной записью
+FILE_WRITE_DELAY = 0.5
+# Как часто проверяются service_providers.txt и employee_groups.json на изменения извне
+FILE_WATCH_INTERVAL_MS = 2000
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+# Отдельный порт для headless Chrome консольного режима, чтобы не мешать браузеру GUI
+CLI_DEBUGGING_PORT = 9223
+BATCH_CHUNK_SIZE = 20
+# Сколько секунд страница servicedesk считается свежей в кэше страниц, по типу страницы.
+# Скорость, конверсия и арбитражи кэшируются только для периодов с заданным концом
+PAGE_CACHE_TTLS = {
+    'speed': 5 * 60,
+    'conversion': 5 * 60,
+    'ads': 10 * 60,
+    'arbitrage': 10 * 60,
+    'bank': 30 * 60,
+}
+# Предел размера кэша страниц (сжатых), сверх него удаляются давно не читавшиеся страницы
+PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Папка отчетов привязывается к рабочей папке на момент запуска и дальше не зависит от cwd
+REPORTS_ROOT = os.path.abspath("REPORTS")
+# Форматы сводного файла запуска с данными всех СП (results.jsonl / results.csv)
+RESULTS_FORMATS = ('jsonl', 'csv')
+# История показателей всех запусков для сравнения периодов
+HISTORY_DB_PATH = os.path.join(REPORTS_ROOT, "history.db")
+MAX_TAB_COUNT = 8
+# После стольких неудачных попыток СП больше не повторяется при продолжении запуска
+RESUME_MAX_ATTEMPTS = 3
+# Облегченная загрузка: что не нужно для чтения таблицы, браузер не скачивает
+# (Network.setBlockedURLs). Скрипты самого servicedesk не блокируются
+LEAN_FETCH_BLOCKED_URLS = [
+    "*.css", "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*mc.yandex.ru*", "*doubleclick.net*",
+]
+# driver.get ждет только DOMContentLoaded: готовность таблицы проверяет wait_for_table_page.
+# "none" не подходит - скрипт ожидания мог бы успеть прочитать таблицу предыдущей страницы
+PAGE_LOAD_STRATEGY = "eager"
 
 def load_service_providers():
     try:
@@ -50,21 +127,136 @@ def load_service_providers():
                 f.write("# Service Providers list\n")
             return {}
         
-        providers = {}
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line and '|' in line and not line.startswith('#'):
-                    sp_id, sp_name = line.split('|', 1)
-                    providers[int(sp_id.strip())] = sp_name.strip()
-        
-        return providers
+        return read_service_providers(file_path)
         
     except Exception as e:
         print(f"Не удалось загрузить список СП: {str(e)}")
         return {}
 
-SERVICE_PROVIDERS = load_service_providers()
+def read_service_providers(file_path: str) -> dict:
+    """Разобрать service_providers.txt. Ошибки не глотаются - наблюдатель за файлами не должен принять битый файл за пустой список"""
+    providers = {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and '|' in line and not line.startswith('#'):
+                sp_id, sp_name = line.split('|', 1)
+                providers[int(sp_id.strip())] = sp_name.strip()
+    
+    return providers
+
+# Заполняется в load_data_files(), чтобы чтение файлов не задерживало появление окна
+SERVICE_PROVIDERS = {}
+
+# Минимальное сходство слова запроса со словом названия при нечетком поиске (difflib ratio)
+FUZZY_MIN_RATIO = 0.75
+
+def make_trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def split_name_tokens(text: str) -> list:
+    """Слова названия для нечеткого поиска: name|CUR|PayPort -> [name, cur, payport].
+    
+    Числа пропускаются - их находит поиск подстроки.
+    """
+    return [token for token in re.split(r'[\W_]+', text) if token and not token.isdigit()]
+
+class SPSearchIndex:
+    """Поисковый индекс по SERVICE_PROVIDERS для фильтра по названию, с поиском по триграммам и опечаткам"""
+    
+    def __init__(self, providers: dict = None):
+        self.rebuild(providers or {})
+    
+    def rebuild(self, providers: dict):
+        self.texts = {}
+        self.id_texts = {}
+        self.trigrams = {}
+        # {длина: {слово: множество ID}}
+        self.tokens = {}
+        for sp_id, sp_name in providers.items():
+            self.add(sp_id, sp_name)
+    
+    def add(self, sp_id: int, sp_name: str):
+        if sp_id in self.texts:
+            self.remove(sp_id)
+        
+        text = sp_name.lower()
+        self.texts[sp_id] = text
+        self.id_texts[sp_id] = str(sp_id)
+        for trigram in make_trigrams(text):
+            self.trigrams.setdefault(trigram, set()).add(sp_id)
+        for token in split_name_tokens(text):
+            self.tokens.setdefault(len(token), {}).setdefault(token, set()).add(sp_id)
+    
+    def remove(self, sp_id: int):
+        text = self.texts.pop(sp_id, None)
+        self.id_texts.pop(sp_id, None)
+        if text is None:
+            return
+        
+        for trigram in make_trigrams(text):
+            postings = self.trigrams.get(trigram)
+            if postings is not None:
+                postings.discard(sp_id)
+                if not postings:
+                    del self.trigrams[trigram]
+        
+        for token in split_name_tokens(text):
+            same_length = self.tokens.get(len(token), {})
+            postings = same_length.get(token)
+            if postings is not None:
+                postings.discard(sp_id)
+                if not postings:
+                    del same_length[token]
+    
+    def search(self, query: str):
+        """Возвращает (множество ID, был ли нечеткий поиск). Для пустого запроса - (None, False)."""
+        words = query.lower().split()
+        if not words:
+            return None, False
+        
+        matches = None
+        fuzzy = False
+        for word in words:
+            word_matches = self.find_substring(word)
+            if not word_matches:
+                word_matches = self.find_fuzzy(word)
+                fuzzy = fuzzy or bool(word_matches)
+            matches = word_matches if matches is None else matches & word_matches
+            if not matches:
+                break
+        
+        return matches, fuzzy
+    
+    def find_substring(self, word: str) -> set:
+        if len(word) < 3:
+            candidates = self.texts.keys()
+        else:
+            # Кандидаты - СП, у которых есть все триграммы слова, начиная с самой редкой
+            postings = sorted((self.trigrams.get(trigram, set()) for trigram in make_trigrams(word)), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+        
+        found = {sp_id for sp_id in candidates if word in self.texts[sp_id]}
+        if word.isdigit():
+            found.update(sp_id for sp_id, id_text in self.id_texts.items() if id_text.startswith(word))
+        return found
+    
+    def find_fuzzy(self, word: str) -> set:
+        if len(word) < 3 or word.isdigit():
+            return set()
+        
+        matcher = difflib.SequenceMatcher(None, b=word)
+        found = set()
+        # Слова, отличающиеся по длине больше чем на 2 символа, похожими не считаются
+        for length in range(len(word) - 2, len(word) + 3):
+            for token, sp_ids in self.tokens.get(length, {}).items():
+                matcher.set_seq1(token)
+                if matcher.real_quick_ratio() >= FUZZY_MIN_RATIO and matcher.quick_ratio() >= FUZZY_MIN_RATIO \
+                        and matcher.ratio() >= FUZZY_MIN_RATIO:
+                    found.update(sp_ids)
+        return found
+
+SP_SEARCH_INDEX = SPSearchIndex()
 
 def load_employee_groups():
     try:
@@ -82,25 +274,420 @@ def load_employee_groups():
                 json.dump(default_groups, f, ensure_ascii=False, indent=2)
             return default_groups
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return read_employee_groups(file_path)
             
     except Exception as e:
         print(f"Не удалось загрузить группы сотрудников: {str(e)}")
         return {}
 
+def read_employee_groups(file_path: str) -> dict:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        groups = json.load(f)
+    if not isinstance(groups, dict):
+        raise ValueError("ожидался объект {группа: [ID СП]}")
+    return groups
+
+def write_file_atomic(path: str, text: str):
+    """Записать файл целиком через временный файл и os.replace - файл никогда не остается записанным наполовину"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class DebouncedFileWriter:
+    """Отложенная запись файлов в фоновом потоке: из частых снимков одного файла пишется последний"""
+    
+    def __init__(self, delay: float = FILE_WRITE_DELAY):
+        self.delay = delay
+        self.condition = threading.Condition()
+        # Запись и flush не должны пересекаться: flush возвращается, когда на диске последние данные
+        self.write_lock = threading.Lock()
+        self.pending = {}
+        # Хеш последнего записанного текста по пути - чтобы наблюдатель не принимал свои записи за чужие
+        self.written_digests = {}
+        self.thread = None
+        self.error_func = print
+    
+    def schedule(self, path: str, snapshot, render):
+        """render(snapshot, path) -> текст файла, вызывается в потоке записи"""
+        with self.condition:
+            self.pending[path] = (time.monotonic() + self.delay, snapshot, render)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="file-writer", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+    
+    def run(self):
+        while True:
+            with self.condition:
+                while True:
+                    if not self.pending:
+                        self.condition.wait()
+                        continue
+                    wait = min(deadline for deadline, _, _ in self.pending.values()) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+            self.write_due()
+    
+    def write_due(self, everything: bool = False):
+        with self.write_lock:
+            with self.condition:
+                now = time.monotonic()
+                jobs = [
+                    (path, snapshot, render) for path, (deadline, snapshot, render) in self.pending.items()
+                    if everything or deadline <= now
+                ]
+                for path, _, _ in jobs:
+                    del self.pending[path]
+            
+            for path, snapshot, render in jobs:
+                try:
+                    text = render(snapshot, path)
+                    write_file_atomic(path, text)
+                    with self.condition:
+                        self.written_digests[path] = text_digest(text)
+                except Exception as e:
+                    self.error_func(f"❌ Не удалось сохранить {os.path.basename(path)}: {str(e)}")
+    
+    def flush(self):
+        """Записать все отложенные изменения сейчас (перед чтением файла и при выходе)"""
+        self.write_due(everything=True)
+    
+    def is_pending(self, path: str) -> bool:
+        with self.condition:
+            return path in self.pending
+    
+    def written_digest(self, path: str):
+        with self.condition:
+            return self.written_digests.get(path)
+
+FILE_WRITER = DebouncedFileWriter()
+atexit.register(FILE_WRITER.flush)
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def render_employee_groups(groups: dict, path: str) -> str:
+    return json.dumps(groups, ensure_ascii=False, indent=2)
+
+def render_service_providers(providers: dict, path: str) -> str:
+    """Текст service_providers.txt для providers.
+    
+    Комментарии и порядок строк существующего файла сохраняются, каждый ID
+    записывается один раз (с текущим названием), удаленные ID выбрасываются,
+    новые дописываются в конец.
+    """
+    lines = []
+    written = set()
+    
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('#') or '|' not in line:
+                    lines.append(line)
+                    continue
+                
+                try:
+                    sp_id = int(line.split('|', 1)[0].strip())
+                except ValueError:
+                    lines.append(line)
+                    continue
+                
+                if sp_id in providers and sp_id not in written:
+                    lines.append(f"{sp_id}|{providers[sp_id]}")
+                    written.add(sp_id)
+    
+    for sp_id, sp_name in providers.items():
+        if sp_id not in written:
+            lines.append(f"{sp_id}|{sp_name}")
+    
+    return "\n".join(lines) + "\n"
+
 def save_employee_groups(groups):
+    """Запланировать сохранение групп. groups - снимок, который дальше не изменяется."""
+    FILE_WRITER.schedule(get_data_path("employee_groups.json"), groups, render_employee_groups)
+    return True
+
+def save_service_providers(providers):
+    FILE_WRITER.schedule(get_data_path("service_providers.txt"), dict(providers), render_service_providers)
+    return True
+
+class DataFileWatcher:
+    """Наблюдатель за файлами данных: сначала сравниваются mtime и размер,
+    и только если они изменились - хеш содержимого.
+    
+    Хеш считается по тексту (после чтения с переводом строк), поэтому
+    совпадает с хешем, который запоминает FILE_WRITER, и собственные записи
+    приложения изменением не считаются. Файл, который еще ждет отложенной
+    записи, не проверяется - иначе его старое содержимое откатило бы
+    изменения в памяти.
+    """
+    
+    def __init__(self, paths):
+        self.states = {}
+        self.digests = {}
+        for path in paths:
+            self.remember(path)
+    
+    @staticmethod
+    def file_state(path: str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    @staticmethod
+    def file_digest(path: str):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return text_digest(f.read())
+        except (OSError, UnicodeDecodeError):
+            return None
+    
+    def remember(self, path: str):
+        """Принять текущее содержимое файла как известное"""
+        self.states[path] = self.file_state(path)
+        self.digests[path] = self.file_digest(path)
+    
+    def check(self) -> list:
+        """Пути файлов, содержимое которых изменилось с прошлой проверки"""
+        changed = []
+        for path in self.states:
+            if FILE_WRITER.is_pending(path):
+                continue
+            
+            state = self.file_state(path)
+            # Удаленный файл не считается пустым списком - ждем, пока он появится снова
+            if state is None or state == self.states[path]:
+                continue
+            self.states[path] = state
+            
+            digest = self.file_digest(path)
+            if digest is None or digest == self.digests[path]:
+                continue
+            self.digests[path] = digest
+            
+            if digest != FILE_WRITER.written_digest(path):
+                changed.append(path)
+        return changed
+
+def diff_service_providers(old: dict, new: dict) -> dict:
+    """Разница между двумя списками СП: добавленные, удаленные и переименованные ID"""
+    return {
+        'added': {sp_id: name for sp_id, name in new.items() if sp_id not in old},
+        'removed': [sp_id for sp_id in old if sp_id not in new],
+        'renamed': {sp_id: name for sp_id, name in new.items() if sp_id in old and old[sp_id] != name},
+    }
+
+NO_GROUP_LABEL = "Не распределен"
+
+class GroupRegistry:
+    """Группы сотрудников и обратный индекс СП -> группы.
+    
+    Состав группы хранится как упорядоченное множество (dict без значений),
+    поэтому проверка, добавление и удаление СП - O(1), а порядок в
+    employee_groups.json сохраняется. Все изменения групп идут через
+    этот класс, чтобы индекс не расходился с составом.
+    """
+    
+    def __init__(self, groups: dict = None):
+        self.load(groups or {})
+    
+    def load(self, groups: dict):
+        self.groups = {}
+        self.sp_groups = {}
+        for group_name, sp_ids in groups.items():
+            self.add_group(group_name)
+            for sp_id in sp_ids:
+                self.add_to_group(sp_id, group_name)
+    
+    def __contains__(self, group_name):
+        return group_name in self.groups
+    
+    def names(self) -> list:
+        return list(self.groups.keys())
+    
+    def members(self, group_name: str) -> list:
+        return list(self.groups[group_name])
+    
+    def group_of(self, sp_id: int):
+        """Группа СП или None. Если СП по старым данным состоит в нескольких группах - первая по порядку."""
+        groups = self.sp_groups.get(sp_id)
+        if not groups:
+            return None
+        if len(groups) == 1:
+            return next(iter(groups))
+        return next(group_name for group_name in self.groups if group_name in groups)
+    
+    def add_group(self, group_name: str):
+        self.groups.setdefault(group_name, {})
+    
+    def rename_group(self, old_name: str, new_name: str):
+        # Пересобираем словарь, чтобы группа осталась на своем месте в списке
+        self.groups = {new_name if name == old_name else name: sp_ids for name, sp_ids in self.groups.items()}
+        for sp_id in self.groups[new_name]:
+            self.sp_groups[sp_id].discard(old_name)
+            self.sp_groups[sp_id].add(new_name)
+    
+    def delete_group(self, group_name: str) -> int:
+        """Удалить группу. Возвращает количество СП в ней."""
+        sp_ids = self.groups.pop(group_name)
+        for sp_id in sp_ids:
+            self.discard_sp_group(sp_id, group_name)
+        return len(sp_ids)
+    
+    def add_to_group(self, sp_id: int, group_name: str):
+        self.groups[group_name][sp_id] = None
+        self.sp_groups.setdefault(sp_id, set()).add(group_name)
+    
+    def assign(self, sp_id: int, group_name: str):
+        """Перенести СП в группу, убрав из остальных.
+        
+        Возвращает 'added', если СП не было ни в одной группе, 'moved', если он был
+        в другой группе, и None, если он уже состоял в этой группе.
+        """
+        current_groups = set(self.sp_groups.get(sp_id, ()))
+        already_member = group_name in current_groups
+        
+        for other_group in current_groups:
+            if other_group != group_name:
+                del self.groups[other_group][sp_id]
+                self.discard_sp_group(sp_id, other_group)
+        
+        if already_member:
+            return None
+        
+        result = 'moved' if current_groups else 'added'
+        self.add_to_group(sp_id, group_name)
+        return result
+    
+    def remove_sp(self, sp_id: int) -> int:
+        """Убрать СП из всех групп. Возвращает, из скольких групп он убран."""
+        groups = self.sp_groups.pop(sp_id, set())
+        for group_name in groups:
+            del self.groups[group_name][sp_id]
+        return len(groups)
+    
+    def discard_sp_group(self, sp_id: int, group_name: str):
+        groups = self.sp_groups.get(sp_id)
+        if groups is None:
+            return
+        groups.discard(group_name)
+        if not groups:
+            del self.sp_groups[sp_id]
+    
+    def to_dict(self) -> dict:
+        return {group_name: list(sp_ids) for group_name, sp_ids in self.groups.items()}
+    
+    def save(self) -> bool:
+        return save_employee_groups(self.to_dict())
+
+EMPLOYEE_GROUPS = GroupRegistry()
+
+def load_data_files():
+    """Прочитать service_providers.txt и employee_groups.json"""
+    SERVICE_PROVIDERS.clear()
+    SERVICE_PROVIDERS.update(load_service_providers())
+    SP_SEARCH_INDEX.rebuild(SERVICE_PROVIDERS)
+    EMPLOYEE_GROUPS.load(load_employee_groups())
+
+logger = logging.getLogger("pp_parser")
+
+class JsonLogFormatter(logging.Formatter):
+    """Одна JSON-запись на строку: время, уровень, поток, сообщение"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+def setup_file_logging():
+    """Писать лог в logs/pp-parser.log рядом с программой с ротацией по размеру"""
+    if logger.handlers:
+        return
+    
     try:
-        file_path = get_data_path("employee_groups.json")
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(groups, f, ensure_ascii=False, indent=2)
-        return True
+        logs_folder = get_data_path("logs")
+        os.makedirs(logs_folder, exist_ok=True)
+        handler = RotatingFileHandler(os.path.join(logs_folder, "pp-parser.log"), maxBytes=LOG_FILE_MAX_BYTES,
+                                      backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
     except Exception as e:
-        print(f"Не удалось сохранить группы сотрудников: {str(e)}")
-        return False
+        print(f"Не удалось открыть файл лога: {str(e)}")
+        return
+    
+    handler.setFormatter(JsonLogFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
-EMPLOYEE_GROUPS = load_employee_groups()
+def prune_session_logs(logs_folder: str, keep: int = SESSION_LOG_KEEP):
+    """Удалить файлы истории сеансов, кроме keep последних"""
+    sessions = sorted(name for name in os.listdir(logs_folder) if name.startswith("session_") and name.endswith(".txt"))
+    for name in sessions[:-keep] if keep > 0 else sessions:
+        try:
+            os.remove(os.path.join(logs_folder, name))
+        except OSError:
+            pass
+
+def log_level_for(message: str) -> int:
+    if "❌" in message:
+        return logging.ERROR
+    if "⚠️" in message:
+        return logging.WARNING
+    return logging.INFO
+
+class UIEventBus:
+    """Очередь событий интерфейса (лог, прогресс, статус, вызовы) из рабочих потоков.
+    
+    Рабочие потоки только кладут события и никогда не ждут интерфейс.
+    Поток Tk забирает их пачками по таймеру в PayportApp.drain_ui_events.
+    """
+    
+    def __init__(self):
+        self.events = queue.SimpleQueue()
+    
+    def log(self, line: str):
+        self.events.put(('log', line))
+    
+    def progress(self, value: float):
+        self.events.put(('progress', value))
+    
+    def status(self, text: str):
+        self.events.put(('status', text))
+    
+    def call(self, func):
+        """Выполнить func в потоке Tk"""
+        self.events.put(('call', func))
+    
+    def drain(self, max_events: int = UI_DRAIN_MAX_EVENTS) -> list:
+        events = []
+        while len(events) < max_events:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return events
 
 def is_chrome_ready(port=DEBUGGING_PORT, host='127.0.0.1', timeout=1):
     try:
@@ -112,12 +699,16 @@ def is_chrome_ready(port=DEBUGGING_PORT, host='127.0.0.1', timeout=1):
     except:
         return False
 
-def get_or_connect_chrome():
-    if not is_chrome_ready():
+def get_or_connect_chrome(port=DEBUGGING_PORT):
+    if not is_chrome_ready(port):
         return None
     
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
     chrome_options = Options()
-    chrome_options.add_experimental_option("debuggerAddress", f"127.0.0.1:{DEBUGGING_PORT}")
+    chrome_options.add_experimental_option("debuggerAddress", f"127.0.0.1:{port}")
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
     
     try:
         driver = webdriver.Chrome(options=chrome_options)
@@ -126,6 +717,72 @@ def get_or_connect_chrome():
     except:
         return None
 
+def open_tab_driver(port=DEBUGGING_PORT):
+    """Отдельный драйвер к уже запущенному Chrome, работающий в собственной вкладке"""
+    driver = get_or_connect_chrome(port)
+    if not driver:
+        return None
+    
+    try:
+        driver.switch_to.new_window('tab')
+        return driver
+    except:
+        close_tab_driver(driver)
+        return None
+
+def close_tab_driver(driver):
+    try:
+        driver.close()
+    except:
+        pass
+    try:
+        # При подключении через debuggerAddress сам Chrome не закрывается
+        driver.quit()
+    except:
+        pass
+
+def start_headless_chrome(port=CLI_DEBUGGING_PORT, profile_dir: str = None, headless: bool = True):
+    """Chrome под управлением chromedriver для консольного режима.
+    
+    Открывает порт отладки, чтобы дополнительные вкладки подключались через open_tab_driver(port).
+    Для доступа к servicedesk нужен профиль, в котором уже выполнен вход.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument(f"--remote-debugging-port={port}")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--window-size=1920,1080")
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={profile_dir}")
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
+    
+    return webdriver.Chrome(options=chrome_options)
+
+def set_lean_fetch(driver, enabled: bool) -> bool:
+    """Включить или выключить блокировку LEAN_FETCH_BLOCKED_URLS во вкладке драйвера.
+    
+    Блокировка действует на вкладку, с которой работает драйвер, и держится
+    до выключения. Повторный вызов с тем же значением ничего не отправляет.
+    Возвращает False, если Chrome не принял команды DevTools.
+    """
+    if getattr(driver, 'pp_lean_fetch', False) == enabled:
+        return True
+    
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {'urls': LEAN_FETCH_BLOCKED_URLS if enabled else []})
+    except Exception:
+        return False
+    
+    driver.pp_lean_fetch = enabled
+    return True
+
 def open_folder(path):
     try:
         if platform.system() == "Windows":
@@ -138,12 +795,70 @@ def open_folder(path):
     except:
         return False
 
-def find_sp_in_table(soup, sp_name):
-    table = soup.find('table')
-    if not table:
-        return sp_name
+def get_cell_text(cell) -> str:
+    """Текст ячейки: куски текста обрезаются и склеиваются, как get_text(strip=True)"""
+    return "".join(text.strip() for text in cell.itertext())
+
+def extract_table_rows(html_content: str):
+    """Разобрать первую таблицу HTML в строки за один проход lxml.
+    
+    Каждая строка - словарь:
+    cells - тексты всех ячеек td/th по порядку,
+    tds - тексты только ячеек td (тот же список, если th в строке нет),
+    links - текст первой ссылки в каждой ячейке td или None,
+    classes - CSS-классы строки,
+    header - строка заголовка (в thead или первая строка без td).
+    Возвращает None, если таблицы нет.
+    """
+    if not html_content:
+        return None
     
-    all_text = table.get_text()
+    from lxml import etree, html as lxml_html
+    
+    try:
+        root = lxml_html.fromstring(html_content)
+    except (etree.ParserError, ValueError):
+        return None
+    
+    table = root if root.tag == 'table' else root.find('.//table')
+    if table is None:
+        return None
+    
+    rows = []
+    for tr in table.iter('tr'):
+        cells = []
+        tds = []
+        links = []
+        has_th = False
+        
+        for cell in tr.iterchildren('td', 'th'):
+            text = get_cell_text(cell)
+            cells.append(text)
+            
+            if cell.tag == 'th':
+                has_th = True
+                continue
+            
+            tds.append(text)
+            # Ссылку ищем только в ячейках с вложенными тегами
+            link = cell.find('.//a') if len(cell) else None
+            links.append(get_cell_text(link) if link is not None else None)
+        
+        parent = tr.getparent()
+        header = not tds and (not rows or (parent is not None and parent.tag == 'thead'))
+        
+        rows.append({
+            'cells': cells,
+            'tds': tds if has_th else cells,
+            'links': links,
+            'classes': (tr.get('class') or '').split(),
+            'header': header,
+        })
+    
+    return rows
+
+def find_sp_in_table(rows, sp_name):
+    all_text = "\n".join("\n".join(row['cells']) for row in rows)
     
     for name_part in sp_name.split('|'):
         name_part = name_part.strip()
@@ -152,1124 +867,90 @@ def find_sp_in_table(soup, sp_name):
     
     return sp_name
 
-def find_total_row(rows, sp_name, actual_sp_name):
-    total_patterns = [
-        f"Total ({actual_sp_name})",
-        f"Total ({sp_name})",
-    ]
+def get_sp_name_candidates(sp_name: str) -> list:
+    candidates = [sp_name.strip()]
+    for name_part in sp_name.split('|'):
+        name_part = name_part.strip()
+        if name_part and name_part not in candidates:
+            candidates.append(name_part)
+    return candidates
+
+def find_total_row(rows, sp_name, actual_sp_name=None):
+    if actual_sp_name is not None:
+        total_patterns = [
+            f"Total ({actual_sp_name})",
+            f"Total ({sp_name})",
+        ]
+    else:
+        # Строки идут потоком и заранее не известно, как СП назван в таблице
+        total_patterns = [f"Total ({candidate})" for candidate in get_sp_name_candidates(sp_name)]
     
     for row in rows:
-        cells = row.find_all(['td', 'th'])
-        cell_texts = [cell.get_text(strip=True) for cell in cells]
+        cell_texts = row['cells']
         
         for pattern in total_patterns:
             if pattern in cell_texts:
-                return cells
+                return cell_texts
     return None
 
-def create_deal_data(cells):
-    invoice_element = cells[1].find('a')
+def create_deal_data(row):
+    cells = row['tds']
+    invoice = row['links'][1]
     return {
-        'id': cells[0].get_text(strip=True),
-        'invoice': invoice_element.get_text(strip=True) if invoice_element else "N/A",
-        'trader': cells[3].get_text(strip=True),
-        'amount': cells[7].get_text(strip=True),
-        'currency': cells[4].get_text(strip=True),
-        'payment_system': cells[8].get_text(strip=True),
-        'type': cells[9].get_text(strip=True),
-        'status': cells[15].get_text(strip=True) if len(cells) > 15 else "Pending Arbitration",
-        'created_at': cells[18].get_text(strip=True) if len(cells) > 18 else ""
+        'id': cells[0],
+        'invoice': invoice if invoice is not None else "N/A",
+        'trader': cells[3],
+        'amount': cells[7],
+        'currency': cells[4],
+        'payment_system': cells[8],
+        'type': cells[9],
+        'status': cells[15] if len(cells) > 15 else "Pending Arbitration",
+        'created_at': cells[18] if len(cells) > 18 else ""
     }
 
-class ModernSPFrame(ttk.Frame):
-    def __init__(self, parent, sp_vars, log_callback):
-        super().__init__(parent)
-        self.sp_vars = sp_vars
-        self.log_callback = log_callback
-        self.all_sp_ids = list(SERVICE_PROVIDERS.keys())
-        self.filtered_sp_ids = self.all_sp_ids.copy()
-        
-        self.name_filter_var = tk.StringVar()
-        self.employee_group_var = tk.StringVar(value="Все группы")
-        
-        self.filter_update_job = None
-        
-        self.setup_ui()
-        self.setup_filter_bindings()
-    
-    def setup_ui(self):
-        main_container = ttk.Frame(self)
-        main_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        filter_frame = ttk.LabelFrame(main_container, text="🔍 Фильтры", padding=10)
-        filter_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        filter_row = ttk.Frame(filter_frame)
-        filter_row.pack(fill=tk.X, pady=5)
-        
-        ttk.Label(filter_row, text="Поиск:").pack(side=tk.LEFT, padx=(0, 5))
-        self.name_entry = ttk.Entry(filter_row, textvariable=self.name_filter_var, width=20)
-        self.name_entry.pack(side=tk.LEFT, padx=(0, 10))
-        
-        ttk.Label(filter_row, text="Группа:").pack(side=tk.LEFT, padx=(0, 5))
-        employee_groups = ["Все группы"] + list(EMPLOYEE_GROUPS.keys())
-        self.employee_combo = ttk.Combobox(filter_row, textvariable=self.employee_group_var, 
-                                     values=employee_groups, width=20, state="readonly")
-        self.employee_combo.pack(side=tk.LEFT, padx=(0, 10))
-        
-        ttk.Button(filter_row, text="🧹 Сбросить", 
-                  command=self.clear_filters).pack(side=tk.LEFT, padx=(0, 10))
-        
-        control_frame = ttk.Frame(main_container)
-        control_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Button(control_frame, text="✅ Выбрать все", 
-                  command=self.select_all).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(control_frame, text="❌ Снять все", 
-                  command=self.deselect_all).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(control_frame, text="⭐ Выбрать отфильтрованные", 
-                  command=self.select_filtered).pack(side=tk.LEFT, padx=(0, 5))
-        
-        # Информация о количестве СП перенесена в эту строку
-        self.filter_info_var = tk.StringVar(value=f"Всего СП: {len(self.all_sp_ids)}")
-        ttk.Label(control_frame, textvariable=self.filter_info_var, 
-                 font=("Arial", 9, "bold")).pack(side=tk.RIGHT, padx=(0, 10))
-        
-        sp_display_frame = ttk.LabelFrame(main_container, text="Service Providers", padding=5)
-        sp_display_frame.pack(fill=tk.BOTH, expand=True)
-        
-        self.setup_sp_treeview(sp_display_frame)
-    
-    def setup_filter_bindings(self):
-        self.name_entry.bind('<KeyRelease>', self.schedule_filter_update)
-        self.employee_combo.bind('<<ComboboxSelected>>', self.schedule_filter_update)
-    
-    def setup_sp_treeview(self, parent):
-        tree_frame = ttk.Frame(parent)
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
-        columns = ("selected", "id", "name", "group")
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings", height=12)
-        
-        self.tree.heading("selected", text="✅")
-        self.tree.heading("id", text="ID")
-        self.tree.heading("name", text="Название СП")
-        self.tree.heading("group", text="Группа")
-        
-        self.tree.column("selected", width=60, anchor="center")
-        self.tree.column("id", width=50, anchor="center")
-        self.tree.column("name", width=250, anchor="w")
-        self.tree.column("group", width=150, anchor="w")
-        
-        v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        h_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-        
-        self.tree.grid(row=0, column=0, sticky="nsew")
-        v_scroll.grid(row=0, column=1, sticky="ns")
-        h_scroll.grid(row=1, column=0, sticky="ew")
-        
-        tree_frame.grid_rowconfigure(0, weight=1)
-        tree_frame.grid_columnconfigure(0, weight=1)
-        
-        self.tree.bind('<Button-1>', self.on_tree_click)
-        
-        self.refresh_tree()
-    
-    def get_sp_group(self, sp_id):
-        # Ищем СП во всех группах
-        for group, sp_ids in EMPLOYEE_GROUPS.items():
-            if sp_id in sp_ids:
-                return group
-        return "Не распределен"
-    
-    def should_show_sp(self, sp_id, sp_name, filters):
-        name_match = not filters['name'] or filters['name'] in sp_name.lower()
-        
-        group_match = True
-        if filters['employee_group'] != "Все группы":
-            sp_group = self.get_sp_group(sp_id)
-            group_match = sp_group == filters['employee_group']
-        
-        return all([name_match, group_match])
-    
-    def refresh_tree(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        filters = {
-            'name': self.name_filter_var.get().lower().strip(),
-            'employee_group': self.employee_group_var.get()
-        }
-        
-        self.filtered_sp_ids = []
-        visible_count = 0
-        selected_count = 0
-        
-        for sp_id, sp_name in SERVICE_PROVIDERS.items():
-            should_show = self.should_show_sp(sp_id, sp_name, filters)
-            is_selected = self.sp_vars[sp_id].get()
-            
-            if is_selected:
-                selected_count += 1
-            
-            if should_show:
-                group = self.get_sp_group(sp_id)
-                selected_mark = "✅ ВЫБРАН" if is_selected else "☐ Выбрать"
-                self.tree.insert("", "end", iid=str(sp_id), 
-                               values=(selected_mark, sp_id, sp_name, group))
-                self.filtered_sp_ids.append(sp_id)
-                visible_count += 1
-        
-        self.filter_info_var.set(f"Показано: {visible_count} из {len(self.all_sp_ids)} | Выбрано: {selected_count}")
-        
-        if visible_count == 0:
-            self.log_callback("ℹ️ Нет СП, соответствующих фильтрам")
-    
-    def update_tree_item(self, item_id, is_selected):
-        if self.tree.exists(str(item_id)):
-            selected_mark = "✅ ВЫБРАН" if is_selected else "☐ Выбрать"
-            values = self.tree.item(str(item_id))['values']
-            self.tree.item(str(item_id), values=(selected_mark, values[1], values[2], values[3]))
-    
-    def on_tree_click(self, event):
-        item = self.tree.identify_row(event.y)
-        
-        if item:
-            sp_id = int(item)
-            current_state = self.sp_vars[sp_id].get()
-            self.sp_vars[sp_id].set(not current_state)
-            self.update_tree_item(sp_id, not current_state)
-            self.update_selection_counter()
-    
-    def update_selection_counter(self):
-        selected_count = sum(1 for var in self.sp_vars.values() if var.get())
-        visible_count = len(self.filtered_sp_ids)
-        self.filter_info_var.set(f"Показано: {visible_count} из {len(self.all_sp_ids)} | Выбрано: {selected_count}")
-    
-    def schedule_filter_update(self, event=None):
-        if self.filter_update_job:
-            self.after_cancel(self.filter_update_job)
-        self.filter_update_job = self.after(300, self.refresh_tree)
-    
-    def clear_filters(self):
-        self.name_filter_var.set("")
-        self.employee_group_var.set("Все группы")
-        self.refresh_tree()
-        self.log_callback("🧹 Все фильтры сброшены")
-    
-    def select_all(self):
-        for var in self.sp_vars.values():
-            var.set(True)
-        self.refresh_tree()
-        self.log_callback("✅ Выбраны все СП")
-    
-    def deselect_all(self):
-        for var in self.sp_vars.values():
-            var.set(False)
-        self.refresh_tree()
-        self.log_callback("❌ Выбор снят со всех СП")
-    
-    def select_filtered(self):
-        for var in self.sp_vars.values():
-            var.set(False)
-        
-        for sp_id in self.filtered_sp_ids:
-            self.sp_vars[sp_id].set(True)
-        
-        self.refresh_tree()
-        self.log_callback(f"⭐ Выбраны отфильтрованные СП: {len(self.filtered_sp_ids)}")
-    
-    def update_service_providers(self, new_service_providers, new_sp_vars):
-        """Обновить список СП в интерфейсе"""
-        self.sp_vars = new_sp_vars
-        self.all_sp_ids = list(new_service_providers.keys())
-        self.filtered_sp_ids = self.all_sp_ids.copy()
-        self.refresh_tree()
-        self.log_callback(f"🔄 Список СП обновлен: {len(self.all_sp_ids)} providers")
-    
-    def refresh_groups_display(self):
-        """Обновить отображение групп для всех СП"""
-        # Обновляем значения в комбобоксе фильтра
-        employee_groups = ["Все группы"] + list(EMPLOYEE_GROUPS.keys())
-        self.employee_combo['values'] = employee_groups
-        
-        # Обновляем дерево
-        self.refresh_tree()
-
-class TimeFrame(ttk.LabelFrame):
-    def __init__(self, parent, log_callback):
-        super().__init__(parent, text="🕒 Временные промежутки", padding=10)
-        self.log_callback = log_callback
-        
-        now = datetime.datetime.now()
-        
-        self.speed_from_var = tk.StringVar(value=self.calculate_from_time(now, 'speed').strftime("%Y-%m-%d %H:%M:%S"))
-        self.speed_to_var = tk.StringVar(value="")
-        self.conversion_from_var = tk.StringVar(value=self.calculate_from_time(now, 'conversion').strftime("%Y-%m-%d %H:%M:%S"))
-        self.conversion_to_var = tk.StringVar(value="")
-        self.arbitrage_from_var = tk.StringVar(value=self.calculate_from_time(now, 'arbitrage').strftime("%Y-%m-%d %H:%M:%S"))
-        self.arbitrage_to_var = tk.StringVar(value="")
-        
-        self.setup_ui()
-    
-    def calculate_from_time(self, now: datetime.datetime, time_type: str) -> datetime.datetime:
-        if time_type == 'arbitrage':
-            return (now - datetime.timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        if now.hour < 3:
-            return (now - datetime.timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0)
-        elif now.hour < 8:
-            return (now - datetime.timedelta(days=1)).replace(hour=17, minute=0, second=0, microsecond=0)
-        elif now.hour < 20:
-            return now.replace(hour=0, minute=0, second=0, microsecond=0)
-        else:
-            return now.replace(hour=15, minute=0, second=0, microsecond=0)
-    
-    def setup_ui(self):
-        time_grid = ttk.Frame(self)
-        time_grid.pack(fill=tk.X)
-        
-        # Заголовки
-        ttk.Label(time_grid, text="", width=8).grid(row=0, column=0, padx=2, pady=2)
-        ttk.Label(time_grid, text="От", width=15).grid(row=0, column=1, padx=2, pady=2)
-        ttk.Label(time_grid, text="До", width=15).grid(row=0, column=2, padx=2, pady=2)
-        ttk.Label(time_grid, text="", width=10).grid(row=0, column=3, padx=2, pady=2)  # Пустая колонка для кнопок
-        
-        # Скорость
-        ttk.Label(time_grid, text="Скорость:").grid(row=1, column=0, padx=2, pady=2, sticky=tk.W)
-        ttk.Entry(time_grid, textvariable=self.speed_from_var, width=15).grid(row=1, column=1, padx=2, pady=2)
-        ttk.Entry(time_grid, textvariable=self.speed_to_var, width=15).grid(row=1, column=2, padx=2, pady=2)
-        
-        # Конверсия
-        ttk.Label(time_grid, text="Конверсия:").grid(row=2, column=0, padx=2, pady=2, sticky=tk.W)
-        ttk.Entry(time_grid, textvariable=self.conversion_from_var, width=15).grid(row=2, column=1, padx=2, pady=2)
-        ttk.Entry(time_grid, textvariable=self.conversion_to_var, width=15).grid(row=2, column=2, padx=2, pady=2)
-        
-        # Арбитражи
-        ttk.Label(time_grid, text="Арбитражи:").grid(row=3, column=0, padx=2, pady=2, sticky=tk.W)
-        ttk.Entry(time_grid, textvariable=self.arbitrage_from_var, width=15).grid(row=3, column=1, padx=2, pady=2)
-        ttk.Entry(time_grid, textvariable=self.arbitrage_to_var, width=15).grid(row=3, column=2, padx=2, pady=2)
-        
-        # Кнопки управления временем - теперь в той же строке что и поля
-        button_frame = ttk.Frame(time_grid)
-        button_frame.grid(row=1, column=3, rowspan=3, padx=10, pady=2, sticky=tk.N)
-        
-        ttk.Button(button_frame, text="🔄 Сбросить время", command=self.reset_time).pack(side=tk.TOP, pady=(0, 5))
-        ttk.Button(button_frame, text="⏰ Текущее время", command=self.set_current_time).pack(side=tk.TOP)
-    
-    def reset_time(self):
-        now = datetime.datetime.now()
-        
-        self.speed_from_var.set(self.calculate_from_time(now, 'speed').strftime("%Y-%m-%d %H:%M:%S"))
-        self.speed_to_var.set("")
-        self.conversion_from_var.set(self.calculate_from_time(now, 'conversion').strftime("%Y-%m-%d %H:%M:%S"))
-        self.conversion_to_var.set("")
-        self.arbitrage_from_var.set(self.calculate_from_time(now, 'arbitrage').strftime("%Y-%m-%d %H:%M:%S"))
-        self.arbitrage_to_var.set("")
-        
-        self.log_callback("🕒 Время сброшено к оригинальным значениям")
-    
-    def set_current_time(self):
-        now = datetime.datetime.now()
-        current_time = now.strftime("%Y-%m-%d %H:%M:%S")
-        
-        if not self.speed_to_var.get():
-            self.speed_to_var.set(current_time)
-        if not self.conversion_to_var.get():
-            self.conversion_to_var.set(current_time)
-        if not self.arbitrage_to_var.get():
-            self.arbitrage_to_var.set(current_time)
-        
-        self.log_callback(f"⏰ Установлено текущее время: {current_time}")
-
-class GroupManagementFrame(ttk.LabelFrame):
-    def __init__(self, parent, log_callback, main_app):
-        super().__init__(parent, text="👥 Управление группами", padding=10)
-        self.log_callback = log_callback
-        self.main_app = main_app
-        self.setup_ui()
-    
-    def setup_ui(self):
-        # Верхняя панель с управлением группами
-        group_control_frame = ttk.Frame(self)
-        group_control_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Label(group_control_frame, text="Группа:").pack(side=tk.LEFT, padx=(0, 5))
-        self.group_var = tk.StringVar()
-        self.group_combo = ttk.Combobox(group_control_frame, textvariable=self.group_var, 
-                                       values=list(EMPLOYEE_GROUPS.keys()), width=25, state="readonly")
-        self.group_combo.pack(side=tk.LEFT, padx=(0, 10))
-        self.group_combo.bind('<<ComboboxSelected>>', self.on_group_selected)
-        
-        ttk.Button(group_control_frame, text="➕ Новая", 
-                  command=self.add_new_group).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(group_control_frame, text="✏️ Переим.", 
-                  command=self.rename_group).pack(side=tk.LEFT, padx=(0, 5))
-        ttk.Button(group_control_frame, text="🗑️ Удалить", 
-                  command=self.delete_group).pack(side=tk.LEFT, padx=(0, 5))
-        
-        # Панель управления СП в группе
-        sp_management_frame = ttk.Frame(self)
-        sp_management_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Button(sp_management_frame, text="➕ Назначить группу", 
-                  command=self.assign_selected_to_group).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(sp_management_frame, text="🧹 Убрать из групп", 
-                  command=self.remove_from_all_groups).pack(side=tk.LEFT, padx=(0, 10))
-    
-    def on_group_selected(self, event=None):
-        pass
-    
-    def add_new_group(self):
-        new_name = simpledialog.askstring("Новая группа", "Введите название новой группы:")
-        if not new_name:
-            return
-        
-        new_name = new_name.strip()
-        if not new_name:
-            messagebox.showwarning("Внимание", "Название группы не может быть пустым!")
-            return
-        
-        if new_name in EMPLOYEE_GROUPS:
-            messagebox.showwarning("Внимание", "Группа с таким названием уже существует!")
-            return
-        
-        EMPLOYEE_GROUPS[new_name] = []
-        if save_employee_groups(EMPLOYEE_GROUPS):
-            self.group_combo['values'] = list(EMPLOYEE_GROUPS.keys())
-            self.group_var.set(new_name)
-            # Обновляем комбобокс в основном интерфейсе
-            self.main_app.sp_frame.refresh_groups_display()
-            # Принудительно обновляем дерево
-            self.main_app.sp_frame.refresh_tree()
-            self.log_callback(f"✅ Добавлена новая группа: {new_name}")
-    
-    def rename_group(self):
-        old_name = self.group_var.get()
-        if not old_name:
-            messagebox.showwarning("Внимание", "Выберите группу для переименования!")
-            return
-        
-        new_name = simpledialog.askstring("Переименование группы", 
-                                         f"Введите новое название для группы '{old_name}':",
-                                         initialvalue=old_name)
-        if not new_name:
-            return
-        
-        new_name = new_name.strip()
-        if not new_name:
-            messagebox.showwarning("Внимание", "Название группы не может быть пустым!")
-            return
-        
-        if new_name in EMPLOYEE_GROUPS:
-            messagebox.showwarning("Внимание", "Группа с таким названием уже существует!")
-            return
-        
-        EMPLOYEE_GROUPS[new_name] = EMPLOYEE_GROUPS.pop(old_name)
-        if save_employee_groups(EMPLOYEE_GROUPS):
-            self.group_combo['values'] = list(EMPLOYEE_GROUPS.keys())
-            self.group_var.set(new_name)
-            # Обновляем комбобокс в основном интерфейсе
-            self.main_app.sp_frame.refresh_groups_display()
-            # Принудительно обновляем дерево
-            self.main_app.sp_frame.refresh_tree()
-            self.log_callback(f"✏️ Группа переименована: {old_name} -> {new_name}")
-    
-    def delete_group(self):
-        group_name = self.group_var.get()
-        if not group_name:
-            messagebox.showwarning("Внимание", "Выберите группу для удаления!")
-            return
-        
-        result = messagebox.askyesno("Подтверждение", 
-                                   f"Вы уверены, что хотите удалить группу '{group_name}'?")
-        if not result:
-            return
-        
-        # Сохраняем количество СП в группе для лога
-        sp_count = len(EMPLOYEE_GROUPS[group_name])
-        
-        del EMPLOYEE_GROUPS[group_name]
-        if save_employee_groups(EMPLOYEE_GROUPS):
-            self.group_combo['values'] = list(EMPLOYEE_GROUPS.keys())
-            self.group_var.set("")
-            # Обновляем комбобокс в основном интерфейсе
-            self.main_app.sp_frame.refresh_groups_display()
-            # Принудительно обновляем дерево
-            self.main_app.sp_frame.refresh_tree()
-            self.log_callback(f"🗑️ Удалена группа '{group_name}' с {sp_count} СП")
-    
-    def assign_selected_to_group(self):
-        """Назначить выбранные СП в указанную группу (удаляя из других групп)"""
-        group_name = self.group_var.get()
-        if not group_name:
-            messagebox.showwarning("Внимание", "Выберите группу!")
-            return
-        
-        if self.main_app and hasattr(self.main_app, 'get_selected_sps'):
-            selected_sps = self.main_app.get_selected_sps()
-            if not selected_sps:
-                messagebox.showwarning("Внимание", "Не выбран ни один СП!")
-                return
-            
-            assigned_count = 0
-            moved_count = 0
-            
-            for sp_id in selected_sps.keys():
-                # Проверяем, в какой группе сейчас СП
-                current_group = None
-                for group, sp_ids in EMPLOYEE_GROUPS.items():
-                    if sp_id in sp_ids:
-                        current_group = group
-                        break
-                
-                # Удаляем СП из всех других групп
-                for other_group_name, sp_ids in EMPLOYEE_GROUPS.items():
-                    if other_group_name != group_name and sp_id in sp_ids:
-                        EMPLOYEE_GROUPS[other_group_name].remove(sp_id)
-                
-                # Добавляем СП в целевую группу, если его там еще нет
-                if sp_id not in EMPLOYEE_GROUPS[group_name]:
-                    EMPLOYEE_GROUPS[group_name].append(sp_id)
-                    if current_group and current_group != group_name:
-                        moved_count += 1
-                    else:
-                        assigned_count += 1
-            
-            # Всегда сохраняем и обновляем интерфейс, даже если ничего не изменилось
-            if save_employee_groups(EMPLOYEE_GROUPS):
-                # ОБНОВЛЯЕМ ОТОБРАЖЕНИЕ ГРУПП В ОСНОВНОМ ИНТЕРФЕЙСЕ
-                self.main_app.sp_frame.refresh_groups_display()
-                # ПРИНУДИТЕЛЬНО ОБНОВЛЯЕМ ДЕРЕВО
-                self.main_app.sp_frame.refresh_tree()
-                
-                message_parts = []
-                if assigned_count > 0:
-                    message_parts.append(f"добавлено {assigned_count}")
-                if moved_count > 0:
-                    message_parts.append(f"перемещено {moved_count}")
-                
-                if assigned_count > 0 or moved_count > 0:
-                    self.log_callback(f"✅ {', '.join(message_parts)} СП в группу '{group_name}'")
-                else:
-                    self.log_callback(f"ℹ️ Все выбранные СП уже находятся в группе '{group_name}'")
-        else:
-            messagebox.showerror("Ошибка", "Не удалось получить доступ к списку выбранных СП!")
-    
-    def remove_from_all_groups(self):
-        """Убрать выбранные СП из всех групп"""
-        if self.main_app and hasattr(self.main_app, 'get_selected_sps'):
-            selected_sps = self.main_app.get_selected_sps()
-            if not selected_sps:
-                messagebox.showwarning("Внимание", "Не выбран ни один СП!")
-                return
-            
-            removed_count = 0
-            
-            for sp_id in selected_sps.keys():
-                # Удаляем СП из всех групп
-                for group_name, sp_ids in EMPLOYEE_GROUPS.items():
-                    if sp_id in sp_ids:
-                        EMPLOYEE_GROUPS[group_name].remove(sp_id)
-                        removed_count += 1
-            
-            # Всегда сохраняем и обновляем интерфейс
-            if save_employee_groups(EMPLOYEE_GROUPS):
-                # ОБНОВЛЯЕМ ОТОБРАЖЕНИЕ ГРУПП В ОСНОВНОМ ИНТЕРФЕЙСЕ
-                self.main_app.sp_frame.refresh_groups_display()
-                # ПРИНУДИТЕЛЬНО ОБНОВЛЯЕМ ДЕРЕВО
-                self.main_app.sp_frame.refresh_tree()
-                
-                if removed_count > 0:
-                    self.log_callback(f"🧹 Убрано {removed_count} СП из всех групп")
-                else:
-                    self.log_callback("ℹ️ Выбранные СП не состоят ни в одной группе")
-        else:
-            messagebox.showerror("Ошибка", "Не удалось получить доступ к списку выбранных СП!")
-
-class PayportApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Payport SP Parser v10.8")
-        self.root.geometry("1400x900")
-        self.root.minsize(1000, 700)
-        
-        # Сначала инициализируем основные переменные
-        self.sp_vars = {sp_id: tk.BooleanVar(value=True) for sp_id in SERVICE_PROVIDERS.keys()}
-        self.auto_no_incidents_var = tk.BooleanVar(value=True)
-        
-        self.stop_processing = False
-        self.processing_thread = None
-        self.driver = None
-        self.chrome_process = None
-        self.last_reports_folder = None
-        
-        # Инициализируем log_text как None
-        self.log_text = None
-        
-        self.setup_ui()
-        self.setup_sp_management()
-    
-    def setup_ui(self):
-        style = ttk.Style()
-        style.configure("TButton", padding=6)
-        style.configure("TLabelframe", padding=10)
-        style.configure("TLabelframe.Label", font=("Arial", 10, "bold"))
-        
-        # Создаем основной контейнер с прокруткой
-        main_container = ttk.Frame(self.root)
-        main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        
-        # Создаем панель с вкладками вместо PanedWindow
-        notebook = ttk.Notebook(main_container)
-        notebook.pack(fill=tk.BOTH, expand=True)
-        
-        # Левая вкладка - основные функции
-        left_tab = ttk.Frame(notebook)
-        notebook.add(left_tab, text="📊 Основные функции")
-        
-        # Правая вкладка - логи
-        right_tab = ttk.Frame(notebook)
-        notebook.add(right_tab, text="📝 Логи выполнения")
-        
-        # СНАЧАЛА настраиваем правую панель с логами
-        self.setup_right_panel(right_tab)
-        
-        # ПОТОМ левую панель
-        self.setup_left_panel(left_tab)
-        
-        # Настройка весов для масштабирования
-        main_container.columnconfigure(0, weight=1)
-        main_container.rowconfigure(0, weight=1)
-        
-    def setup_left_panel(self, parent):
-        # Используем grid с весами для правильного масштабирования
-        parent.columnconfigure(0, weight=1)
-        parent.columnconfigure(1, weight=1)
-        parent.rowconfigure(0, weight=0)  # Время
-        parent.rowconfigure(1, weight=0)  # Управление СП и группы
-        parent.rowconfigure(2, weight=1)  # СП получают наибольший вес
-        parent.rowconfigure(3, weight=0)  # Управление обработкой
-        
-        # Временные промежутки - на самый верх
-        self.time_frame = TimeFrame(parent, self.log)
-        self.time_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
-        
-        # Блок управления СП и группами - рядом
-        management_frame = ttk.Frame(parent)
-        management_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
-        management_frame.columnconfigure(0, weight=1)
-        management_frame.columnconfigure(1, weight=1)
-        
-        # Управление СП - слева
-        self.sp_management_frame = ttk.LabelFrame(management_frame, text="🔧 Управление СП", padding=10)
-        self.sp_management_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
-        self.setup_sp_management_ui()
-        
-        # Управление группами - справа (ПЕРЕДАЕМ self КАК main_app)
-        self.group_frame = GroupManagementFrame(management_frame, self.log, self)
-        self.group_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
-        
-        # Список СП - под блоком управления
-        self.sp_frame = ModernSPFrame(parent, self.sp_vars, self.log)
-        self.sp_frame.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
-        
-        # Управление обработкой - внизу
-        control_frame = ttk.LabelFrame(parent, text="🚀 Управление обработкой", padding=10)
-        control_frame.grid(row=3, column=0, columnspan=2, sticky="ew")
-        
-        settings_frame = ttk.Frame(control_frame)
-        settings_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        self.auto_no_incidents_cb = ttk.Checkbutton(
-            settings_frame, 
-            text="Автоматически заполнять 'Инцидентов не найдено' в пункте 6",
-            variable=self.auto_no_incidents_var
-        )
-        self.auto_no_incidents_cb.pack(side=tk.LEFT)
-        
-        btn_container = ttk.Frame(control_frame)
-        btn_container.pack(fill=tk.X)
-        
-        self.start_button = ttk.Button(btn_container, text="▶️ Запуск обработки", command=self.start_processing)
-        self.start_button.pack(side=tk.LEFT, padx=(0, 10))
-        
-        self.stop_button = ttk.Button(btn_container, text="⏹️ Остановить", command=self.stop_processing_command, state="disabled")
-        self.stop_button.pack(side=tk.LEFT, padx=(0, 10))
-        
-        self.open_folder_button = ttk.Button(btn_container, text="📁 Открыть папку отчетов", command=self.open_last_reports_folder, state="disabled")
-        self.open_folder_button.pack(side=tk.LEFT)
-        
-        self.progress = ttk.Progressbar(control_frame, mode='determinate')
-        self.progress.pack(fill=tk.X, pady=(10, 0))
-        
-        self.status_var = tk.StringVar(value="Готов к работе")
-        status_label = ttk.Label(control_frame, textvariable=self.status_var, font=("Arial", 9))
-        status_label.pack(pady=(5, 0))
-    
-    def setup_right_panel(self, parent):
-        parent.columnconfigure(0, weight=1)
-        parent.rowconfigure(0, weight=1)
-        
-        log_frame = ttk.LabelFrame(parent, text="📝 Логи выполнения", padding=10)
-        log_frame.grid(row=0, column=0, sticky="nsew")
-        
-        log_frame.columnconfigure(0, weight=1)
-        log_frame.rowconfigure(0, weight=1)
-        
-        self.log_text = scrolledtext.ScrolledText(log_frame, height=20, width=60, font=("Consolas", 9))
-        self.log_text.grid(row=0, column=0, sticky="nsew")
-        
-        log_control = ttk.Frame(log_frame)
-        log_control.grid(row=1, column=0, sticky="ew", pady=(5, 0))
-        
-        ttk.Button(log_control, text="🧹 Очистить логи", command=self.clear_logs).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(log_control, text="💾 Сохранить логи", command=self.save_logs).pack(side=tk.LEFT)
-    
-    def setup_sp_management(self):
-        """Настройка управления СП - теперь это отдельный метод для инициализации переменных"""
-        pass
-    
-    def setup_sp_management_ui(self):
-        """Настройка UI управления СП"""
-        # Поля для ввода нового СП
-        input_frame = ttk.Frame(self.sp_management_frame)
-        input_frame.pack(fill=tk.X, pady=5)
-        
-        ttk.Label(input_frame, text="ID:").pack(side=tk.LEFT, padx=(0, 5))
-        self.new_sp_id_var = tk.StringVar()
-        self.new_sp_id_entry = ttk.Entry(input_frame, textvariable=self.new_sp_id_var, width=8)
-        self.new_sp_id_entry.pack(side=tk.LEFT, padx=(0, 10))
-        
-        ttk.Label(input_frame, text="Название:").pack(side=tk.LEFT, padx=(0, 5))
-        self.new_sp_name_var = tk.StringVar()
-        self.new_sp_name_entry = ttk.Entry(input_frame, textvariable=self.new_sp_name_var, width=30)
-        self.new_sp_name_entry.pack(side=tk.LEFT, padx=(0, 10))
-        
-        # Кнопки управления
-        btn_frame = ttk.Frame(self.sp_management_frame)
-        btn_frame.pack(fill=tk.X, pady=5)
-        
-        ttk.Button(btn_frame, text="➕ Добавить СП", command=self.add_service_provider).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(btn_frame, text="➖ Удалить выбранные", command=self.delete_selected_providers).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(btn_frame, text="🔄 Обновить из файла", command=self.reload_service_providers).pack(side=tk.LEFT, padx=(0, 10))
-        ttk.Button(btn_frame, text="📝 Открыть файл СП", command=self.open_service_providers_file).pack(side=tk.LEFT)
-    
-    def add_service_provider(self):
-        """Добавить нового Service Provider"""
-        sp_id = self.new_sp_id_var.get().strip()
-        sp_name = self.new_sp_name_var.get().strip()
-        
-        if not sp_id or not sp_name:
-            messagebox.showerror("Ошибка", "Заполните ID и название СП!")
-            return
-        
-        try:
-            sp_id_int = int(sp_id)
-        except ValueError:
-            messagebox.showerror("Ошибка", "ID должен быть числом!")
-            return
-        
-        # Проверяем, существует ли уже такой ID
-        if sp_id_int in SERVICE_PROVIDERS:
-            result = messagebox.askyesno("Подтверждение", 
-                                       f"СП с ID {sp_id_int} уже существует:\n{SERVICE_PROVIDERS[sp_id_int]}\nЗаменить?")
-            if not result:
-                return
-        
-        # Добавляем в файл
-        try:
-            file_path = get_data_path("service_providers.txt")
-            
-            with open(file_path, 'a', encoding='utf-8') as f:
-                f.write(f"\n{sp_id_int}|{sp_name}")
-            
-            # Обновляем глобальные переменные
-            SERVICE_PROVIDERS[sp_id_int] = sp_name
-            self.sp_vars[sp_id_int] = tk.BooleanVar(value=True)
-            
-            # Обновляем интерфейс
-            self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
-            
-            # Очищаем поля ввода
-            self.new_sp_id_var.set("")
-            self.new_sp_name_var.set("")
-            
-            self.log(f"✅ Добавлен СП: {sp_name} (ID {sp_id_int})")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось добавить СП: {str(e)}")
-    
-    def delete_selected_providers(self):
-        """Удалить выбранные Service Providers"""
-        selected_sps = self.get_selected_sps()
-        if not selected_sps:
-            messagebox.showwarning("Внимание", "Не выбран ни один Service Provider для удаления!")
-            return
-        
-        sp_list = "\n".join([f"ID {sp_id}: {sp_name}" for sp_id, sp_name in selected_sps.items()])
-        result = messagebox.askyesno("Подтверждение удаления", 
-                                   f"Вы уверены, что хотите удалить следующие СП?\n\n{sp_list}")
-        
-        if not result:
-            return
-        
-        try:
-            file_path = get_data_path("service_providers.txt")
-            
-            # Читаем текущий файл
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            # Записываем обратно все строки, кроме удаляемых СП
-            with open(file_path, 'w', encoding='utf-8') as f:
-                for line in lines:
-                    line = line.strip()
-                    if line and '|' in line:
-                        current_id, current_name = line.split('|', 1)
-                        current_id = current_id.strip()
-                        try:
-                            if int(current_id) not in selected_sps:
-                                f.write(line + '\n')
-                        except ValueError:
-                            f.write(line + '\n')
-            
-            # Обновляем глобальные переменные
-            for sp_id in selected_sps.keys():
-                if sp_id in SERVICE_PROVIDERS:
-                    del SERVICE_PROVIDERS[sp_id]
-                if sp_id in self.sp_vars:
-                    del self.sp_vars[sp_id]
-            
-            # Обновляем интерфейс
-            self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
-            
-            self.log(f"✅ Удалено СП: {len(selected_sps)} шт.")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось удалить СП: {str(e)}")
-    
-    def reload_service_providers(self):
-        """Перезагрузить список СП из файла"""
-        global SERVICE_PROVIDERS
-        
-        try:
-            new_providers = load_service_providers()
-            if new_providers is not None:
-                SERVICE_PROVIDERS = new_providers
-                
-                # Обновляем sp_vars
-                self.sp_vars = {sp_id: tk.BooleanVar(value=True) for sp_id in SERVICE_PROVIDERS.keys()}
-                
-                # Обновляем интерфейс
-                self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
-                
-                self.log("✅ Список СП обновлен из файла")
-            else:
-                self.log("❌ Ошибка при загрузке списка СП")
-                
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить список СП: {str(e)}")
-    
-    def open_service_providers_file(self):
-        """Открыть файл service_providers.txt для редактирования"""
-        try:
-            file_path = get_data_path("service_providers.txt")
-            
-            if platform.system() == "Windows":
-                os.startfile(file_path)
-            elif platform.system() == "Darwin":
-                subprocess.Popen(["open", file_path])
-            else:
-                subprocess.Popen(["xdg-open", file_path])
-                
-            self.log("📝 Открыт файл service_providers.txt для редактирования")
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось открыть файл: {str(e)}")
-    
-    def open_last_reports_folder(self):
-        if self.last_reports_folder and os.path.exists(self.last_reports_folder):
-            if open_folder(self.last_reports_folder):
-                self.log(f"📁 Открыта папка с отчетами: {self.last_reports_folder}")
-            else:
-                self.log(f"❌ Не удалось открыть папку: {self.last_reports_folder}")
-        else:
-            # Ищем в папке REPORTS
-            reports_main_folder = "REPORTS"
-            if os.path.exists(reports_main_folder):
-                reports_folders = [f for f in os.listdir(reports_main_folder) if f.startswith('reports_') and os.path.isdir(os.path.join(reports_main_folder, f))]
-                if reports_folders:
-                    latest_folder = max(reports_folders, key=lambda x: os.path.getctime(os.path.join(reports_main_folder, x)))
-                    latest_folder_path = os.path.join(reports_main_folder, latest_folder)
-                    if open_folder(latest_folder_path):
-                        self.log(f"📁 Открыта последняя папка с отчетами: {latest_folder_path}")
-                    else:
-                        self.log(f"❌ Не удалось открыть папку: {latest_folder_path}")
-                else:
-                    messagebox.showwarning("Внимание", "В папке REPORTS не найдены отчеты!")
-            else:
-                messagebox.showwarning("Внимание", "Папка с отчетами не найдена!")
-    
-    def log(self, message):
-        """Безопасный метод логирования с проверкой инициализации log_text"""
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
-        
-        # Если log_text еще не инициализирован, выводим в консоль
-        if not hasattr(self, 'log_text') or self.log_text is None:
-            print(formatted_message, end='')
-            return
-        
-        try:
-            self.log_text.insert(tk.END, formatted_message)
-            self.log_text.see(tk.END)
-            self.root.update_idletasks()
-        except Exception as e:
-            # Если что-то пошло не так с log_text, выводим в консоль
-            print(f"Ошибка записи в log_text: {e}")
-            print(formatted_message, end='')
-    
-    def clear_logs(self):
-        if hasattr(self, 'log_text') and self.log_text:
-            self.log_text.delete(1.0, tk.END)
-        self.log("🧹 Логи очищены")
-    
-    def save_logs(self):
-        try:
-            # Сохраняем логи в папку с программой
-            filename = f"logs_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.log_text.get(1.0, tk.END))
-            self.log(f"💾 Логи сохранены в файл: {filename}")
-        except Exception as e:
-            self.log(f"❌ Ошибка сохранения логов: {str(e)}")
-    
-    def get_selected_sps(self):
-        return {sp_id: SERVICE_PROVIDERS[sp_id] for sp_id, var in self.sp_vars.items() if var.get()}
-    
-    def get_time_params(self):
-        return {
-            'speed': {
-                'from_date': self.time_frame.speed_from_var.get(),
-                'to_date': self.time_frame.speed_to_var.get()
-            },
-            'conversion': {
-                'from_date': self.time_frame.conversion_from_var.get(),
-                'to_date': self.time_frame.conversion_to_var.get()
-            },
-            'arbitrage': {
-                'from_date': self.time_frame.arbitrage_from_var.get(),
-                'to_date': self.time_frame.arbitrage_to_var.get()
-            }
-        }
-    
-    def start_processing(self):
-        if self.processing_thread and self.processing_thread.is_alive():
-            messagebox.showwarning("Внимание", "Обработка уже запущена!")
-            return
-            
-        selected_sps = self.get_selected_sps()
-        if not selected_sps:
-            messagebox.showwarning("Внимание", "Не выбран ни один Service Provider!")
-            return
-        
-        time_params = self.get_time_params()
-        
-        try:
-            for param_type, params in time_params.items():
-                if params['from_date']:
-                    datetime.datetime.strptime(params['from_date'], "%Y-%m-%d %H:%M:%S")
-                if params['to_date']:
-                    datetime.datetime.strptime(params['to_date'], "%Y-%m-%d %H:%M:%S")
-        except ValueError as e:
-            messagebox.showerror("Ошибка", f"Неверный формат времени!\nИспользуйте: ГГГГ-ММ-ДД ЧЧ:ММ:СС\n\nОшибка: {str(e)}")
-            return
-        
-        result = messagebox.askyesno("Подтверждение", f"Будет обработано {len(selected_sps)} Service Providers.\n\nПродолжить?")
-        if not result:
-            return
-        
-        self.stop_processing = False
-        self.start_button.config(state="disabled")
-        self.stop_button.config(state="normal")
-        self.open_folder_button.config(state="disabled")
-        
-        self.processing_thread = threading.Thread(target=self.process_sps, args=(selected_sps, time_params))
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
-    
-    def stop_processing_command(self):
-        self.stop_processing = True
-        self.log("🛑 Запрошена остановка обработки...")
-        self.update_status("Останавливается...")
-    
-    def update_progress(self, value):
-        self.progress['value'] = value
-        self.root.update_idletasks()
-    
-    def update_status(self, status):
-        self.status_var.set(status)
-        self.root.update_idletasks()
-    
-    def process_sps(self, selected_sps, time_params):
-        try:
-            self.log("=" * 60)
-            self.log("🚀 Начинаем обработку выбранных СП")
-            self.log(f"📋 Выбрано СП: {len(selected_sps)}")
-            
-            if not self.driver:
-                self.update_status("Запуск Chrome...")
-                self.driver, self.chrome_process = self.start_chrome_automatically()
-                
-                if not self.driver:
-                    self.log("❌ Не удалось запустить Chrome")
-                    self.reset_ui_after_processing()
-                    return
-                
-                self.log("✅ Chrome успешно запущен")
-            else:
-                self.log("✅ Используем существующий браузер")
-            
-            now = datetime.datetime.now()
-            
-            # Создаем основную папку REPORTS если ее нет
-            reports_main_folder = "REPORTS"
-            os.makedirs(reports_main_folder, exist_ok=True)
-            
-            # Создаем подпапку для текущего запуска
-            reports_folder = os.path.join(reports_main_folder, f"reports_{now.strftime('%Y%m%d_%H%M%S')}")
-            os.makedirs(reports_folder, exist_ok=True)
-            
-            original_dir = os.getcwd()
-            os.chdir(reports_folder)
-            self.last_reports_folder = os.getcwd()
-            self.log(f"📁 Отчеты будут сохранены в папку: {reports_folder}")
-            
-            processed_count = 0
-            total_count = len(selected_sps)
-            
-            for i, (sp_id, sp_name) in enumerate(selected_sps.items()):
-                if self.stop_processing:
-                    self.log("🛑 Обработка остановлена пользователем")
-                    break
-                    
-                try:
-                    self.update_status(f"Обработка {sp_name}... ({i+1}/{total_count})")
-                    self.update_progress((i / total_count) * 100)
-                    
-                    self.log(f"\n🔗 Обрабатываем {sp_name} (ID {sp_id})")
-                    
-                    filename = process_single_sp_gui(
-                        self.driver, 
-                        sp_id, 
-                        sp_name, 
-                        time_params, 
-                        self.log,
-                        self.auto_no_incidents_var.get()
-                    )
-                    
-                    processed_count += 1
-                    self.log(f"✅ Завершена обработка {sp_name}")
-                    
-                except Exception as e:
-                    self.log(f"❌ Ошибка при обработке {sp_name}: {str(e)}")
-                    continue
-            
-            os.chdir(original_dir)
-            
-            self.update_progress(100)
-            
-            if self.stop_processing:
-                self.update_status("Обработка остановлена")
-                self.log(f"🛑 Обработка остановлена. Обработано: {processed_count}/{total_count}")
-            else:
-                self.update_status("Обработка завершена")
-                self.log(f"\n🎉 Готово! Обработано СП: {processed_count}/{total_count}")
-                self.log(f"📁 Отчеты сохранены в папке: {reports_folder}")
-            
-        except Exception as e:
-            error_message = str(e)
-            self.log(f"❌ Критическая ошибка: {error_message}")
-            self.root.after(0, lambda msg=error_message: messagebox.showerror("Ошибка", f"Произошла критическая ошибка:\n{msg}"))
-        finally:
-            self.reset_ui_after_processing()
-    
-    def start_chrome_automatically(self):
-        try:
-            self.log("🔍 Проверяем запущенный Chrome...")
-            driver = get_or_connect_chrome()
-            if driver:
-                self.log("✅ Подключились к существующему Chrome")
-                return driver, None
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-            self.log("🔄 Запускаем новый Chrome...")
-            
-            chrome_cmd = [
-                "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
-                f"--remote-debugging-port={DEBUGGING_PORT}",
-                f"--user-data-dir=C:\\temp\\chrome_debug",
-                "--no-first-run",
-                "--no-default-browser-check",
-                "--disable-extensions",
-                "--disable-plugins",
-                "--disable-translate"
-            ]
-            
-            self.log("🚀 Запускаем процесс Chrome...")
-            process = subprocess.Popen(chrome_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            self.log("⏳ Ожидаем запуск Chrome (макс 15 сек)...")
-            start_time = time.time()
-            
-            for i in range(30):
-                if self.stop_processing:
-                    self.log("🛑 Запуск Chrome прерван")
-                    try:
-                        process.terminate()
-                        process.wait(timeout=2)
-                    except:
-                        pass
-                    return None, None
-                
-                time.sleep(0.5)
-                
-                driver = get_or_connect_chrome()
-                if driver:
-                    elapsed = time.time() - start_time
-                    self.log(f"✅ Chrome запущен за {elapsed:.1f} сек")
-                    return driver, process
-                
-                if i % 4 == 0:
-                    self.log(f"⏳ Ожидание... ({i//2}/15 сек)")
+def calculate_from_time(now: datetime.datetime, time_type: str) -> datetime.datetime:
+    if time_type == 'arbitrage':
+        return (now - datetime.timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    if now.hour < 3:
+        return (now - datetime.timedelta(days=1)).replace(hour=15, minute=0, second=0, microsecond=0)
+    elif now.hour < 8:
+        return (now - datetime.timedelta(days=1)).replace(hour=17, minute=0, second=0, microsecond=0)
+    elif now.hour < 20:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        return now.replace(hour=15, minute=0, second=0, microsecond=0)
 
-            self.log("❌ Chrome не запустился за 15 секунд")
-            try:
-                process.terminate()
-                process.wait(timeout=2)
-            except:
-                pass
-            return None, None
-            
-        except Exception as e:
-            self.log(f"❌ Ошибка при запуске Chrome: {str(e)}")
-            return None, None
-    
-    def reset_ui_after_processing(self):
-        self.start_button.config(state="normal")
-        self.stop_button.config(state="disabled")
-        self.open_folder_button.config(state="normal")
-        self.stop_processing = False
-        self.update_status("Готов к работе")
-        self.update_progress(0)
-
-def build_speed_url(time_params: dict, sp_ids: list[int]) -> str:
+def default_time_params(now: datetime.datetime = None) -> dict:
+    """Промежутки по умолчанию - те же, что подставляет TimeFrame"""
+    now = now or datetime.datetime.now()
+    return {
+        time_type: {'from_date': calculate_from_time(now, time_type).strftime(TIME_FORMAT), 'to_date': ""}
+        for time_type in ('speed', 'conversion', 'arbitrage')
+    }
+
+def validate_time_params(time_params: dict):
+    """ValueError, если дата не в формате ГГГГ-ММ-ДД ЧЧ:ММ:СС"""
+    for param_type, params in time_params.items():
+        if params['from_date']:
+            datetime.datetime.strptime(params['from_date'], TIME_FORMAT)
+        if params['to_date']:
+            datetime.datetime.strptime(params['to_date'], TIME_FORMAT)
+
+def add_page_params(params: dict, lines_per_page: int, page: int) -> dict:
+    params["lines_per_page"] = lines_per_page
+    if page > 1:
+        params["page"] = page
+    return params
+
+def build_speed_url(time_params: dict, sp_ids: list[int], lines_per_page: int = LINES_PER_PAGE, page: int = 1) -> str:
     params = {
         "from_date": time_params['speed']['from_date'],
         "to_date": time_params['speed']['to_date'],
-        "lines_per_page": LINES_PER_PAGE,
     }
+    add_page_params(params, lines_per_page, page)
 
     query = urlencode(params, quote_via=quote_plus)
     for sp_id in sp_ids:
@@ -1277,21 +958,22 @@ def build_speed_url(time_params: dict, sp_ids: list[int]) -> str:
 
     return f"{BASE_URL_SPEED}?{query}"
 
-def build_ads_url(sp_id: int) -> str:
+def build_ads_url(sp_id: int, lines_per_page: int = LINES_PER_PAGE, page: int = 1) -> str:
     params = {
         "service_provider_id[]": sp_id,
         "status[]": 1,
     }
+    add_page_params(params, lines_per_page, page)
     
     query = urlencode(params, quote_via=quote_plus)
     return f"{BASE_URL_ADS}?{query}"
 
-def build_conversion_url(time_params: dict, sp_ids: list[int]) -> str:
+def build_conversion_url(time_params: dict, sp_ids: list[int], lines_per_page: int = LINES_PER_PAGE, page: int = 1) -> str:
     params = {
         "from_date": time_params['conversion']['from_date'],
         "to_date": time_params['conversion']['to_date'],
-        "lines_per_page": LINES_PER_PAGE,
     }
+    add_page_params(params, lines_per_page, page)
 
     query = urlencode(params, quote_via=quote_plus)
     for sp_id in sp_ids:
@@ -1299,7 +981,7 @@ def build_conversion_url(time_params: dict, sp_ids: list[int]) -> str:
 
     return f"{BASE_URL_CONVERSION}?{query}"
 
-def build_arbitrage_url(time_params: dict, sp_id: int) -> str:
+def build_arbitrage_url(time_params: dict, sp_id: int, lines_per_page: int = LINES_PER_PAGE, page: int = 1) -> str:
     params = {
         "from_date": time_params['arbitrage']['from_date'],
         "to_date": time_params['arbitrage']['to_date'],
@@ -1307,107 +989,714 @@ def build_arbitrage_url(time_params: dict, sp_id: int) -> str:
         "status[]": 5,
         "service_provider[]": sp_id,
     }
+    add_page_params(params, lines_per_page, page)
     
     query = urlencode(params, quote_via=quote_plus)
     return f"{BASE_URL_DEALS}?{query}"
 
-def build_bank_statements_url(sp_id: int) -> str:
+def build_bank_statements_url(sp_id: int, lines_per_page: int = LINES_PER_PAGE, page: int = 1) -> str:
     params = {
         "service_provider[]": sp_id,
     }
+    add_page_params(params, lines_per_page, page)
     
     query = urlencode(params, quote_via=quote_plus)
     return f"{BASE_URL_BANK_STATEMENTS}?{query}"
 
-def wait_for_table_loaded(driver, timeout=60):
-    start_time = time.time()
+TABLE_STATE_DATA = "data"
+TABLE_STATE_EMPTY = "empty"
+TABLE_STATE_TIMEOUT = "timeout"
+
+# Ждет таблицу прямо в браузере: проверка на каждое изменение DOM (MutationObserver)
+# и страховочный опрос раз в 50 мс. Возвращает состояние ('data', 'empty' или 'timeout'),
+# HTML только первой таблицы и признак следующей страницы из ссылок пагинации
+# (null - если пагинации на странице нет).
+TABLE_READY_SCRIPT = """
+var timeoutMs = arguments[0];
+var done = arguments[arguments.length - 1];
+var finished = false;
+var observer = null;
+var poller = null;
+var timer = null;
+
+function tableState() {
+    var table = document.querySelector('table');
+    if (!table) {
+        return null;
+    }
+    if (table.rows.length > 1 && table.querySelector('td')) {
+        return 'data';
+    }
+    if (table.querySelectorAll('th').length > 5) {
+        return 'empty';
+    }
+    return null;
+}
+
+function snapshot(state) {
+    var table = document.querySelector('table');
+    var hasNext = null;
+    if (document.querySelector('a[rel~="next"], link[rel~="next"]')) {
+        hasNext = true;
+    } else if (document.querySelector('.pagination')) {
+        hasNext = false;
+    }
+    return {state: state, table: table ? table.outerHTML : null, has_next: hasNext};
+}
+
+function finish(state) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    if (observer) observer.disconnect();
+    if (poller) clearInterval(poller);
+    if (timer) clearTimeout(timer);
+    done(snapshot(state));
+}
+
+function check() {
+    var state = tableState();
+    if (state) finish(state);
+}
+
+check();
+if (!finished) {
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement || document, {childList: true, subtree: true});
+    poller = setInterval(check, 50);
+    timer = setTimeout(function() { finish('timeout'); }, timeoutMs);
+}
+"""
+
+def wait_for_table_page(driver, timeout=60) -> dict:
+    """Дождаться таблицы с данными или пустой таблицы (только заголовки).
+    
+    Возвращает {'state', 'table', 'has_next'} одним запросом к браузеру.
+    """
+    from selenium.common.exceptions import JavascriptException
+    
+    deadline = time.time() + timeout
     
-    while time.time() - start_time < timeout:
+    # Таймаут скрипта выставляется один раз на драйвер, а не перед каждой страницей
+    if getattr(driver, 'pp_script_timeout', None) != timeout:
+        driver.set_script_timeout(timeout + 5)
+        driver.pp_script_timeout = timeout
+    
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return {'state': TABLE_STATE_TIMEOUT, 'table': None, 'has_next': None}
+        
         try:
-            table = WebDriverWait(driver, 1).until(
-                EC.presence_of_element_located((By.TAG_NAME, "table"))
-            )
+            return driver.execute_async_script(TABLE_READY_SCRIPT, int(remaining * 1000))
+        except JavascriptException:
+            # Страница сменилась во время ожидания (редирект) - ждем заново
+            time.sleep(0.05)
+
+def get_current_page(driver, log_func=None):
+    """Таблица текущей страницы без остальной разметки.
+    
+    Возвращает {'state', 'html', 'has_next'}, где html - HTML первой таблицы
+    (None, если таблицы нет). Парсеры parse_*_data принимают его как есть.
+    При ошибке драйвера пишет ее в log_func и возвращает None.
+    """
+    try:
+        page = wait_for_table_page(driver)
+        return {'state': page['state'], 'html': page['table'], 'has_next': page['has_next']}
+    except Exception as e:
+        if log_func:
+            log_func(f"⚠️ Не удалось прочитать страницу: {str(e)}")
+        return None
+
+class PageLoadError(Exception):
+    pass
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Перцентиль по ближайшему рангу для уже отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def timing_stats(values: list) -> dict:
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'total': round(sum(values), 4),
+        'p50': round(percentile(values, 0.5), 4),
+        'p95': round(percentile(values, 0.95), 4),
+        'max': round(values[-1], 4) if values else 0.0,
+    }
+
+class RunProfiler:
+    """Замеры этапов обработки: навигация, ожидание таблицы, разбор, запись отчета.
+    
+    span() - вложенные интервалы в пределах потока. Тип страницы и СП
+    наследуются от внешнего интервала, а для сводки берется собственное
+    время интервала (без вложенных) - так "разбор" не включает загрузку
+    следующих страниц, которую он запускает, дочитывая выдачу.
+    """
+    
+    # Названия этапов для сводки в логе
+    STAGE_TITLES = {
+        'page': 'страница (прочее)',
+        'cache': 'кэш страниц',
+        'navigate': 'навигация',
+        'wait': 'ожидание таблицы',
+        'extract': 'разбор HTML',
+        'parse': 'разбор данных',
+        'report': 'формирование отчета',
+        'write': 'запись отчета',
+    }
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans = []
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+    
+    @contextlib.contextmanager
+    def span(self, stage: str, page_type: str = None, sp_ids=None, **args):
+        """Интервал этапа. Возвращает словарь args, в который можно дописать подробности (например, число строк)."""
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        
+        parent = stack[-1] if stack else None
+        if parent:
+            page_type = page_type or parent['page_type']
+            sp_ids = sp_ids if sp_ids is not None else parent['sp_ids']
+        
+        span = {
+            'stage': stage,
+            'page_type': page_type,
+            'sp_ids': list(sp_ids or []),
+            'args': args,
+            'thread': threading.current_thread().name,
+            'children': 0.0,
+        }
+        stack.append(span)
+        start = time.perf_counter()
+        try:
+            yield span['args']
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            if parent:
+                parent['children'] += duration
+            span['start'] = start - self.started
+            span['duration'] = duration
+            span['self_time'] = max(0.0, duration - span.pop('children'))
+            with self.lock:
+                self.spans.append(span)
+    
+    def summary(self) -> dict:
+        """Сводка: по этапам, по типам страниц и по СП (время пакетных страниц делится между их СП поровну)"""
+        with self.lock:
+            spans = list(self.spans)
+        
+        by_stage = {}
+        by_page_type = {}
+        by_sp = {}
+        for span in spans:
+            self_time = span['self_time']
+            by_stage.setdefault(span['stage'], []).append(self_time)
+            if span['page_type']:
+                by_page_type.setdefault(span['page_type'], {}).setdefault(span['stage'], []).append(self_time)
+            for sp_id in span['sp_ids']:
+                sp_stages = by_sp.setdefault(sp_id, {})
+                sp_stages[span['stage']] = sp_stages.get(span['stage'], 0.0) + self_time / len(span['sp_ids'])
+        
+        sps = {
+            str(sp_id): {'seconds': round(sum(stages.values()), 4), 'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()}}
+            for sp_id, stages in by_sp.items()
+        }
+        return {
+            'wall_seconds': round(time.perf_counter() - self.started, 3),
+            'stages': {stage: timing_stats(values) for stage, values in by_stage.items()},
+            'page_types': {
+                page_type: {stage: timing_stats(values) for stage, values in stages.items()}
+                for page_type, stages in by_page_type.items()
+            },
+            'sps': sps,
+            'slowest_sps': sorted(sps, key=lambda sp_id: sps[sp_id]['seconds'], reverse=True)[:10],
+        }
+    
+    def write(self, path: str, extra: dict = None) -> dict:
+        summary = dict(extra or {}, **self.summary())
+        write_file_atomic(path, json.dumps(summary, ensure_ascii=False, indent=2))
+        return summary
+    
+    def trace_events(self, sp_names: dict = None) -> dict:
+        """Замеры в формате Chrome trace_event (chrome://tracing, ui.perfetto.dev).
+        
+        Каждый поток (вкладка, запись отчетов) - отдельная дорожка, каждый
+        интервал - срез с адресом и числом строк в args. Для каждого СП
+        добавляется асинхронный срез от первой загруженной страницы до записи
+        отчета, чтобы были видны отстающие СП.
+        """
+        sp_names = sp_names or {}
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span['start'])
+        
+        thread_ids = {}
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': 'PP-Parser'}}]
+        sp_bounds = {}
+        for span in spans:
+            thread = span['thread']
+            if thread not in thread_ids:
+                thread_ids[thread] = len(thread_ids) + 1
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': thread_ids[thread], 'args': {'name': thread}})
             
-            rows = table.find_elements(By.TAG_NAME, "tr")
-            if len(rows) > 1:
-                data_cells = table.find_elements(By.TAG_NAME, "td")
-                if len(data_cells) > 0:
-                    return True
+            name = span['stage']
+            if span['stage'] == 'page':
+                name = f"{span['page_type']}: " + ", ".join(str(sp_id) for sp_id in span['sp_ids'])
+            args = dict(span['args'], sp_ids=span['sp_ids'])
+            if span['page_type']:
+                args['page_type'] = span['page_type']
             
-            header_cells = table.find_elements(By.TAG_NAME, "th")
-            if len(header_cells) > 5:
-                return False
+            start_us = span['start'] * 1_000_000
+            end_us = start_us + span['duration'] * 1_000_000
+            events.append({
+                'name': name, 'cat': span['stage'], 'ph': 'X', 'pid': 1, 'tid': thread_ids[thread],
+                'ts': round(start_us, 1), 'dur': round(span['duration'] * 1_000_000, 1), 'args': args,
+            })
             
-        except Exception:
-            pass
+            for sp_id in span['sp_ids']:
+                bounds = sp_bounds.setdefault(sp_id, [start_us, end_us])
+                bounds[0] = min(bounds[0], start_us)
+                bounds[1] = max(bounds[1], end_us)
+        
+        for sp_id, (start_us, end_us) in sorted(sp_bounds.items(), key=lambda item: item[1][0]):
+            name = f"СП {sp_id} {sp_names.get(sp_id, '')}".strip()
+            common = {'name': name, 'cat': 'sp', 'pid': 1, 'tid': 0, 'id': sp_id}
+            events.append(dict(common, ph='b', ts=round(start_us, 1)))
+            events.append(dict(common, ph='e', ts=round(end_us, 1)))
+        
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'started_at': self.started_wall}}
+    
+    def write_trace(self, path: str, sp_names: dict = None):
+        write_file_atomic(path, json.dumps(self.trace_events(sp_names), ensure_ascii=False))
+    
+    def log_summary(self, summary: dict, log_func):
+        stages = summary['stages']
+        total = sum(stats['total'] for stats in stages.values())
+        if not total:
+            return
+        
+        log_func(f"⏱️ Профиль запуска ({summary['wall_seconds']:.1f} с, время этапов суммарно по вкладкам):")
+        for stage, stats in sorted(stages.items(), key=lambda item: item[1]['total'], reverse=True):
+            title = self.STAGE_TITLES.get(stage, stage)
+            log_func(f"   {title}: {stats['total']:.1f} с ({stats['total'] / total * 100:.0f}%), "
+                     f"p50 {stats['p50']:.2f} с, p95 {stats['p95']:.2f} с, макс {stats['max']:.2f} с, n={stats['count']}")
+
+def profile_span(profiler, stage: str, **kwargs):
+    """profiler.span(...) или пустой контекст, если замеры не ведутся"""
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.span(stage, **kwargs)
+
+def normalize_cache_url(url: str) -> str:
+    """Ключ кэша: одинаковые запросы с разным порядком параметров дают один адрес"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+class PageCache:
+    """Кэш таблиц servicedesk на диске (SQLite в папке cache) со сроком жизни по типу страницы"""
+    
+    def __init__(self, path: str = None, ttls: dict = None, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttls = ttls if ttls is not None else PAGE_CACHE_TTLS
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.connection = None
+        self.total_bytes = 0
+    
+    def open(self):
+        if self.connection is not None:
+            return self.connection
+        
+        import sqlite3
+        path = self.path or get_data_path(os.path.join("cache", "pages.db"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    page_type TEXT,
+                    created_at REAL,
+                    accessed_at REAL,
+                    state TEXT,
+                    has_next INTEGER,
+                    size INTEGER,
+                    body BLOB
+                )
+            """)
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        return self.connection
+    
+    def get(self, url: str, page_type: str):
+        """{'state', 'html', 'has_next', 'age'} или None, если страницы нет или она устарела"""
+        ttl = self.ttls.get(page_type)
+        if not self.enabled or not ttl:
+            return None
+        
+        key = normalize_cache_url(url)
+        now = time.time()
+        with self.lock:
+            connection = self.open()
+            row = connection.execute(
+                "SELECT created_at, state, has_next, body, size FROM pages WHERE url = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            
+            created_at, state, has_next, body, size = row
+            with connection:
+                if now - created_at > ttl:
+                    connection.execute("DELETE FROM pages WHERE url = ?", (key,))
+                    self.total_bytes -= size
+                    return None
+                connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, key))
+        
+        return {
+            'state': state,
+            'html': zlib.decompress(body).decode('utf-8') if body else None,
+            'has_next': None if has_next is None else bool(has_next),
+            'age': now - created_at,
+        }
+    
+    def put(self, url: str, page_type: str, page: dict):
+        if not self.enabled or not self.ttls.get(page_type):
+            return
+        if page['state'] not in (TABLE_STATE_DATA, TABLE_STATE_EMPTY):
+            return
         
-        time.sleep(1)
+        body = zlib.compress(page['html'].encode('utf-8')) if page['html'] else b""
+        has_next = None if page['has_next'] is None else int(page['has_next'])
+        key = normalize_cache_url(url)
+        now = time.time()
+        
+        with self.lock:
+            connection = self.open()
+            with connection:
+                previous = connection.execute("SELECT size FROM pages WHERE url = ?", (key,)).fetchone()
+                if previous:
+                    self.total_bytes -= previous[0]
+                connection.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, page_type, now, now, page['state'], has_next, len(body), body)
+                )
+                self.total_bytes += len(body)
+                self.evict(connection)
+    
+    def evict(self, connection):
+        """Удалять самые давно читавшиеся страницы, пока кэш больше max_bytes"""
+        while self.total_bytes > self.max_bytes:
+            rows = connection.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT 50").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                connection.execute("DELETE FROM pages WHERE url = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
     
-    return False
+    def clear(self):
+        with self.lock:
+            connection = self.open()
+            with connection:
+                connection.execute("DELETE FROM pages")
+            self.total_bytes = 0
 
-def get_current_page_html(driver):
-    try:
-        if wait_for_table_loaded(driver):
-            return driver.page_source
-        else:
-            return driver.page_source
-    except Exception as e:
-        return None
+PAGE_CACHE = PageCache()
+
+def window_cache_type(time_params: dict, time_type: str):
+    """Тип кэша для страницы с периодом time_type, None - период "до сейчас" (пустой to_date)"""
+    # Адрес такой страницы не меняется, а данные за период растут - кэш отдавал бы устаревшие
+    return time_type if time_params[time_type]['to_date'] else None
+
+def load_table_page(driver, url: str, cache_type: str, log_func):
+    """Страница таблицы из кэша или из браузера (см. get_current_page).
+    
+    Кэш пропускается для драйверов с pp_cache_refresh = True ("обновить
+    кэш"), но свежие страницы все равно в него записываются. Возраст самой
+    старой взятой из кэша страницы копится в driver.pp_cache_age.
+    """
+    profiler = getattr(driver, 'pp_profiler', None)
+    
+    if cache_type and PAGE_CACHE.enabled and not getattr(driver, 'pp_cache_refresh', False):
+        try:
+            with profile_span(profiler, 'cache', url=url):
+                cached = PAGE_CACHE.get(url, cache_type)
+        except Exception as e:
+            log_func(f"⚠️ Кэш страниц недоступен: {str(e)}")
+            PAGE_CACHE.enabled = False
+            cached = None
+        if cached:
+            log_func(f"📦 Страница взята из кэша (загружена {cached['age']:.0f} с назад)")
+            driver.pp_cache_age = max(cached['age'], getattr(driver, 'pp_cache_age', None) or 0)
+            return cached
+    
+    with profile_span(profiler, 'navigate', url=url):
+        driver.get(url)
+    with profile_span(profiler, 'wait', url=url) as span_args:
+        page_result = get_current_page(driver, log_func)
+        if page_result is not None:
+            span_args['state'] = page_result['state']
+            span_args['bytes'] = len(page_result['html'] or "")
+    
+    if cache_type and page_result is not None:
+        try:
+            PAGE_CACHE.put(url, cache_type, page_result)
+        except Exception as e:
+            log_func(f"⚠️ Не удалось сохранить страницу в кэш: {str(e)}")
+    
+    return page_result
+
+def iter_table_rows(driver, build_page_url, log_func, lines_per_page: int = MAX_LINES_PER_PAGE,
+                    max_pages: int = MAX_TABLE_PAGES, cache_type: str = None):
+    """Построчно отдать таблицу со всех страниц выдачи.
+    
+    build_page_url(page) строит адрес нужной страницы. Следующая страница
+    загружается только когда потребитель дочитал текущую, поэтому парсер может
+    прекратить чтение, как только получил все нужные ему строки.
+    Заголовок таблицы отдается только с первой страницы.
+    С cache_type страницы берутся из PAGE_CACHE и сохраняются в него.
+    """
+    previous_signature = None
+    page_size = lines_per_page
+    
+    for page in range(1, max_pages + 1):
+        url = build_page_url(page)
+        if page > 1:
+            log_func(f"📄 Загружаю страницу {page}: {url}")
+        
+        page_result = load_table_page(driver, url, cache_type, log_func)
+        
+        if page_result is None:
+            if page == 1:
+                raise PageLoadError(url)
+            log_func(f"⚠️ Не удалось загрузить страницу {page}, данные могут быть неполными")
+            return
+        
+        if page_result['state'] == TABLE_STATE_TIMEOUT:
+            log_func(f"⚠️ Таблица на странице {page} не загрузилась, разбираем то, что есть")
+        
+        if not page_result['html']:
+            return
+        
+        with profile_span(getattr(driver, 'pp_profiler', None), 'extract', page=page) as span_args:
+            rows = extract_table_rows(page_result['html'])
+            span_args['rows'] = len(rows) if rows is not None else 0
+        if rows is None:
+            return
+        
+        if page > 1:
+            rows = [row for row in rows if not row['header']]
+        data_rows = [row for row in rows if row['tds']]
+        
+        if not data_rows:
+            if page == 1:
+                yield from rows
+            return
+        
+        # Некоторые выдачи на несуществующей странице повторяют последнюю
+        signature = (len(data_rows), data_rows[0]['cells'], data_rows[-1]['cells'])
+        if signature == previous_signature:
+            return
+        previous_signature = signature
+        
+        # Сервер может отдавать меньше строк, чем запрошено: без пагинации
+        # полной считается страница размером с первую
+        if page == 1:
+            page_size = min(lines_per_page, len(data_rows))
+        
+        yield from rows
+        
+        has_next = page_result['has_next']
+        if has_next is False or (has_next is None and len(data_rows) < page_size):
+            return
+    
+    log_func(f"⚠️ Достигнут лимит в {max_pages} страниц, дальнейшие строки пропущены")
 
 def parse_speed_data(html_content: str, sp_name: str) -> dict:
-    soup = BeautifulSoup(html_content, 'html.parser')
-    results = {
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return empty_speed_data()
+    
+    actual_sp_name = find_sp_in_table(rows, sp_name)
+    
+    return parse_speed_rows(rows, sp_name, actual_sp_name)
+
+def empty_speed_data() -> dict:
+    return {
         'total_mean_time': "0",
         'total_deals': "0",
         'arbitrage_count': "0",
         'traders': []
     }
-    
-    table = soup.find('table')
-    if not table:
-        return results
-    
-    rows = table.find_all('tr')
-    actual_sp_name = find_sp_in_table(soup, sp_name)
+
+def parse_speed_rows(rows, sp_name: str, actual_sp_name: str) -> dict:
+    results = empty_speed_data()
+    rows = list(rows)
     
     total_cells = find_total_row(rows, sp_name, actual_sp_name)
     
     if total_cells and len(total_cells) >= 7:
-        results['total_deals'] = total_cells[3].get_text(strip=True)
-        results['total_mean_time'] = total_cells[4].get_text(strip=True)
-        results['arbitrage_count'] = total_cells[5].get_text(strip=True)
+        results['total_deals'] = total_cells[3]
+        results['total_mean_time'] = total_cells[4]
+        results['arbitrage_count'] = total_cells[5]
     
     traders_dict = {}
     current_trader = None
     
     for row in rows:
-        cells = row.find_all(['td', 'th'])
+        cells = row['cells']
         
-        if len(cells) > 1 and cells[0].get_text(strip=True) == "" and "Total (" in cells[1].get_text():
-            trader_name = cells[1].get_text(strip=True).replace("Total (", "").replace(")", "")
+        if len(cells) > 1 and cells[0] == "" and "Total (" in cells[1]:
+            trader_name = cells[1].replace("Total (", "").replace(")", "")
             
             if trader_name not in traders_dict:
                 traders_dict[trader_name] = {
                     'name': trader_name,
                     'sell_time': "0",
                     'buy_time': "0", 
-                    'total_deals': cells[3].get_text(strip=True) if len(cells) > 3 else "0"
+                    'total_deals': cells[3] if len(cells) > 3 else "0"
                 }
             current_trader = trader_name
         
-        elif current_trader and len(cells) >= 7:
-            op_type = cells[2].get_text(strip=True)
-            if op_type == 'Sell':
-                traders_dict[current_trader]['sell_time'] = cells[4].get_text(strip=True)
-            elif op_type == 'Buy':
-                traders_dict[current_trader]['buy_time'] = cells[4].get_text(strip=True)
+        elif current_trader and len(cells) >= 7:
+            op_type = cells[2]
+            if op_type == 'Sell':
+                traders_dict[current_trader]['sell_time'] = cells[4]
+            elif op_type == 'Buy':
+                traders_dict[current_trader]['buy_time'] = cells[4]
+    
+    results['traders'] = list(traders_dict.values())
+    
+    return results
+
+def parse_speed_data_batch(html_content: str, sps: dict) -> dict:
+    """Разобрать страницу скорости сразу по нескольким СП.
+    
+    Возвращает {sp_id: speed_data}. СП без своей секции или с неоднозначной
+    секцией в результат не попадают - их нужно загрузить по одному.
+    """
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return {}
+    
+    return parse_speed_rows_batch(rows, sps)
+
+def parse_speed_rows_batch(rows, sps: dict) -> dict:
+    sections = split_rows_by_sp_total(rows)
+    matched, ambiguous = match_sp_sections(sections, sps)
+    
+    results = {}
+    for sp_id, sp_name in sps.items():
+        # Без своей секции СП грузится по одному: итог мог не распознаться,
+        # а нули в отчете выглядели бы как реальные данные
+        if sp_id in matched and sp_id not in ambiguous:
+            label, section_rows = matched[sp_id]
+            results[sp_id] = parse_speed_rows(section_rows, sp_name, label)
+    
+    return results
+
+def get_sp_total_label(cells):
+    """Название СП из итоговой строки вида 'Total (<СП>)' в первой колонке"""
+    if not cells:
+        return None
+    
+    first_cell = cells[0]
+    if first_cell.startswith("Total (") and first_cell.endswith(")"):
+        return first_cell[len("Total ("):-1]
+    return None
+
+def split_rows_by_sp_total(rows) -> list:
+    """Разбить строки многосписочной таблицы на секции по итоговым строкам СП.
+    
+    Итог СП может стоять как перед строками своих трейдеров, так и после них -
+    порядок определяется по первой строке с данными.
+    Возвращает список (название СП, строки секции).
+    """
+    labeled_rows = []
+    for row in rows:
+        label = get_sp_total_label(row['cells'])
+        if label is not None or row['tds']:
+            labeled_rows.append((label, row))
+    
+    if not labeled_rows:
+        return []
+    
+    leading_totals = labeled_rows[0][0] is not None
+    
+    sections = []
+    current_label = None
+    current_rows = []
+    
+    for label, row in labeled_rows:
+        if label is None:
+            current_rows.append(row)
+            continue
+        
+        if leading_totals:
+            if current_label is not None:
+                sections.append((current_label, current_rows))
+            current_label = label
+            current_rows = [row]
+        else:
+            current_rows.append(row)
+            sections.append((label, current_rows))
+            current_rows = []
     
-    results['traders'] = list(traders_dict.values())
+    if leading_totals and current_label is not None:
+        sections.append((current_label, current_rows))
     
-    return results
+    return sections
+
+def match_sp_sections(sections: list, sps: dict):
+    """Сопоставить секции таблицы с СП.
+    
+    Возвращает ({sp_id: (название, строки)}, множество неоднозначных sp_id).
+    Неоднозначными считаются СП, претендующие на одну и ту же секцию
+    (например rich_brothers|UZS и rich_brothers|KGS).
+    """
+    sections_by_label = {}
+    for label, rows in sections:
+        sections_by_label.setdefault(label, []).append(rows)
+    
+    claims = {}
+    for sp_id, sp_name in sps.items():
+        for candidate in get_sp_name_candidates(sp_name):
+            if candidate in sections_by_label:
+                claims.setdefault(candidate, []).append(sp_id)
+                break
+    
+    matched = {}
+    ambiguous = set()
+    for label, sp_ids in claims.items():
+        if len(sp_ids) == 1 and len(sections_by_label[label]) == 1:
+            matched[sp_ids[0]] = (label, sections_by_label[label][0])
+        else:
+            ambiguous.update(sp_ids)
+    
+    return matched, ambiguous
 
 def parse_ads_data(html_content: str) -> dict:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return parse_ads_rows([])
+    
+    return parse_ads_rows(rows[1:])
+
+def parse_ads_rows(rows) -> dict:
     results = {
         'sell_methods': set(),
         'buy_methods': set(),
@@ -1417,22 +1706,11 @@ def parse_ads_data(html_content: str) -> dict:
         'is_active': True
     }
     
-    table = soup.find('table')
-    if not table:
-        results['is_active'] = False
-        return results
-    
-    rows = table.find_all('tr')[1:]
-    
-    if len(rows) == 0:
-        results['is_active'] = False
-        return results
-    
     for row in rows:
-        cells = row.find_all('td')
+        cells = row['tds']
         if len(cells) >= 10:
-            op_type = cells[9].get_text(strip=True)
-            payment_method = cells[7].get_text(strip=True)
+            op_type = cells[9]
+            payment_method = cells[7]
             
             if op_type == 'Sell':
                 results['sell_methods'].add(payment_method)
@@ -1452,102 +1730,132 @@ def parse_ads_data(html_content: str) -> dict:
     return results
 
 def parse_conversion_data(html_content: str, sp_name: str) -> dict:
-    soup = BeautifulSoup(html_content, 'html.parser')
-    results = {
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return empty_conversion_data()
+    
+    actual_sp_name = find_sp_in_table(rows, sp_name)
+    
+    return parse_conversion_rows(rows, sp_name, actual_sp_name)
+
+def empty_conversion_data() -> dict:
+    return {
         'conversion_percent': "0",
         'paid_count': "0",
         'cancelled_count': "0",
         'total_count': "0"
     }
-    
-    table = soup.find('table')
-    if not table:
-        return results
-    
-    rows = table.find_all('tr')
-    actual_sp_name = find_sp_in_table(soup, sp_name)
+
+def parse_conversion_rows(rows, sp_name: str, actual_sp_name: str = None) -> dict:
+    """Итоги конверсии СП. Без actual_sp_name чтение строк прекращается на итоговой строке."""
+    results = empty_conversion_data()
     
     total_cells = find_total_row(rows, sp_name, actual_sp_name)
     
     if total_cells and len(total_cells) >= 10:
-        results['paid_count'] = total_cells[4].get_text(strip=True)
-        results['cancelled_count'] = total_cells[5].get_text(strip=True)
-        results['total_count'] = total_cells[6].get_text(strip=True)
-        results['conversion_percent'] = total_cells[9].get_text(strip=True)
+        results['paid_count'] = total_cells[4]
+        results['cancelled_count'] = total_cells[5]
+        results['total_count'] = total_cells[6]
+        results['conversion_percent'] = total_cells[9]
+    
+    return results
+
+def parse_conversion_data_batch(html_content: str, sps: dict) -> dict:
+    """Разобрать страницу конверсии сразу по нескольким СП (см. parse_speed_data_batch)"""
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return {}
+    
+    return parse_conversion_rows_batch(rows, sps)
+
+def parse_conversion_rows_batch(rows, sps: dict) -> dict:
+    sections = split_rows_by_sp_total(rows)
+    matched, ambiguous = match_sp_sections(sections, sps)
+    
+    results = {}
+    for sp_id, sp_name in sps.items():
+        if sp_id in matched and sp_id not in ambiguous:
+            label, section_rows = matched[sp_id]
+            results[sp_id] = parse_conversion_rows(section_rows, sp_name, label)
     
     return results
 
 def parse_arbitrage_data(html_content: str) -> dict:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return parse_arbitrage_rows([])
+    
+    return parse_arbitrage_rows(rows[1:])
+
+def parse_arbitrage_rows(rows) -> dict:
     results = {
         'arbitrage_count': 0,
         'arbitrage_deals': []
     }
     
-    table = soup.find('table')
-    if not table:
-        return results
-    
-    rows = table.find_all('tr')[1:]
-    
-    if len(rows) == 0:
-        return results
+    # Основной признак - строки deal-disputed, запасной - статус арбитража.
+    # Оба собираются за один проход, запасной используется только без основного.
+    disputed_deals = []
+    status_deals = []
     
-    arbitrage_rows = table.find_all('tr', class_='deal-disputed')
-    
-    for row in arbitrage_rows:
-        cells = row.find_all('td')
+    for row in rows:
+        cells = row['tds']
         
-        if len(cells) >= 10:
-            deal_data = create_deal_data(cells)
-            results['arbitrage_deals'].append(deal_data)
-            results['arbitrage_count'] += 1
-    
-    if results['arbitrage_count'] == 0:
-        all_rows = table.find_all('tr')[1:]
-        
-        for row in all_rows:
-            cells = row.find_all('td')
-            if len(cells) > 15:
-                status = cells[15].get_text(strip=True)
-                if 'arbitration' in status.lower():
-                    deal_data = create_deal_data(cells)
-                    results['arbitrage_deals'].append(deal_data)
-                    results['arbitrage_count'] += 1
+        if len(cells) >= 10 and 'deal-disputed' in row['classes']:
+            disputed_deals.append(create_deal_data(row))
+        
+        if len(cells) > 15 and 'arbitration' in cells[15].lower():
+            status_deals.append(create_deal_data(row))
+    
+    results['arbitrage_deals'] = disputed_deals or status_deals
+    results['arbitrage_count'] = len(results['arbitrage_deals'])
     
     return results
 
 def parse_bank_statements_data(html_content: str) -> dict:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    rows = extract_table_rows(html_content)
+    if rows is None:
+        return parse_bank_statements_rows([])
+    
+    return parse_bank_statements_rows(rows[1:])
+
+def parse_bank_statements_rows(rows, lookback_days: int = None) -> dict:
+    """Последние выписки по трейдерам.
+    
+    Выдача отсортирована от новых к старым, поэтому с lookback_days чтение
+    прекращается на первой выписке, которая старше самой свежей более чем
+    на lookback_days дней - следующие страницы уже не загружаются.
+    Трейдеры, у которых все выписки старше, в результат не попадают, поэтому
+    граница записывается в cutoff_date и выводится в отчете.
+    """
     results = {
         'trader_dates': {},
-        'latest_overall': None
+        'latest_overall': None,
+        'cutoff_date': None
     }
     
-    table = soup.find('table')
-    if not table:
-        return results
-    
-    rows = table.find_all('tr')[1:]
-    
     for row in rows:
-        cells = row.find_all('td')
+        cells = row['tds']
         if len(cells) >= 10:
-            trader = cells[3].get_text(strip=True)
-            date_str = cells[9].get_text(strip=True)
+            trader = cells[3]
+            date_str = cells[9]
             
             try:
                 date_only = date_str.split(' ')[0]
                 date_obj = datetime.datetime.strptime(date_only, "%d.%m.%Y").date()
-                
-                if trader not in results['trader_dates'] or date_obj > results['trader_dates'][trader]:
-                    results['trader_dates'][trader] = date_obj
-                    
-                if not results['latest_overall'] or date_obj > results['latest_overall']:
-                    results['latest_overall'] = date_obj
-                    
             except (ValueError, IndexError):
                 continue
+            
+            if (lookback_days is not None and results['latest_overall']
+                    and (results['latest_overall'] - date_obj).days > lookback_days):
+                results['cutoff_date'] = results['latest_overall'] - datetime.timedelta(days=lookback_days)
+                break
+            
+            if trader not in results['trader_dates'] or date_obj > results['trader_dates'][trader]:
+                results['trader_dates'][trader] = date_obj
+                
+            if not results['latest_overall'] or date_obj > results['latest_overall']:
+                results['latest_overall'] = date_obj
     
     return results
 
@@ -1562,7 +1870,10 @@ def format_bank_statements_info(bank_data: dict) -> str:
         date_str = date.strftime("%d.%m.%Y")
         formatted.append(f"{trader} - {date_str}")
     
-    return ", ".join(formatted)
+    info = ", ".join(formatted)
+    if bank_data.get('cutoff_date'):
+        info += f" (выписки раньше {bank_data['cutoff_date'].strftime('%d.%m.%Y')} не проверялись)"
+    return info
 
 def generate_report(sp_name: str, speed_data: dict, ads_data: dict, conversion_data: dict, arbitrage_data: dict, bank_data: dict, auto_no_incidents: bool) -> str:
     report = []
@@ -1570,6 +1881,14 @@ def generate_report(sp_name: str, speed_data: dict, ads_data: dict, conversion_d
     report.append(f"Отчет по СП: {sp_name}")
     report.append("=" * 50)
     
+    cached_pages = []
+    for title, page_data in (("скорость", speed_data), ("объявления", ads_data), ("конверсия", conversion_data),
+                             ("арбитражи", arbitrage_data), ("выписки", bank_data)):
+        if page_data.get('cache_age') is not None:
+            cached_pages.append(f"{title} ({page_data['cache_age'] / 60:.0f} мин. назад)")
+    if cached_pages:
+        report.append(f"Из кэша страниц: {', '.join(cached_pages)}")
+    
     report.append(f"1. Скорость:")
     report.append(f"- Общая: {speed_data['total_mean_time']} мин. ({speed_data['total_deals']} сделок)")
     
@@ -1626,54 +1945,295 @@ def generate_report(sp_name: str, speed_data: dict, ads_data: dict, conversion_d
     
     return "\n".join(report)
 
-def save_report_to_txt(sp_name: str, report: str):
+def report_filename(sp_name: str) -> str:
     safe_name = "".join(c for c in sp_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-    filename = f"{safe_name}.txt"
+    return f"{safe_name}.txt"
+
+def make_reports_folder(now: datetime.datetime = None) -> str:
+    """Создать REPORTS/reports_ГГГГММДД_ЧЧММСС. Запуски в одну и ту же секунду получают разные папки."""
+    now = now or datetime.datetime.now()
+    base_path = os.path.join(REPORTS_ROOT, f"reports_{now.strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(REPORTS_ROOT, exist_ok=True)
+    
+    path = base_path
+    suffix = 1
+    while True:
+        try:
+            os.makedirs(path)
+            return path
+        except FileExistsError:
+            suffix += 1
+            path = f"{base_path}_{suffix}"
+
+def json_default(value):
+    """Даты выписок и множества методов оплаты в JSON"""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    raise TypeError(f"{type(value).__name__} не сериализуется в JSON")
+
+def dump_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+def make_sp_record(run_id: str, sp_id: int, sp_name: str, sp_data: dict, report_path: str) -> dict:
+    """Запись сводного файла: данные всех страниц СП как есть"""
+    record = {
+        'run_id': run_id,
+        'sp_id': sp_id,
+        'sp_name': sp_name,
+        'finished_at': datetime.datetime.now().strftime(TIME_FORMAT),
+        'report': report_path,
+    }
+    for page_type in PAGE_FETCHERS:
+        record[page_type] = sp_data.get(page_type, {})
+    return record
+
+# Колонки results.csv. Заголовок один на файл, поэтому набор колонок не зависит от того,
+# какие поля оказались у первого СП; поля, которых здесь нет, попадают в колонку extra
+RESULTS_CSV_FIELDS = [
+    'run_id', 'sp_id', 'sp_name', 'finished_at', 'report',
+    'speed_total_mean_time', 'speed_total_deals', 'speed_arbitrage_count', 'speed_traders',
+    'ads_sell_methods', 'ads_buy_methods', 'ads_sell_count', 'ads_buy_count', 'ads_ads_count', 'ads_is_active',
+    'conversion_conversion_percent', 'conversion_paid_count', 'conversion_cancelled_count', 'conversion_total_count',
+    'arbitrage_arbitrage_count', 'arbitrage_arbitrage_deals',
+    'bank_trader_dates', 'bank_latest_overall', 'bank_cutoff_date',
+    'speed_cache_age', 'ads_cache_age', 'conversion_cache_age', 'arbitrage_cache_age', 'bank_cache_age',
+    'extra',
+]
+
+def flatten_sp_record(record: dict) -> dict:
+    """Строка CSV: простые значения страниц - в колонки '<страница>_<поле>', списки и словари - JSON в ячейке"""
+    row = {key: value for key, value in record.items() if key not in PAGE_FETCHERS}
+    for page_type in PAGE_FETCHERS:
+        for key, value in record[page_type].items():
+            if isinstance(value, (list, dict, set)):
+                value = dump_json(value)
+            elif isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            row[f"{page_type}_{key}"] = value
+    
+    extra = {key: row.pop(key) for key in list(row) if key not in RESULTS_CSV_FIELDS}
+    if extra:
+        row['extra'] = dump_json(extra)
+    return row
+
+class ReportWriter:
+    """Запись отчетов и сводного файла одного запуска в свою папку через отдельный поток"""
+    
+    def __init__(self, output_dir: str, log_func=print, results_format: str = 'jsonl',
+                 sqlite_path: str = None, run_id: str = None, history_path: str = None, time_params: dict = None):
+        if results_format is not None and results_format not in RESULTS_FORMATS:
+            raise ValueError(f"Неизвестный формат сводного файла: {results_format}")
+        
+        self.output_dir = os.path.abspath(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.log_func = log_func
+        self.results_format = results_format
+        self.results_path = os.path.join(self.output_dir, f"results.{results_format}") if results_format else None
+        self.sqlite_path = os.path.abspath(sqlite_path) if sqlite_path else None
+        self.run_id = run_id or os.path.basename(self.output_dir)
+        self.history_path = os.path.abspath(history_path) if history_path else None
+        self.time_params = time_params or {}
+        self.started_at = datetime.datetime.now().strftime(TIME_FORMAT)
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        # Путь -> текст ошибки для отчетов, которые не удалось записать
+        self.errors = {}
+        
+        # Используются только в потоке записи
+        self.results_file = None
+        self.csv_writer = None
+        self.connection = None
+        self.history = None
+        # RunProfiler запуска, если ведутся замеры (выставляет SPJobRunner)
+        self.profiler = None
+    
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="report-writer", daemon=True)
+                self.thread.start()
+    
+    def write(self, sp_name: str, report: str) -> str:
+        path = os.path.join(self.output_dir, report_filename(sp_name))
+        self.start()
+        self.jobs.put(('report', (path, report)))
+        return path
+    
+    def call(self, func):
+        """Выполнить func в потоке записи после всех заданий, поставленных до нее"""
+        self.start()
+        self.jobs.put(('call', func))
+    
+    def write_results(self, sp_id: int, sp_name: str, sp_data: dict, report_path: str):
+        if not self.results_path and not self.sqlite_path and not self.history_path:
+            return
+        record = make_sp_record(self.run_id, sp_id, sp_name, sp_data, report_path)
+        self.start()
+        self.jobs.put(('results', record))
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(report)
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    self.close_outputs()
+                    return
+                kind, payload = job
+                if kind == 'report':
+                    self.write_report_file(*payload)
+                elif kind == 'call':
+                    payload()
+                else:
+                    self.write_record(payload)
+            finally:
+                self.jobs.task_done()
     
-    return filename
-
-def process_single_sp_gui(driver, sp_id: int, sp_name: str, time_params: dict, log_func, auto_no_incidents: bool):
-    log_func(f"🔗 Обрабатываем {sp_name} (ID {sp_id})")
+    def write_report_file(self, path: str, report: str):
+        try:
+            with profile_span(self.profiler, 'write', path=path):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(report)
+        except Exception as e:
+            with self.lock:
+                self.errors[path] = str(e)
+            self.log_func(f"❌ Не удалось сохранить отчет {os.path.basename(path)}: {str(e)}")
+            return
+        
+        self.log_func(f"💾 Отчет сохранен в файл: {os.path.basename(path)}")
     
-    speed_url = build_speed_url(time_params, [sp_id])
-    log_func(f"📊 Страница скорости: {speed_url}")
+    def write_record(self, record: dict):
+        if self.results_path:
+            try:
+                self.append_results_file(record)
+            except Exception as e:
+                self.log_func(f"❌ Не удалось дописать {os.path.basename(self.results_path)}: {str(e)}")
+        
+        if self.sqlite_path:
+            try:
+                self.insert_sqlite(record)
+            except Exception as e:
+                self.log_func(f"❌ Не удалось записать данные СП {record['sp_id']} в {self.sqlite_path}: {str(e)}")
+        
+        if self.history_path:
+            try:
+                if self.history is None:
+                    self.history = HistoryStore(self.history_path)
+                    self.history.add_run(self.run_id, self.started_at, self.time_params, self.output_dir)
+                self.history.add_sp(record, self.time_params)
+            except Exception as e:
+                self.log_func(f"❌ Не удалось добавить СП {record['sp_id']} в историю: {str(e)}")
+    
+    def append_results_file(self, record: dict):
+        if self.results_format == 'jsonl':
+            if self.results_file is None:
+                self.results_file = open(self.results_path, 'a', encoding='utf-8')
+            self.results_file.write(dump_json(record) + "\n")
+        else:
+            row = flatten_sp_record(record)
+            if self.results_file is None:
+                new_file = not os.path.exists(self.results_path) or os.path.getsize(self.results_path) == 0
+                # utf-8-sig - чтобы Excel правильно открыл кириллицу
+                self.results_file = open(self.results_path, 'a', encoding='utf-8-sig' if new_file else 'utf-8', newline='')
+                self.csv_writer = csv.DictWriter(self.results_file, fieldnames=RESULTS_CSV_FIELDS)
+                if new_file:
+                    self.csv_writer.writeheader()
+            self.csv_writer.writerow(row)
+        
+        # Строка должна быть на диске сразу: сводный файл читают, не дожидаясь конца запуска
+        self.results_file.flush()
+    
+    def insert_sqlite(self, record: dict):
+        if self.connection is None:
+            import sqlite3
+            self.connection = sqlite3.connect(self.sqlite_path)
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS sp_results (
+                    run_id TEXT NOT NULL,
+                    sp_id INTEGER NOT NULL,
+                    sp_name TEXT,
+                    finished_at TEXT,
+                    report TEXT,
+                    speed TEXT,
+                    ads TEXT,
+                    conversion TEXT,
+                    arbitrage TEXT,
+                    bank TEXT,
+                    PRIMARY KEY (run_id, sp_id)
+                )
+            """)
+        
+        columns = ['run_id', 'sp_id', 'sp_name', 'finished_at', 'report'] + list(PAGE_FETCHERS)
+        values = [record[column] if column not in PAGE_FETCHERS else dump_json(record[column]) for column in columns]
+        with self.connection:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO sp_results ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values
+            )
     
-    log_func("🌐 Открываю страницу скорости...")
-    driver.get(speed_url)
+    def close_outputs(self):
+        if self.results_file is not None:
+            self.results_file.close()
+            self.results_file = None
+            self.csv_writer = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+    
+    def flush(self):
+        self.jobs.join()
+    
+    def close(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.jobs.put(None)
+            thread.join()
 
-    speed_html = get_current_page_html(driver)
-    speed_data = {}
+def fetch_speed_data(driver, sp_id: int, sp_name: str, time_params: dict, log_func) -> dict:
+    speed_url = build_speed_url(time_params, [sp_id], MAX_LINES_PER_PAGE)
+    log_func(f"📊 Страница скорости: {speed_url}")
     
-    if speed_html:
-        speed_data = parse_speed_data(speed_html, sp_name)
-        log_func(f"✅ Данные скорости получены: {speed_data['total_deals']} сделок, время: {speed_data['total_mean_time']} мин.")
-        log_func(f"👥 Найдено трейдеров: {len(speed_data['traders'])}")
-    else:
+    log_func("🌐 Открываю страницу скорости...")
+    try:
+        rows = list(iter_table_rows(
+            driver,
+            lambda page: build_speed_url(time_params, [sp_id], MAX_LINES_PER_PAGE, page),
+            log_func,
+            cache_type=window_cache_type(time_params, 'speed')
+        ))
+    except PageLoadError:
         log_func("❌ Не удалось получить данные скорости")
-        speed_data = {'total_mean_time': '0', 'total_deals': '0', 'arbitrage_count': '0', 'traders': []}
+        return empty_speed_data()
+    
+    with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+        speed_data = parse_speed_rows(rows, sp_name, find_sp_in_table(rows, sp_name))
+    log_func(f"✅ Данные скорости получены: {speed_data['total_deals']} сделок, время: {speed_data['total_mean_time']} мин.")
+    log_func(f"👥 Найдено трейдеров: {len(speed_data['traders'])}")
     
-    ads_url = build_ads_url(sp_id)
+    return speed_data
+
+def fetch_ads_data(driver, sp_id: int, sp_name: str, time_params: dict, log_func) -> dict:
+    ads_url = build_ads_url(sp_id, MAX_LINES_PER_PAGE)
     log_func(f"📋 Страница объявлений: {ads_url}")
     
     log_func("🌐 Открываю страницу объявлений...")
-    driver.get(ads_url)
-
-    ads_html = get_current_page_html(driver)
-    ads_data = {}
-
-    if ads_html:
-        ads_data = parse_ads_data(ads_html)
-        if not ads_data['is_active']:
-            log_func("❌ СП НЕ АКТИВЕН - объявлений не найдено")
-        else:
-            log_func(f"✅ Данные объявлений получены: {ads_data['ads_count']} объявлений")
-            log_func(f"📊 Sell объявлений: {ads_data['sell_count']}, Buy объявлений: {ads_data['buy_count']}")
-    else:
+    try:
+        with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+            ads_data = parse_ads_rows(iter_table_rows(
+                driver,
+                lambda page: build_ads_url(sp_id, MAX_LINES_PER_PAGE, page),
+                log_func,
+                cache_type='ads'
+            ))
+    except PageLoadError:
         log_func("❌ Не удалось получить данные объявлений")
-        ads_data = {
+        return {
             'sell_methods': [], 
             'buy_methods': [], 
             'sell_count': 0, 
@@ -1682,66 +2242,1131 @@ def process_single_sp_gui(driver, sp_id: int, sp_name: str, time_params: dict, l
             'is_active': False
         }
     
-    conversion_url = build_conversion_url(time_params, [sp_id])
-    log_func(f"📈 Страница конверсии: {conversion_url}")
+    if not ads_data['is_active']:
+        log_func("❌ СП НЕ АКТИВЕН - объявлений не найдено")
+    else:
+        log_func(f"✅ Данные объявлений получены: {ads_data['ads_count']} объявлений")
+        log_func(f"📊 Sell объявлений: {ads_data['sell_count']}, Buy объявлений: {ads_data['buy_count']}")
     
-    log_func("🌐 Открываю страницу конверсии...")
-    driver.get(conversion_url)
+    return ads_data
 
-    conversion_html = get_current_page_html(driver)
-    conversion_data = {}
+def fetch_conversion_data(driver, sp_id: int, sp_name: str, time_params: dict, log_func) -> dict:
+    conversion_url = build_conversion_url(time_params, [sp_id], MAX_LINES_PER_PAGE)
+    log_func(f"📈 Страница конверсии: {conversion_url}")
     
-    if conversion_html:
-        conversion_data = parse_conversion_data(conversion_html, sp_name)
-        log_func(f"✅ Данные конверсии получены: {conversion_data['conversion_percent']}%")
-    else:
+    log_func("🌐 Открываю страницу конверсии...")
+    try:
+        # Нужна только итоговая строка СП - дальше страницы не листаем
+        with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+            conversion_data = parse_conversion_rows(iter_table_rows(
+                driver,
+                lambda page: build_conversion_url(time_params, [sp_id], MAX_LINES_PER_PAGE, page),
+                log_func,
+                cache_type=window_cache_type(time_params, 'conversion')
+            ), sp_name)
+    except PageLoadError:
         log_func("❌ Не удалось получить данные конверсии")
-        conversion_data = {'conversion_percent': '0', 'paid_count': '0', 'cancelled_count': '0', 'total_count': '0'}
+        return empty_conversion_data()
     
-    arbitrage_url = build_arbitrage_url(time_params, sp_id)
-    log_func(f"⚖️ Страница арбитражей: {arbitrage_url}")
+    log_func(f"✅ Данные конверсии получены: {conversion_data['conversion_percent']}%")
     
-    log_func("🌐 Открываю страницу арбитражей...")
-    driver.get(arbitrage_url)
+    return conversion_data
 
-    arbitrage_html = get_current_page_html(driver)
-    arbitrage_data = {}
+def fetch_arbitrage_data(driver, sp_id: int, sp_name: str, time_params: dict, log_func) -> dict:
+    arbitrage_url = build_arbitrage_url(time_params, sp_id, MAX_LINES_PER_PAGE)
+    log_func(f"⚖️ Страница арбитражей: {arbitrage_url}")
     
-    if arbitrage_html:
-        arbitrage_data = parse_arbitrage_data(arbitrage_html)
-        log_func(f"✅ Данные арбитражей получены: {arbitrage_data['arbitrage_count']} сделок")
-    else:
+    log_func("🌐 Открываю страницу арбитражей...")
+    try:
+        with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+            arbitrage_data = parse_arbitrage_rows(iter_table_rows(
+                driver,
+                lambda page: build_arbitrage_url(time_params, sp_id, MAX_LINES_PER_PAGE, page),
+                log_func,
+                cache_type=window_cache_type(time_params, 'arbitrage')
+            ))
+    except PageLoadError:
         log_func("❌ Не удалось получить данные арбитражей")
-        arbitrage_data = {'arbitrage_count': 0, 'arbitrage_deals': []}
+        return {'arbitrage_count': 0, 'arbitrage_deals': []}
     
-    bank_statements_url = build_bank_statements_url(sp_id)
+    log_func(f"✅ Данные арбитражей получены: {arbitrage_data['arbitrage_count']} сделок")
+    
+    return arbitrage_data
+
+def fetch_bank_statements_data(driver, sp_id: int, sp_name: str, time_params: dict, log_func) -> dict:
+    bank_statements_url = build_bank_statements_url(sp_id, MAX_LINES_PER_PAGE)
     log_func(f"🏦 Страница банковских выписок: {bank_statements_url}")
     
     log_func("🌐 Открываю страницу банковских выписок...")
-    driver.get(bank_statements_url)
+    try:
+        with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+            bank_data = parse_bank_statements_rows(iter_table_rows(
+                driver,
+                lambda page: build_bank_statements_url(sp_id, MAX_LINES_PER_PAGE, page),
+                log_func,
+                cache_type='bank'
+            ), BANK_STATEMENTS_LOOKBACK_DAYS)
+    except PageLoadError:
+        log_func("❌ Не удалось получить данные банковских выписок")
+        return {'trader_dates': {}, 'latest_overall': None, 'cutoff_date': None}
+    
+    bank_info = format_bank_statements_info(bank_data)
+    log_func(f"✅ Данные выписок получены: {len(bank_data['trader_dates'])} трейдеров")
+    if bank_data['cutoff_date']:
+        log_func(f"⚠️ Выписки старше {bank_data['cutoff_date'].strftime('%d.%m.%Y')} не читались: "
+                 f"трейдеры, у которых нет более свежих выписок, в отчет не попали")
+    log_func(f"📅 Информация о выписках: {bank_info}")
+    
+    return bank_data
+
+PAGE_FETCHERS = {
+    'speed': fetch_speed_data,
+    'ads': fetch_ads_data,
+    'conversion': fetch_conversion_data,
+    'arbitrage': fetch_arbitrage_data,
+    'bank': fetch_bank_statements_data,
+}
+
+def fetch_speed_batch(driver, sps: dict, time_params: dict, log_func) -> dict:
+    """Загрузить одну страницу скорости на группу СП.
+    
+    Возвращает {sp_id: speed_data}; СП без однозначной секции в ответе нет.
+    """
+    sp_ids = list(sps.keys())
+    speed_url = build_speed_url(time_params, sp_ids, MAX_LINES_PER_PAGE)
+    log_func(f"📊 Пакетная страница скорости ({len(sps)} СП): {speed_url}")
+    
+    log_func("🌐 Открываю пакетную страницу скорости...")
+    try:
+        rows = list(iter_table_rows(
+            driver,
+            lambda page: build_speed_url(time_params, sp_ids, MAX_LINES_PER_PAGE, page),
+            log_func,
+            cache_type=window_cache_type(time_params, 'speed')
+        ))
+    except PageLoadError:
+        log_func("❌ Не удалось получить пакетные данные скорости")
+        return {}
+    
+    with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+        results = parse_speed_rows_batch(rows, sps)
+    log_func(f"✅ Пакетные данные скорости получены: {len(results)} из {len(sps)} СП")
+    return results
+
+def fetch_conversion_batch(driver, sps: dict, time_params: dict, log_func) -> dict:
+    """Загрузить одну страницу конверсии на группу СП (см. fetch_speed_batch)"""
+    sp_ids = list(sps.keys())
+    conversion_url = build_conversion_url(time_params, sp_ids, MAX_LINES_PER_PAGE)
+    log_func(f"📈 Пакетная страница конверсии ({len(sps)} СП): {conversion_url}")
+    
+    log_func("🌐 Открываю пакетную страницу конверсии...")
+    try:
+        rows = list(iter_table_rows(
+            driver,
+            lambda page: build_conversion_url(time_params, sp_ids, MAX_LINES_PER_PAGE, page),
+            log_func,
+            cache_type=window_cache_type(time_params, 'conversion')
+        ))
+    except PageLoadError:
+        log_func("❌ Не удалось получить пакетные данные конверсии")
+        return {}
+    
+    with profile_span(getattr(driver, 'pp_profiler', None), 'parse'):
+        results = parse_conversion_rows_batch(rows, sps)
+    log_func(f"✅ Пакетные данные конверсии получены: {len(results)} из {len(sps)} СП")
+    return results
+
+def chunk_sps(sps: dict, chunk_size: int) -> list:
+    items = list(sps.items())
+    chunk_size = max(1, chunk_size)
+    return [dict(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+
+def parse_number(value):
+    """Число из ячейки servicedesk ('91.84%', '1 234', '5,5'), None если это не число"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).replace('%', '').replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+class HistoryStore:
+    """История показателей СП по всем запускам в SQLite.
+    
+    Таблицы:
+        runs            - запуск и его периоды
+        sp_metrics      - итоги СП за запуск; measured_at - конец периода
+                          скорости (или время запуска, если конец не задан)
+        trader_metrics  - время Sell/Buy и сделки трейдеров
+        bank_dates      - последняя выписка трейдера
+    
+    Числа хранятся числами, поэтому сравнение периодов считается одним
+    запросом по индексу (sp_id, measured_at), без перечитывания отчетов.
+    """
+    
+    # Показатели, по которым можно строить тренды (колонки sp_metrics)
+    TREND_METRICS = ('conversion_percent', 'total_mean_time', 'total_deals', 'arbitrage_count', 'disputed_count', 'ads_count')
+    
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        import sqlite3
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at TEXT,
+                    speed_from TEXT, speed_to TEXT,
+                    conversion_from TEXT, conversion_to TEXT,
+                    arbitrage_from TEXT, arbitrage_to TEXT,
+                    output_dir TEXT
+                );
+                CREATE TABLE IF NOT EXISTS sp_metrics (
+                    run_id TEXT NOT NULL,
+                    sp_id INTEGER NOT NULL,
+                    sp_name TEXT,
+                    measured_at TEXT NOT NULL,
+                    window_from TEXT,
+                    total_mean_time REAL,
+                    total_deals INTEGER,
+                    arbitrage_count INTEGER,
+                    conversion_percent REAL,
+                    paid_count INTEGER,
+                    cancelled_count INTEGER,
+                    total_count INTEGER,
+                    ads_count INTEGER,
+                    disputed_count INTEGER,
+                    bank_latest TEXT,
+                    PRIMARY KEY (run_id, sp_id)
+                );
+                CREATE INDEX IF NOT EXISTS sp_metrics_sp_time ON sp_metrics (sp_id, measured_at);
+                CREATE INDEX IF NOT EXISTS sp_metrics_time ON sp_metrics (measured_at);
+                CREATE TABLE IF NOT EXISTS trader_metrics (
+                    run_id TEXT NOT NULL,
+                    sp_id INTEGER NOT NULL,
+                    trader TEXT NOT NULL,
+                    sell_time REAL,
+                    buy_time REAL,
+                    total_deals INTEGER,
+                    PRIMARY KEY (run_id, sp_id, trader)
+                );
+                CREATE TABLE IF NOT EXISTS bank_dates (
+                    run_id TEXT NOT NULL,
+                    sp_id INTEGER NOT NULL,
+                    trader TEXT NOT NULL,
+                    last_date TEXT,
+                    PRIMARY KEY (run_id, sp_id, trader)
+                );
+            """)
+    
+    def close(self):
+        self.connection.close()
+    
+    def add_run(self, run_id: str, started_at: str, time_params: dict, output_dir: str = None):
+        values = [run_id, started_at]
+        for time_type in ('speed', 'conversion', 'arbitrage'):
+            window = time_params.get(time_type, {})
+            values += [window.get('from_date') or None, window.get('to_date') or None]
+        values.append(output_dir)
+        
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+    
+    def add_sp(self, record: dict, time_params: dict):
+        """Добавить итоги СП из записи make_sp_record"""
+        speed = record.get('speed') or {}
+        conversion = record.get('conversion') or {}
+        ads = record.get('ads') or {}
+        arbitrage = record.get('arbitrage') or {}
+        bank = record.get('bank') or {}
+        speed_window = time_params.get('speed', {})
+        run_id, sp_id = record['run_id'], record['sp_id']
+        
+        latest = bank.get('latest_overall')
+        metrics = (
+            run_id, sp_id, record.get('sp_name'),
+            speed_window.get('to_date') or record['finished_at'],
+            speed_window.get('from_date') or None,
+            parse_number(speed.get('total_mean_time')),
+            parse_number(speed.get('total_deals')),
+            parse_number(speed.get('arbitrage_count')),
+            parse_number(conversion.get('conversion_percent')),
+            parse_number(conversion.get('paid_count')),
+            parse_number(conversion.get('cancelled_count')),
+            parse_number(conversion.get('total_count')),
+            ads.get('ads_count'),
+            arbitrage.get('arbitrage_count'),
+            latest.isoformat() if latest else None,
+        )
+        traders = [
+            (run_id, sp_id, trader['name'], parse_number(trader.get('sell_time')),
+             parse_number(trader.get('buy_time')), parse_number(trader.get('total_deals')))
+            for trader in speed.get('traders', [])
+        ]
+        bank_dates = [
+            (run_id, sp_id, trader, date.isoformat() if date else None)
+            for trader, date in bank.get('trader_dates', {}).items()
+        ]
+        
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sp_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", metrics)
+            self.connection.execute("DELETE FROM trader_metrics WHERE run_id = ? AND sp_id = ?", (run_id, sp_id))
+            self.connection.executemany("INSERT INTO trader_metrics VALUES (?, ?, ?, ?, ?, ?)", traders)
+            self.connection.execute("DELETE FROM bank_dates WHERE run_id = ? AND sp_id = ?", (run_id, sp_id))
+            self.connection.executemany("INSERT INTO bank_dates VALUES (?, ?, ?, ?)", bank_dates)
+    
+    def sp_history(self, sp_id: int, since: str = None) -> list:
+        """Показатели СП по запускам, от старых к новым"""
+        rows = self.connection.execute(
+            "SELECT * FROM sp_metrics WHERE sp_id = ? AND measured_at >= ? ORDER BY measured_at",
+            (sp_id, since or "")
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def trader_history(self, sp_id: int, since: str = None) -> list:
+        rows = self.connection.execute("""
+            SELECT m.measured_at, t.trader, t.sell_time, t.buy_time, t.total_deals
+            FROM trader_metrics t JOIN sp_metrics m ON m.run_id = t.run_id AND m.sp_id = t.sp_id
+            WHERE t.sp_id = ? AND m.measured_at >= ?
+            ORDER BY m.measured_at, t.trader
+        """, (sp_id, since or "")).fetchall()
+        return [dict(row) for row in rows]
+    
+    def sp_trends(self, metric: str = 'conversion_percent', days: int = 7, sp_ids=None, now: datetime.datetime = None) -> list:
+        """Среднее значение metric за последние days дней против предыдущих days дней по каждому СП.
+        
+        Возвращает список словарей sp_id, sp_name, previous, current, change
+        (change = current - previous, None если в одном из периодов нет данных),
+        сначала самые сильные падения.
+        """
+        if metric not in self.TREND_METRICS:
+            raise ValueError(f"Неизвестный показатель: {metric}")
+        
+        now = now or datetime.datetime.now()
+        current_start = (now - datetime.timedelta(days=days)).strftime(TIME_FORMAT)
+        previous_start = (now - datetime.timedelta(days=2 * days)).strftime(TIME_FORMAT)
+        
+        query = f"""
+            SELECT sp_id, MAX(sp_name) AS sp_name,
+                   AVG(CASE WHEN measured_at < :current_start THEN {metric} END) AS previous,
+                   AVG(CASE WHEN measured_at >= :current_start THEN {metric} END) AS current
+            FROM sp_metrics
+            WHERE measured_at >= :previous_start AND measured_at <= :now
+        """
+        params = {'current_start': current_start, 'previous_start': previous_start, 'now': now.strftime(TIME_FORMAT)}
+        if sp_ids is not None:
+            sp_ids = list(sp_ids)
+            placeholders = ", ".join(f":sp{i}" for i in range(len(sp_ids)))
+            query += f" AND sp_id IN ({placeholders})"
+            params.update({f"sp{i}": sp_id for i, sp_id in enumerate(sp_ids)})
+        query += " GROUP BY sp_id"
+        
+        trends = []
+        for row in self.connection.execute(query, params):
+            trend = dict(row)
+            if trend['previous'] is not None and trend['current'] is not None:
+                trend['change'] = trend['current'] - trend['previous']
+            else:
+                trend['change'] = None
+            trends.append(trend)
+        
+        trends.sort(key=lambda trend: (trend['change'] is None, trend['change'] or 0))
+        return trends
+    
+    def group_trends(self, groups: dict, metric: str = 'conversion_percent', days: int = 7, now: datetime.datetime = None) -> list:
+        """То же по группам сотрудников {группа: [ID СП]}: среднее по СП группы, у которых есть оба периода"""
+        all_sp_ids = {sp_id for sp_ids in groups.values() for sp_id in sp_ids}
+        by_sp = {trend['sp_id']: trend for trend in self.sp_trends(metric, days, all_sp_ids, now)}
+        
+        trends = []
+        for group_name, sp_ids in groups.items():
+            compared = [by_sp[sp_id] for sp_id in sp_ids if sp_id in by_sp and by_sp[sp_id]['change'] is not None]
+            trend = {'group': group_name, 'sp_count': len(compared), 'previous': None, 'current': None, 'change': None}
+            if compared:
+                trend['previous'] = sum(item['previous'] for item in compared) / len(compared)
+                trend['current'] = sum(item['current'] for item in compared) / len(compared)
+                trend['change'] = trend['current'] - trend['previous']
+                # СП группы с самым сильным падением - первым
+                trend['worst_sp'] = min(compared, key=lambda item: item['change'])['sp_id']
+            trends.append(trend)
+        
+        trends.sort(key=lambda trend: (trend['change'] is None, trend['change'] or 0))
+        return trends
+
+def write_sp_report(sp_name: str, sp_data: dict, auto_no_incidents: bool, report_writer: ReportWriter):
+    """Поставить отчет СП в очередь записи. Об успешной записи сообщает сам report_writer"""
+    report = generate_report(sp_name, sp_data['speed'], sp_data['ads'], sp_data['conversion'], sp_data['arbitrage'], sp_data['bank'], auto_no_incidents)
+    return report_writer.write(sp_name, report)
+
+def restore_page_data(page_type: str, data: dict) -> dict:
+    """Данные страницы из JSON (checkpoint.jsonl) в том виде, в каком их возвращают парсеры"""
+    if page_type == 'bank':
+        parse_date = lambda value: datetime.date.fromisoformat(value) if value else None
+        data = dict(data)
+        data['trader_dates'] = {trader: parse_date(value) for trader, value in data.get('trader_dates', {}).items()}
+        data['latest_overall'] = parse_date(data.get('latest_overall'))
+        data['cutoff_date'] = parse_date(data.get('cutoff_date'))
+    return data
+
+class RunCheckpoint:
+    """Манифест запуска в папке отчетов (checkpoint.jsonl) для продолжения после сбоя или остановки.
+    
+    Первая строка - параметры запуска (выбранные СП, периоды, run_id),
+    дальше по строке на каждую загруженную страницу СП с разобранными
+    данными, на каждый записанный отчет и на каждую неудачную попытку СП.
+    Строки дописываются сразу, поэтому после падения Chrome или приложения
+    теряется максимум недописанная последняя строка - она при чтении
+    пропускается. СП, упавший RESUME_MAX_ATTEMPTS раз, больше не повторяется.
+    """
+    
+    FILENAME = "checkpoint.jsonl"
+    
+    def __init__(self, output_dir: str, selected_sps: dict, time_params: dict, auto_no_incidents: bool, run_id: str = None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.path = os.path.join(self.output_dir, self.FILENAME)
+        self.selected_sps = selected_sps
+        self.time_params = time_params
+        self.auto_no_incidents = auto_no_incidents
+        self.run_id = run_id
+        # {sp_id: {page_type: data}}, {sp_id: путь отчета} и {sp_id: число неудач} из прошлых попыток
+        self.pages = {}
+        self.reports = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+        self.file = None
+    
+    @classmethod
+    def create(cls, output_dir: str, selected_sps: dict, time_params: dict, auto_no_incidents: bool, run_id: str = None):
+        checkpoint = cls(output_dir, selected_sps, time_params, auto_no_incidents, run_id)
+        header = {
+            'type': 'run',
+            'created_at': datetime.datetime.now().strftime(TIME_FORMAT),
+            'run_id': run_id,
+            'selected_sps': {str(sp_id): sp_name for sp_id, sp_name in selected_sps.items()},
+            'time_params': time_params,
+            'auto_no_incidents': auto_no_incidents,
+        }
+        checkpoint.file = open(checkpoint.path, 'w', encoding='utf-8')
+        checkpoint.append(header)
+        return checkpoint
+    
+    @classmethod
+    def load(cls, output_dir: str):
+        """Прочитать манифест папки. FileNotFoundError, если его нет, ValueError, если он поврежден."""
+        path = os.path.join(os.path.abspath(output_dir), cls.FILENAME)
+        checkpoint = None
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                
+                if entry.get('type') == 'run':
+                    checkpoint = cls(
+                        output_dir,
+                        {int(sp_id): sp_name for sp_id, sp_name in entry['selected_sps'].items()},
+                        entry['time_params'],
+                        entry.get('auto_no_incidents', True),
+                        entry.get('run_id'),
+                    )
+                elif checkpoint is None:
+                    raise ValueError(f"{path}: нет строки с параметрами запуска")
+                elif entry.get('type') == 'page':
+                    checkpoint.pages.setdefault(entry['sp_id'], {})[entry['page_type']] = restore_page_data(entry['page_type'], entry['data'])
+                elif entry.get('type') == 'report':
+                    checkpoint.reports[entry['sp_id']] = entry['path']
+                elif entry.get('type') == 'failed':
+                    checkpoint.failures[entry['sp_id']] = checkpoint.failures.get(entry['sp_id'], 0) + 1
+        
+        if checkpoint is None:
+            raise ValueError(f"{path}: пустой манифест")
+        
+        checkpoint.file = open(path, 'a', encoding='utf-8')
+        return checkpoint
+    
+    def append(self, entry: dict):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(dump_json(entry) + "\n")
+            self.file.flush()
+    
+    def record_page(self, sp_id: int, page_type: str, data: dict):
+        self.append({'type': 'page', 'sp_id': sp_id, 'page_type': page_type, 'data': data})
+    
+    def record_report(self, sp_id: int, path: str):
+        self.reports[sp_id] = path
+        self.append({'type': 'report', 'sp_id': sp_id, 'path': path})
+    
+    def record_failure(self, sp_id: int, error: str):
+        with self.lock:
+            self.failures[sp_id] = self.failures.get(sp_id, 0) + 1
+        self.append({'type': 'failed', 'sp_id': sp_id, 'error': error})
+    
+    def has_report(self, sp_id: int) -> bool:
+        return sp_id in self.reports and os.path.exists(self.reports[sp_id])
+    
+    def exhausted(self) -> list:
+        """ID СП без отчета, попытки по которым исчерпаны"""
+        return [
+            sp_id for sp_id in self.selected_sps
+            if not self.has_report(sp_id) and self.failures.get(sp_id, 0) >= RESUME_MAX_ATTEMPTS
+        ]
+    
+    def remaining(self) -> list:
+        """ID СП, отчеты по которым еще не записаны и которые еще стоит повторить"""
+        exhausted = set(self.exhausted())
+        return [
+            sp_id for sp_id in self.selected_sps
+            if not self.has_report(sp_id) and sp_id not in exhausted
+        ]
+    
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+def find_resumable_run(reports_root: str = REPORTS_ROOT, limit: int = 20):
+    """Последняя папка REPORTS/reports_*, запуск в которой не был доведен до конца (или None)"""
+    if not os.path.isdir(reports_root):
+        return None
+    
+    folders = sorted((name for name in os.listdir(reports_root) if name.startswith('reports_')), reverse=True)
+    for name in folders[:limit]:
+        folder = os.path.join(reports_root, name)
+        if not os.path.exists(os.path.join(folder, RunCheckpoint.FILENAME)):
+            continue
+        try:
+            checkpoint = RunCheckpoint.load(folder)
+        except (OSError, ValueError, KeyError):
+            continue
+        checkpoint.close()
+        if checkpoint.remaining():
+            return folder
+    return None
+
+class SPJobRunner:
+    """Раздает задания (СП, тип страницы) по вкладкам Chrome и собирает отчеты по СП"""
+    
+    BATCH_PAGE_TYPES = ('speed', 'conversion')
+    
+    def __init__(self, drivers, selected_sps: dict, time_params: dict, log_func, auto_no_incidents: bool,
+                 batch_size: int = None, stop_check=None, progress_func=None, status_func=None,
+                 report_writer: ReportWriter = None, refresh_cache: bool = False, checkpoint: RunCheckpoint = None,
+                 trace: bool = False, lean_fetch: bool = False):
+        self.drivers = drivers
+        self.selected_sps = selected_sps
+        self.time_params = time_params
+        self.log_func = log_func
+        self.auto_no_incidents = auto_no_incidents
+        self.batch_size = batch_size
+        self.stop_check = stop_check or (lambda: False)
+        self.progress_func = progress_func or (lambda done, total: None)
+        self.status_func = status_func or (lambda status: None)
+        self.report_writer = report_writer or ReportWriter(make_reports_folder(), log_func)
+        self.refresh_cache = refresh_cache
+        self.profiler = RunProfiler()
+        self.report_writer.profiler = self.profiler
+        # Дополнительно сохранить trace.json для просмотра в chrome://tracing
+        self.trace = trace
+        # Не загружать стили, картинки, шрифты и счетчики (см. set_lean_fetch)
+        self.lean_fetch = lean_fetch
+        
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.results = {sp_id: {} for sp_id in selected_sps}
+        self.started = set()
+        self.finished = set()
+        self.failed = set()
+        self.reports = {}
+        
+        self.checkpoint = checkpoint
+        if checkpoint:
+            exhausted = set(checkpoint.exhausted())
+            for sp_id in selected_sps:
+                if checkpoint.has_report(sp_id):
+                    self.started.add(sp_id)
+                    self.finished.add(sp_id)
+                    self.reports[sp_id] = checkpoint.reports[sp_id]
+                elif sp_id in exhausted:
+                    self.started.add(sp_id)
+                    self.failed.add(sp_id)
+                else:
+                    self.results[sp_id].update(checkpoint.pages.get(sp_id, {}))
+    
+    def put_job(self, page_type: str, sps: dict):
+        with self.lock:
+            self.pending += 1
+        self.jobs.put((page_type, sps))
+    
+    def queue_jobs(self):
+        if self.batch_size:
+            chunks = chunk_sps(self.selected_sps, self.batch_size)
+        else:
+            chunks = [self.selected_sps]
+        
+        for chunk in chunks:
+            if self.batch_size:
+                for page_type in self.BATCH_PAGE_TYPES:
+                    missing = {
+                        sp_id: sp_name for sp_id, sp_name in chunk.items()
+                        if sp_id not in self.finished and sp_id not in self.failed and page_type not in self.results[sp_id]
+                    }
+                    if missing:
+                        self.put_job(page_type, missing)
+            
+            for sp_id, sp_name in chunk.items():
+                if sp_id in self.finished or sp_id in self.failed:
+                    continue
+                for page_type in PAGE_FETCHERS:
+                    if self.batch_size and page_type in self.BATCH_PAGE_TYPES:
+                        continue
+                    if page_type in self.results[sp_id]:
+                        continue
+                    self.put_job(page_type, {sp_id: sp_name})
+    
+    def run(self):
+        """Выполнить все задания. Возвращает количество готовых отчетов."""
+        if self.checkpoint:
+            self.log_func(f"⏯️ Продолжение запуска: готово {len(self.finished)} из {len(self.selected_sps)} СП")
+            if self.failed:
+                names = ", ".join(self.selected_sps[sp_id] for sp_id in self.failed)
+                self.log_func(f"⚠️ Не повторяются после {RESUME_MAX_ATTEMPTS} неудачных попыток: {names}")
+            # Все страницы СП уже загружены, а отчет не успел записаться
+            for sp_id in self.selected_sps:
+                if sp_id not in self.finished and sp_id not in self.failed and len(self.results[sp_id]) == len(PAGE_FETCHERS):
+                    self.finish_sp(sp_id, self.log_func)
+            self.report_progress()
+        
+        self.queue_jobs()
+        
+        # Драйвер GUI переживает запуски, поэтому флаг выставляется каждый раз
+        for driver in self.drivers:
+            driver.pp_cache_refresh = self.refresh_cache
+            driver.pp_profiler = self.profiler
+        
+        if self.lean_fetch:
+            lean_drivers = [driver for driver in self.drivers if set_lean_fetch(driver, True)]
+            if len(lean_drivers) < len(self.drivers):
+                self.log_func("⚠️ Облегченная загрузка недоступна в части вкладок, страницы загружаются целиком")
+        else:
+            lean_drivers = []
+        
+        if len(self.drivers) > 1:
+            self.log_func(f"🗂️ Параллельная обработка: {len(self.drivers)} вкладок")
+        
+        threads = []
+        for index, driver in enumerate(self.drivers, start=1):
+            thread = threading.Thread(target=self.worker, args=(index, driver), name=f"tab-{index}")
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        
+        for thread in threads:
+            thread.join()
+        
+        # Вкладка GUI остается у пользователя - в ней снова должны грузиться стили и картинки
+        for driver in lean_drivers:
+            set_lean_fetch(driver, False)
+        
+        # Отчет считается готовым, только когда он записан на диск
+        self.report_writer.flush()
+        with self.lock:
+            for sp_id, path in list(self.reports.items()):
+                if path in self.report_writer.errors:
+                    self.finished.discard(sp_id)
+                    self.failed.add(sp_id)
+                    del self.reports[sp_id]
+        
+        self.write_profile()
+        
+        return len(self.finished)
+    
+    def write_profile(self):
+        """profile.json рядом с отчетами и сводка по этапам в лог"""
+        path = os.path.join(self.report_writer.output_dir, "profile.json")
+        try:
+            summary = self.profiler.write(path, {
+                'run_id': self.report_writer.run_id,
+                'tabs': len(self.drivers),
+                'batch_size': self.batch_size,
+                'lean_fetch': self.lean_fetch,
+                'finished': len(self.finished),
+                'failed': len(self.failed),
+            })
+        except Exception as e:
+            self.log_func(f"⚠️ Не удалось сохранить профиль запуска: {str(e)}")
+            return
+        
+        self.profiler.log_summary(summary, self.log_func)
+        self.log_func(f"⏱️ Профиль сохранен: {path}")
+        
+        if self.trace:
+            trace_path = os.path.join(self.report_writer.output_dir, "trace.json")
+            try:
+                self.profiler.write_trace(trace_path, self.selected_sps)
+                self.log_func(f"⏱️ Таймлайн сохранен: {trace_path} (открыть в chrome://tracing или ui.perfetto.dev)")
+            except Exception as e:
+                self.log_func(f"⚠️ Не удалось сохранить таймлайн запуска: {str(e)}")
+    
+    def worker(self, index: int, driver):
+        if len(self.drivers) > 1:
+            log_func = lambda message: self.log_func(f"[Вкладка {index}] {message}")
+        else:
+            log_func = self.log_func
+        
+        while not self.stop_check():
+            try:
+                page_type, sps = self.jobs.get(timeout=0.2)
+            except queue.Empty:
+                with self.lock:
+                    if self.pending == 0:
+                        return
+                continue
+            
+            try:
+                if len(sps) > 1:
+                    self.run_batch_job(driver, page_type, sps, log_func)
+                else:
+                    sp_id, sp_name = next(iter(sps.items()))
+                    self.run_page_job(driver, page_type, sp_id, sp_name, log_func)
+            finally:
+                with self.lock:
+                    self.pending -= 1
+    
+    def run_batch_job(self, driver, page_type: str, sps: dict, log_func):
+        batch_fetcher = fetch_speed_batch if page_type == 'speed' else fetch_conversion_batch
+        
+        try:
+            self.status_func(f"Пакетная загрузка '{page_type}' ({len(sps)} СП)...")
+            driver.pp_cache_age = None
+            with self.profiler.span('page', page_type, list(sps)):
+                batch_results = batch_fetcher(driver, sps, self.time_params, log_func)
+            for data in batch_results.values():
+                data['cache_age'] = driver.pp_cache_age
+        except Exception as e:
+            log_func(f"❌ Ошибка пакетной загрузки, переходим к загрузке по одному: {str(e)}")
+            batch_results = {}
+        
+        for sp_id, sp_name in sps.items():
+            if sp_id in batch_results:
+                self.store_result(sp_id, page_type, batch_results[sp_id], log_func)
+            else:
+                self.put_job(page_type, {sp_id: sp_name})
+    
+    def run_page_job(self, driver, page_type: str, sp_id: int, sp_name: str, log_func):
+        with self.lock:
+            if sp_id in self.failed:
+                return
+            first_job = sp_id not in self.started
+            self.started.add(sp_id)
+        
+        if first_job:
+            self.status_func(f"Обработка {sp_name}... ({len(self.started)}/{len(self.selected_sps)})")
+            log_func(f"\n🔗 Обрабатываем {sp_name} (ID {sp_id})")
+        
+        try:
+            driver.pp_cache_age = None
+            with self.profiler.span('page', page_type, [sp_id]):
+                data = PAGE_FETCHERS[page_type](driver, sp_id, sp_name, self.time_params, log_func)
+            data['cache_age'] = driver.pp_cache_age
+        except Exception as e:
+            self.mark_failed(sp_id, str(e))
+            log_func(f"❌ Ошибка при обработке {sp_name}: {str(e)}")
+            self.report_progress()
+            return
+        
+        self.store_result(sp_id, page_type, data, log_func)
+    
+    def store_result(self, sp_id: int, page_type: str, data: dict, log_func):
+        with self.lock:
+            if sp_id in self.failed:
+                return
+            self.results[sp_id][page_type] = data
+            complete = len(self.results[sp_id]) == len(PAGE_FETCHERS)
+        
+        if self.checkpoint:
+            self.checkpoint.record_page(sp_id, page_type, data)
+        
+        if complete:
+            self.finish_sp(sp_id, log_func)
+    
+    def finish_sp(self, sp_id: int, log_func):
+        """Все страницы СП загружены: записать отчет"""
+        sp_name = self.selected_sps[sp_id]
+        try:
+            with self.profiler.span('report', sp_ids=[sp_id]):
+                path = write_sp_report(sp_name, self.results[sp_id], self.auto_no_incidents, self.report_writer)
+            self.report_writer.write_results(sp_id, sp_name, self.results[sp_id], path)
+            if self.checkpoint:
+                # Отметка ставится в потоке записи сразу за отчетом и строкой сводного файла
+                self.report_writer.call(lambda: self.record_written(sp_id, path))
+            with self.lock:
+                self.finished.add(sp_id)
+                self.reports[sp_id] = path
+            log_func(f"✅ Завершена обработка {sp_name}")
+        except Exception as e:
+            self.mark_failed(sp_id, str(e))
+            log_func(f"❌ Ошибка при обработке {sp_name}: {str(e)}")
+        
+        self.report_progress()
+    
+    def record_written(self, sp_id: int, path: str):
+        """Вызывается в потоке записи: отчет СП записан (или не записан) - отметить в манифесте"""
+        error = self.report_writer.errors.get(path)
+        if error is None:
+            self.checkpoint.record_report(sp_id, path)
+        else:
+            self.checkpoint.record_failure(sp_id, error)
+    
+    def mark_failed(self, sp_id: int, error: str):
+        with self.lock:
+            if sp_id in self.failed:
+                return
+            self.failed.add(sp_id)
+        if self.checkpoint:
+            self.checkpoint.record_failure(sp_id, error)
+    
+    def report_progress(self):
+        with self.lock:
+            done = len(self.finished) + len(self.failed)
+        self.progress_func(done, len(self.selected_sps))
+
+def cli_log(message):
+    timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+    logger.log(log_level_for(message), message)
+    print(f"[{timestamp}] {message}", file=sys.stderr, flush=True)
+
+def parse_cli_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="PP-Parser",
+        description="Консольный режим PP-Parser: отчеты по СП без интерфейса, в headless Chrome. "
+                    "Сводка выводится в stdout в формате JSON, лог - в stderr."
+    )
+    parser.add_argument("--sp", action="append", default=[], metavar="ID[,ID...]",
+                        help="ID СП из service_providers.txt (можно повторять и перечислять через запятую)")
+    parser.add_argument("--group", action="append", default=[], metavar="НАЗВАНИЕ",
+                        help="группа из employee_groups.json (можно повторять)")
+    parser.add_argument("--all", action="store_true", help="все СП из service_providers.txt")
+    
+    defaults = default_time_params()
+    for time_type, title in (('speed', 'скорости'), ('conversion', 'конверсии'), ('arbitrage', 'арбитражей')):
+        parser.add_argument(f"--{time_type}-from", default=defaults[time_type]['from_date'], metavar="'ГГГГ-ММ-ДД ЧЧ:ММ:СС'",
+                            help=f"начало периода {title} (по умолчанию как в интерфейсе)")
+        parser.add_argument(f"--{time_type}-to", default="", metavar="'ГГГГ-ММ-ДД ЧЧ:ММ:СС'",
+                            help=f"конец периода {title} (по умолчанию - без ограничения)")
+    
+    parser.add_argument("--output", help="папка для отчетов (по умолчанию REPORTS/reports_ГГГГММДД_ЧЧММСС)")
+    parser.add_argument("--summary", help="дополнительно сохранить JSON-сводку в файл")
+    parser.add_argument("--results-format", choices=RESULTS_FORMATS + ('none',), default='jsonl',
+                        help="формат сводного файла с данными всех СП в папке отчетов (по умолчанию jsonl)")
+    parser.add_argument("--sqlite", metavar="ФАЙЛ", help="дописывать данные СП в таблицу sp_results SQLite-базы")
+    parser.add_argument("--resume", nargs='?', const='last', metavar="ПАПКА",
+                        help="продолжить прерванный запуск: последний в REPORTS или в указанной папке. "
+                             "СП и периоды берутся из манифеста запуска")
+    parser.add_argument("--refresh-cache", action="store_true",
+                        help="загрузить все страницы заново, не беря их из кэша (кэш при этом обновляется)")
+    parser.add_argument("--no-cache", action="store_true", help="не читать и не записывать кэш страниц")
+    parser.add_argument("--trace", action="store_true",
+                        help="сохранить trace.json с таймлайном запуска по вкладкам (chrome://tracing, ui.perfetto.dev)")
+    parser.add_argument("--full-pages", action="store_true",
+                        help="загружать страницы целиком, со стилями, картинками и шрифтами")
+    parser.add_argument("--history", default=HISTORY_DB_PATH, metavar="ФАЙЛ",
+                        help="база истории показателей (по умолчанию REPORTS/history.db)")
+    parser.add_argument("--no-history", action="store_true", help="не добавлять запуск в историю")
+    parser.add_argument("--trends", action="store_true",
+                        help="не запускать обработку, а вывести из истории изменение показателя по группам и СП")
+    parser.add_argument("--metric", choices=HistoryStore.TREND_METRICS, default='conversion_percent',
+                        help="показатель для --trends (по умолчанию conversion_percent)")
+    parser.add_argument("--days", type=int, default=7, help="длина сравниваемых периодов для --trends, дней (по умолчанию 7)")
+    parser.add_argument("--tabs", type=int, default=1, help=f"количество вкладок Chrome (1-{MAX_TAB_COUNT})")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="пакетная загрузка скорости и конверсии по N СП (0 - выключена)")
+    parser.add_argument("--no-auto-no-incidents", action="store_true", help="не заполнять 'Инцидентов не найдено' в пункте 6")
+    parser.add_argument("--profile-dir", help="профиль Chrome с выполненным входом в servicedesk")
+    parser.add_argument("--port", type=int, default=CLI_DEBUGGING_PORT, help="порт отладки headless Chrome")
+    parser.add_argument("--no-headless", action="store_true", help="показывать окно Chrome")
+    parser.add_argument("--servicedesk-url", help="адрес servicedesk (по умолчанию PP_SERVICEDESK_URL или боевой)")
+    return parser.parse_args(argv)
+
+def resolve_cli_sps(args, log_func) -> dict:
+    """Словарь {sp_id: название} по --sp/--group/--all. ValueError при неизвестных ID или группах."""
+    if args.all:
+        return dict(SERVICE_PROVIDERS)
+    
+    sp_ids = []
+    for value in args.sp:
+        for part in value.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit():
+                raise ValueError(f"Неверный ID СП: {part}")
+            sp_id = int(part)
+            if sp_id not in SERVICE_PROVIDERS:
+                raise ValueError(f"СП с ID {sp_id} нет в service_providers.txt")
+            sp_ids.append(sp_id)
+    
+    for group_name in args.group:
+        if group_name not in EMPLOYEE_GROUPS:
+            raise ValueError(f"Группа '{group_name}' не найдена в employee_groups.json")
+        for sp_id in EMPLOYEE_GROUPS.members(group_name):
+            if sp_id in SERVICE_PROVIDERS:
+                sp_ids.append(sp_id)
+            else:
+                log_func(f"⚠️ СП {sp_id} из группы '{group_name}' нет в service_providers.txt, пропускаем")
+    
+    return {sp_id: SERVICE_PROVIDERS[sp_id] for sp_id in dict.fromkeys(sp_ids)}
+
+def print_cli_summary(summary: dict, summary_path: str = None):
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    print(text, flush=True)
+    
+    if summary_path:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(text)
 
-    bank_html = get_current_page_html(driver)
-    bank_data = {}
+def run_trends(args, summary_path: str = None) -> int:
+    """--trends: последние args.days дней против предыдущих по группам (или по --group) и по СП (или по --sp)"""
+    if not os.path.exists(args.history):
+        cli_log(f"❌ История не найдена: {args.history}")
+        print_cli_summary({'status': 'error', 'error': f"История не найдена: {args.history}"}, summary_path)
+        return 2
+    
+    try:
+        groups = {name: EMPLOYEE_GROUPS.members(name) for name in (args.group or EMPLOYEE_GROUPS.names()) if name in EMPLOYEE_GROUPS}
+        unknown = [name for name in args.group if name not in EMPLOYEE_GROUPS]
+        if unknown:
+            raise ValueError(f"Группа '{unknown[0]}' не найдена в employee_groups.json")
+        sp_ids = list(resolve_cli_sps(args, cli_log)) if args.sp else None
+    except ValueError as e:
+        cli_log(f"❌ {str(e)}")
+        print_cli_summary({'status': 'error', 'error': str(e)}, summary_path)
+        return 2
+    
+    store = HistoryStore(args.history)
+    try:
+        summary = {
+            'status': 'ok',
+            'metric': args.metric,
+            'days': args.days,
+            'groups': store.group_trends(groups, args.metric, args.days),
+            'sps': store.sp_trends(args.metric, args.days, sp_ids),
+        }
+    finally:
+        store.close()
     
-    if bank_html:
-        bank_data = parse_bank_statements_data(bank_html)
-        bank_info = format_bank_statements_info(bank_data)
-        log_func(f"✅ Данные выписок получены: {len(bank_data['trader_dates'])} трейдеров")
-        log_func(f"📅 Информация о выписках: {bank_info}")
+    print_cli_summary(summary, summary_path)
+    return 0
+
+def run_cli(argv) -> int:
+    """Консольный режим. Код выхода: 0 - все отчеты готовы, 1 - часть СП не обработана, 2 - ошибка запуска."""
+    args = parse_cli_args(argv)
+    setup_file_logging()
+    load_data_files()
+    summary_path = os.path.abspath(args.summary) if args.summary else None
+    
+    if args.trends:
+        return run_trends(args, summary_path)
+    
+    if args.servicedesk_url:
+        set_servicedesk_url(args.servicedesk_url)
+    if args.no_cache:
+        PAGE_CACHE.enabled = False
+    
+    if args.resume:
+        # СП, периоды и папка берутся из манифеста прерванного запуска
+        try:
+            folder = find_resumable_run() if args.resume == 'last' else os.path.abspath(args.resume)
+            if not folder:
+                raise ValueError("Прерванных запусков в REPORTS не найдено")
+            checkpoint = RunCheckpoint.load(folder)
+        except (OSError, ValueError, KeyError) as e:
+            cli_log(f"❌ Не удалось продолжить запуск: {str(e)}")
+            print_cli_summary({'status': 'error', 'error': f"Не удалось продолжить запуск: {str(e)}"}, summary_path)
+            return 2
+        
+        selected_sps = checkpoint.selected_sps
+        time_params = checkpoint.time_params
+        reports_folder = checkpoint.output_dir
+        cli_log(f"⏯️ Продолжаем запуск {reports_folder}: осталось {len(checkpoint.remaining())} из {len(selected_sps)} СП")
     else:
-        log_func("❌ Не удалось получить данные банковских выписок")
-        bank_data = {'trader_dates': {}, 'latest_overall': None}
+        time_params = {
+            time_type: {'from_date': getattr(args, f"{time_type}_from"), 'to_date': getattr(args, f"{time_type}_to")}
+            for time_type in ('speed', 'conversion', 'arbitrage')
+        }
+        
+        try:
+            validate_time_params(time_params)
+            selected_sps = resolve_cli_sps(args, cli_log)
+            if not selected_sps:
+                raise ValueError("Не выбран ни один СП: укажите --sp, --group или --all")
+        except ValueError as e:
+            cli_log(f"❌ {str(e)}")
+            print_cli_summary({'status': 'error', 'error': str(e)}, summary_path)
+            return 2
+        
+        if args.output:
+            reports_folder = os.path.abspath(args.output)
+            os.makedirs(reports_folder, exist_ok=True)
+            # Папку --output могут переиспользовать, а в истории каждый запуск должен быть отдельным
+            run_id = f"{os.path.basename(reports_folder)}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        else:
+            reports_folder = make_reports_folder()
+            run_id = os.path.basename(reports_folder)
+        
+        checkpoint = RunCheckpoint.create(reports_folder, selected_sps, time_params, not args.no_auto_no_incidents, run_id)
+    
+    cli_log(f"📋 Выбрано СП: {len(selected_sps)}")
+    cli_log(f"📁 Отчеты будут сохранены в папку: {reports_folder}")
+    cli_log("🚀 Запускаем Chrome...")
+    
+    try:
+        driver = start_headless_chrome(args.port, args.profile_dir, headless=not args.no_headless)
+    except Exception as e:
+        cli_log(f"❌ Не удалось запустить Chrome: {str(e)}")
+        checkpoint.close()
+        print_cli_summary({'status': 'error', 'error': f"Не удалось запустить Chrome: {str(e)}"}, summary_path)
+        return 2
+    
+    drivers = [driver]
+    for _ in range(max(1, min(args.tabs, MAX_TAB_COUNT)) - 1):
+        tab_driver = open_tab_driver(args.port)
+        if not tab_driver:
+            cli_log("⚠️ Не удалось открыть дополнительную вкладку, продолжаем с меньшим числом")
+            break
+        drivers.append(tab_driver)
+    
+    stop_requested = threading.Event()
+    runner = SPJobRunner(
+        drivers,
+        selected_sps,
+        time_params,
+        cli_log,
+        checkpoint.auto_no_incidents,
+        batch_size=args.batch_size if args.batch_size > 1 else None,
+        stop_check=stop_requested.is_set,
+        report_writer=ReportWriter(reports_folder, cli_log,
+                                   results_format=None if args.results_format == 'none' else args.results_format,
+                                   sqlite_path=args.sqlite,
+                                   run_id=checkpoint.run_id,
+                                   history_path=None if args.no_history else args.history,
+                                   time_params=time_params),
+        refresh_cache=args.refresh_cache,
+        checkpoint=checkpoint,
+        trace=args.trace,
+        lean_fetch=not args.full_pages
+    )
+    
+    start_time = time.time()
+    try:
+        # Обработка в отдельном потоке, чтобы Ctrl+C останавливал ее так же, как кнопка "Стоп"
+        worker = threading.Thread(target=runner.run, daemon=True)
+        worker.start()
+        while worker.is_alive():
+            try:
+                worker.join(0.5)
+            except KeyboardInterrupt:
+                cli_log("🛑 Запрошена остановка обработки...")
+                stop_requested.set()
+    finally:
+        runner.report_writer.close()
+        checkpoint.close()
+        for tab_driver in drivers[1:]:
+            close_tab_driver(tab_driver)
+        try:
+            driver.quit()
+        except:
+            pass
+    
+    elapsed = time.time() - start_time
+    missing = [sp_id for sp_id in selected_sps if sp_id not in runner.finished and sp_id not in runner.failed]
     
-    report = generate_report(sp_name, speed_data, ads_data, conversion_data, arbitrage_data, bank_data, auto_no_incidents)
-    filename = save_report_to_txt(sp_name, report)
+    if stop_requested.is_set():
+        status = 'stopped'
+    elif len(runner.finished) == len(selected_sps):
+        status = 'ok'
+    else:
+        status = 'partial'
+    
+    summary = {
+        'status': status,
+        'output_dir': reports_folder,
+        'run_id': runner.report_writer.run_id,
+        'resumed': bool(args.resume),
+        'results_file': runner.report_writer.results_path,
+        'sqlite': runner.report_writer.sqlite_path,
+        'history': runner.report_writer.history_path,
+        'time_params': time_params,
+        'total': len(selected_sps),
+        'processed': len(runner.finished),
+        'failed': sorted(runner.failed),
+        'not_processed': missing,
+        'elapsed_seconds': round(elapsed, 1),
+        'sps_per_minute': round(len(runner.finished) / elapsed * 60, 2) if elapsed else 0,
+        'reports': {str(sp_id): path for sp_id, path in sorted(runner.reports.items())},
+    }
+    cli_log(f"🎉 Готово! Обработано СП: {len(runner.finished)}/{len(selected_sps)}")
+    print_cli_summary(summary, summary_path)
     
-    log_func(f"💾 Отчет сохранен в файл: {filename}")
+    return 0 if status == 'ok' else 1
+
+def report_startup_time(root, path: str):
+    """Для benchmarks/bench_startup.py: записать время до первого кадра в path и закрыть окно"""
+    marks = {}
+    
+    def write_and_exit():
+        # К этому моменту отработала и отложенная загрузка списков СП
+        marks['ready_seconds'] = time.perf_counter() - STARTUP_TIME
+        marks['frozen'] = bool(getattr(sys, 'frozen', False))
+        marks['sp_count'] = len(SERVICE_PROVIDERS)
+        marks['loaded_modules'] = sorted(name for name in ('selenium', 'lxml', 'bs4') if name in sys.modules)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(marks, f)
+        root.destroy()
+    
+    def on_map(event):
+        if event.widget is not root or 'first_frame_seconds' in marks:
+            return
+        marks['first_frame_seconds'] = time.perf_counter() - STARTUP_TIME
+        root.after_idle(write_and_exit)
     
-    return filename
+    root.bind('<Map>', on_map, add='+')
 
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    
+    # С аргументами командной строки - консольный режим без интерфейса
+    if argv:
+        sys.exit(run_cli(argv))
+    
+    # pp_gui импортирует общие функции отсюда под именем pp_parser
+    sys.modules.setdefault("pp_parser", sys.modules[__name__])
+    try:
+        import tkinter as tk
+        from pp_gui import PayportApp
+    except ImportError as e:
+        print(f"Для окна приложения нужен tkinter ({str(e)}). "
+              f"Без интерфейса PP-Parser запускается с аргументами, см. --help", file=sys.stderr)
+        sys.exit(1)
+    
     root = tk.Tk()
     app = PayportApp(root)
+    
+    if os.environ.get("PP_STARTUP_BENCH"):
+        report_startup_time(root, os.environ["PP_STARTUP_BENCH"])
+    
     root.mainloop()
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('service_providers.txt', '.'), ('employee_groups.json', '.')],
-    hiddenimports=['selenium.webdriver.common.by', 'selenium.webdriver.chrome.service', 'selenium.webdriver.support.ui', 'selenium.webdriver.support.expected_conditions', 'bs4', 'lxml', 'urllib.parse'],
+    hiddenimports=['selenium.webdriver.chrome.options', 'selenium.common.exceptions', 'selenium.webdriver.common.by', 'selenium.webdriver.chrome.service', 'selenium.webdriver.support.ui', 'selenium.webdriver.support.expected_conditions', 'lxml', 'lxml.html', 'urllib.parse'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
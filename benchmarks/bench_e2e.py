@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Сквозной замер СП/мин против локального стенда servicedesk.
+
+Поднимает benchmarks/fake_servicedesk.py, переключает приложение на него
+через set_servicedesk_url и прогоняет тот же SPJobRunner, что и GUI,
+в headless Chrome. Дополнительные вкладки открываются в том же Chrome
+через open_tab_driver, как в приложении, поэтому замер учитывает
+торможение фоновых вкладок. Нужен установленный Chrome; доступ к боевому
+servicedesk не нужен. Запуск из корня репозитория:
+
+    python -m benchmarks.bench_e2e --sps 40 --tabs 1 --latency 300 --jitter 100
+    python -m benchmarks.bench_e2e --sps 40 --tabs 4 --latency 300 --jitter 100 --no-headless
+    python -m benchmarks.bench_e2e --sps 40 --batch-size 20
+    python -m benchmarks.bench_e2e --sps 40 --asset-latency 200 --full-pages
+"""
+
+import argparse
+import datetime
+import sys
+import tempfile
+import time
+
+from benchmarks import fixtures
+from benchmarks.common import load_app_module
+from benchmarks.fake_servicedesk import DEFAULT_CONFIG, start_server
+
+def make_time_params(hours: int) -> dict:
+    from_date = (datetime.datetime.now() - datetime.timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S")
+    window = {'from_date': from_date, 'to_date': ''}
+    return {'speed': dict(window), 'conversion': dict(window), 'arbitrage': dict(window)}
+
+def start_drivers(pp, count: int, headless: bool, profile_dir: str) -> list:
+    """Один Chrome и count - 1 дополнительных вкладок в нем, как в консольном режиме"""
+    driver = pp.start_headless_chrome(pp.CLI_DEBUGGING_PORT, profile_dir, headless=headless)
+    drivers = [driver]
+    for _ in range(count - 1):
+        tab_driver = pp.open_tab_driver(pp.CLI_DEBUGGING_PORT)
+        if not tab_driver:
+            print("Не удалось открыть дополнительную вкладку, замер идет с меньшим числом")
+            break
+        drivers.append(tab_driver)
+    return drivers
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Сквозной замер PP-Parser против локального стенда")
+    parser.add_argument("--sps", type=int, default=20, help="количество СП")
+    parser.add_argument("--tabs", type=int, default=1, help="количество вкладок Chrome")
+    parser.add_argument("--batch-size", type=int, default=0, help="размер пакета для скорости и конверсии (0 - без пакетов)")
+    parser.add_argument("--hours", type=int, default=24, help="период скорости/конверсии/арбитражей, часов")
+    parser.add_argument("--latency", type=float, default=DEFAULT_CONFIG['latency_ms'], help="задержка страницы, мс")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_CONFIG['jitter_ms'], help="разброс задержки, мс")
+    parser.add_argument("--asset-latency", type=float, default=DEFAULT_CONFIG['asset_latency_ms'], help="задержка css/js/картинок, мс")
+    parser.add_argument("--full-pages", action="store_true", help="загружать css/картинки/шрифты и ждать полной загрузки страницы")
+    parser.add_argument("--no-headless", action="store_true", help="показывать окна Chrome")
+    parser.add_argument("--verbose", action="store_true", help="печатать лог приложения")
+    args = parser.parse_args(argv)
+
+    sps = fixtures.make_sp_names(args.sps)
+    server, url = start_server(
+        sp_names=sps,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        asset_latency_ms=args.asset_latency,
+    )
+
+    pp = load_app_module()
+    pp.set_servicedesk_url(url)
+    # Замеряется загрузка страниц, а не чтение кэша
+    pp.PAGE_CACHE.enabled = False
+
+    log = print if args.verbose else (lambda message: None)
+    if args.full_pages:
+        pp.PAGE_LOAD_STRATEGY = "normal"
+    profile_dir = tempfile.TemporaryDirectory()
+    drivers = start_drivers(pp, max(1, min(args.tabs, pp.MAX_TAB_COUNT)), not args.no_headless, profile_dir.name)
+
+    try:
+        with tempfile.TemporaryDirectory() as reports_dir:
+            report_writer = pp.ReportWriter(reports_dir, log)
+            try:
+                runner = pp.SPJobRunner(drivers, sps, make_time_params(args.hours), log, True,
+                                        batch_size=args.batch_size or None, report_writer=report_writer,
+                                        lean_fetch=not args.full_pages)
+                start = time.perf_counter()
+                finished = runner.run()
+                elapsed = time.perf_counter() - start
+            finally:
+                report_writer.close()
+    finally:
+        for tab_driver in drivers[1:]:
+            pp.close_tab_driver(tab_driver)
+        try:
+            drivers[0].quit()
+        except Exception:
+            pass
+        profile_dir.cleanup()
+        server.shutdown()
+
+    per_minute = finished / elapsed * 60 if elapsed else 0
+    print(f"Стенд: {url}, задержка {args.latency:.0f}±{args.jitter:.0f} мс")
+    print(f"СП: {finished}/{len(sps)}, вкладок: {len(drivers)}, пакет: {args.batch_size or '-'}, "
+          f"загрузка: {'полная' if args.full_pages else 'облегченная'}")
+    print(f"Время: {elapsed:.1f} с, {per_minute:.1f} СП/мин")
+    print(f"Запросов по страницам: {server.stats}")
+
+    return 0 if finished == len(sps) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Офлайн-бенчмарк парсеров страниц servicedesk.
+
+Не требует Chrome и доступа к servicedesk: страницы генерируются
+в benchmarks/fixtures.py. Запуск из корня репозитория:
+
+    python -m benchmarks.bench_parsers --rows 10000
+    python -m benchmarks.bench_parsers --save-baseline
+    python -m benchmarks.bench_parsers --fail-on-regression
+
+Для каждого случая выводится лучшее время из нескольких повторов,
+пропускная способность (строк/с), пиковая память (tracemalloc)
+и изменение относительно сохраненного baseline. Baseline зависит от машины
+и в репозиторий не входит - снимите его флагом --save-baseline на исходной
+версии кода. Сравниваются только случаи с тем же числом строк, что в baseline.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks import fixtures
+from benchmarks.common import REPO_ROOT, load_app_module
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+def build_cases(pp, rows: int) -> list:
+    """Список (название, количество строк, функция без аргументов)"""
+    rng = random.Random(42)
+
+    # Один СП с большим количеством трейдеров: 3 строки на трейдера
+    single_sp = {1: "bench_single|UZS|PayPort"}
+    speed_html = fixtures.render_page(fixtures.render_table(
+        fixtures.SPEED_HEADER, fixtures.speed_rows(single_sp, max(1, rows // 3), rng)))
+
+    # Пакетная страница: много СП по 3 трейдера (10 строк на СП)
+    batch_sps = fixtures.make_sp_names(max(2, rows // 10), rng)
+    batch_speed_table = fixtures.render_table(fixtures.SPEED_HEADER, fixtures.speed_rows(batch_sps, 3, rng))
+    batch_speed_html = fixtures.render_page(batch_speed_table)
+    batch_conversion_html = fixtures.render_page(fixtures.render_table(
+        fixtures.CONVERSION_HEADER, fixtures.conversion_rows(batch_sps, 3, rng)))
+
+    conversion_html = fixtures.render_page(fixtures.render_table(
+        fixtures.CONVERSION_HEADER, fixtures.conversion_rows(single_sp, rows, rng)))
+    ads_html = fixtures.render_page(fixtures.render_table(fixtures.ADS_HEADER, fixtures.ads_rows(rows, rng)))
+    arbitrage_html = fixtures.render_page(fixtures.render_table(fixtures.DEALS_HEADER, fixtures.arbitrage_rows(rows, 0.2, rng)))
+    bank_html = fixtures.render_page(fixtures.render_table(
+        fixtures.BANK_STATEMENTS_HEADER, fixtures.bank_statements_rows(rows, 50, rng=rng)))
+
+    # Поиск СП и итоговой строки - худший случай, нужный СП в конце таблицы
+    table_rows = pp.extract_table_rows(batch_speed_table)
+    last_sp_name = list(batch_sps.values())[-1]
+    last_label = last_sp_name.split('|')[0]
+
+    # Поисковый индекс фильтра СП: по одному СП на строку
+    search_index = pp.SPSearchIndex(fixtures.make_sp_names(rows, rng))
+
+    speed_data = pp.parse_speed_data(speed_html, single_sp[1])
+    arbitrage_data = pp.parse_arbitrage_data(arbitrage_html)
+    ads_data = pp.parse_ads_data(ads_html)
+    conversion_data = pp.parse_conversion_data(conversion_html, single_sp[1])
+    bank_data = pp.parse_bank_statements_data(bank_html)
+    report_rows = len(speed_data['traders']) + arbitrage_data['arbitrage_count'] + len(bank_data['trader_dates'])
+
+    return [
+        ("parse_speed_data", rows, lambda: pp.parse_speed_data(speed_html, single_sp[1])),
+        ("parse_speed_data_batch", len(table_rows), lambda: pp.parse_speed_data_batch(batch_speed_html, batch_sps)),
+        ("parse_ads_data", rows, lambda: pp.parse_ads_data(ads_html)),
+        ("parse_conversion_data", rows, lambda: pp.parse_conversion_data(conversion_html, single_sp[1])),
+        ("parse_conversion_data_batch", len(batch_sps) * 4, lambda: pp.parse_conversion_data_batch(batch_conversion_html, batch_sps)),
+        ("parse_arbitrage_data", rows, lambda: pp.parse_arbitrage_data(arbitrage_html)),
+        ("parse_bank_statements_data", rows, lambda: pp.parse_bank_statements_data(bank_html)),
+        ("extract_table_rows", len(table_rows), lambda: pp.extract_table_rows(batch_speed_table)),
+        ("find_sp_in_table", len(table_rows), lambda: pp.find_sp_in_table(table_rows, last_sp_name)),
+        ("find_total_row", len(table_rows), lambda: pp.find_total_row(table_rows, last_sp_name, last_label)),
+        ("sp_search_substring", rows, lambda: search_index.search("sp_12")),
+        ("sp_search_fuzzy", rows, lambda: search_index.search("bnech")),
+        ("generate_report", report_rows, lambda: pp.generate_report(
+            single_sp[1], speed_data, ads_data, conversion_data, arbitrage_data, bank_data, True)),
+    ]
+
+def measure(func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # Память меряется отдельным прогоном, tracemalloc сильно замедляет код
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def format_change(current: float, previous: float) -> str:
+    if not previous:
+        return "-"
+    change = (current - previous) / previous * 100
+    return f"{change:+.1f}%"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк парсеров PP-Parser на синтетических страницах")
+    parser.add_argument("--rows", type=int, default=10000, help="строк в каждой таблице (по умолчанию 10000)")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов на случай, берется лучшее время")
+    parser.add_argument("--only", action="append", help="запустить только указанные случаи")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл baseline для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как новый baseline")
+    parser.add_argument("--threshold", type=float, default=25.0, help="замедление в %%, считающееся регрессией")
+    parser.add_argument("--fail-on-regression", action="store_true", help="код выхода 1 при регрессии")
+    args = parser.parse_args(argv)
+
+    pp = load_app_module()
+    baseline = load_baseline(args.baseline)
+
+    print(f"Строк в таблицах: {args.rows}, повторов: {args.repeat}")
+    print(f"{'Случай':<30}{'строк':>8}{'время, мс':>12}{'строк/с':>14}{'пик, КиБ':>12}{'к baseline':>12}")
+
+    results = {}
+    regressions = []
+    skipped = []
+
+    for name, row_count, func in build_cases(pp, args.rows):
+        if args.only and name not in args.only:
+            continue
+
+        result = measure(func, args.repeat)
+        result['rows'] = row_count
+        results[name] = result
+
+        # Время не растет линейно с числом строк (поиск по индексу, разбор всей
+        # страницы ради одного итога), поэтому сравнивается только тот же объем
+        current = result['seconds']
+        previous = None
+        if name in baseline:
+            if baseline[name].get('rows') == row_count:
+                previous = baseline[name]['seconds']
+            else:
+                skipped.append(name)
+        change = format_change(current, previous)
+        if previous and (current - previous) / previous * 100 > args.threshold:
+            regressions.append(name)
+            change += " !"
+
+        rows_per_second = row_count / result['seconds'] if result['seconds'] else float('inf')
+        print(f"{name:<30}{row_count:>8}{result['seconds'] * 1000:>12.2f}{rows_per_second:>14,.0f}"
+              f"{result['peak_bytes'] / 1024:>12.0f}{change:>12}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Baseline сохранен: {args.baseline}")
+    elif not baseline:
+        print(f"Baseline не найден ({args.baseline}), сохраните его флагом --save-baseline")
+    elif skipped:
+        print(f"Не сравнивались (в baseline другое число строк): {', '.join(skipped)}")
+
+    if regressions:
+        print(f"Регрессии (медленнее более чем на {args.threshold:.0f}%): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Замер времени запуска PP-Parser до первого кадра окна.
+
+Приложение запускается с переменной окружения PP_STARTUP_BENCH: после
+появления окна оно записывает свои отметки времени в файл и закрывается.
+Меряется и запуск из исходников, и собранный PyInstaller exe (нужен
+графический дисплей). Запуск из корня репозитория:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --exe dist/PP-Parser/PP-Parser.exe --repeat 10
+
+Колонки:
+    процесс    - от запуска процесса до его завершения (включая старт интерпретатора/распаковку exe)
+    1-й кадр   - от начала выполнения PP-Parser.py до отображения окна
+    готово     - то же, но после отложенной загрузки списков СП и групп
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import APP_PATH, REPO_ROOT
+
+DEFAULT_EXE = os.path.join(REPO_ROOT, "dist", "PP-Parser", "PP-Parser.exe")
+
+def run_once(command: list, timeout: float) -> dict:
+    fd, marks_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    os.remove(marks_path)
+
+    env = dict(os.environ, PP_STARTUP_BENCH=marks_path)
+    start = time.perf_counter()
+    try:
+        subprocess.run(command, env=env, timeout=timeout, check=False,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        process_seconds = time.perf_counter() - start
+
+        if not os.path.exists(marks_path):
+            raise RuntimeError("приложение не записало отметки времени (нет дисплея или ошибка при запуске)")
+        with open(marks_path, 'r', encoding='utf-8') as f:
+            marks = json.load(f)
+    finally:
+        if os.path.exists(marks_path):
+            os.remove(marks_path)
+
+    marks['process_seconds'] = process_seconds
+    return marks
+
+def measure(name: str, command: list, repeat: int, timeout: float) -> dict:
+    runs = [run_once(command, timeout) for _ in range(repeat)]
+
+    result = {'name': name}
+    for key in ('process_seconds', 'first_frame_seconds', 'ready_seconds'):
+        values = [run[key] for run in runs]
+        result[key] = {'median': statistics.median(values), 'min': min(values)}
+    result['loaded_modules'] = runs[-1].get('loaded_modules', [])
+    return result
+
+def format_seconds(value: dict) -> str:
+    return f"{value['median'] * 1000:.0f} ({value['min'] * 1000:.0f})"
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Время запуска PP-Parser до первого кадра")
+    parser.add_argument("--repeat", type=int, default=5, help="запусков на вариант, выводится медиана и минимум")
+    parser.add_argument("--exe", default=None, help=f"собранный exe (по умолчанию {DEFAULT_EXE}, если есть)")
+    parser.add_argument("--no-source", action="store_true", help="не мерить запуск из исходников")
+    parser.add_argument("--timeout", type=float, default=60.0, help="таймаут одного запуска, с")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    args = parser.parse_args(argv)
+
+    targets = []
+    if not args.no_source:
+        targets.append(("исходники", [sys.executable, APP_PATH]))
+    exe_path = args.exe or (DEFAULT_EXE if os.path.exists(DEFAULT_EXE) else None)
+    if exe_path:
+        targets.append(("exe", [exe_path]))
+
+    if not targets:
+        print("Нечего мерить: сборка не найдена, а исходники отключены --no-source")
+        return 1
+
+    print(f"Запусков на вариант: {args.repeat}, время в мс: медиана (минимум)")
+    print(f"{'Вариант':<12}{'процесс':>16}{'1-й кадр':>16}{'готово':>16}  загружено при старте")
+
+    results = []
+    for name, command in targets:
+        try:
+            result = measure(name, command, args.repeat, args.timeout)
+        except (RuntimeError, subprocess.TimeoutExpired, OSError) as e:
+            print(f"{name:<12}ошибка: {e}")
+            return 1
+
+        results.append(result)
+        loaded = ", ".join(result['loaded_modules']) or "-"
+        print(f"{name:<12}{format_seconds(result['process_seconds']):>16}{format_seconds(result['first_frame_seconds']):>16}"
+              f"{format_seconds(result['ready_seconds']):>16}  {loaded}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Общие помощники для бенчмарков: загрузка PP-Parser.py как модуля"""
+
+import importlib.util
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "PP-Parser.py")
+
+def load_app_module():
+    """Импортировать PP-Parser.py (в имени есть дефис, поэтому через importlib)"""
+    if "pp_parser" in sys.modules:
+        return sys.modules["pp_parser"]
+    
+    spec = importlib.util.spec_from_file_location("pp_parser", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["pp_parser"] = module
+    spec.loader.exec_module(module)
+    return module
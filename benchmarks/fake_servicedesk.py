@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""Локальный стенд servicedesk для сквозных замеров без доступа к боевому серверу.
+
+Отдает те же пять страниц, что читает PP-Parser, и понимает параметры,
+которые формируют build_*_url: service_provider_ids[] / service_provider_id[] /
+service_provider[], from_date / to_date, lines_per_page и page.
+Данные детерминированы: одинаковый запрос всегда дает одинаковую страницу,
+поэтому постраничная выдача согласована между страницами.
+
+Запуск:
+
+    python -m benchmarks.fake_servicedesk --port 8765 --latency 300 --jitter 100
+
+после чего приложение направляется на стенд переменной окружения:
+
+    PP_SERVICEDESK_URL=http://127.0.0.1:8765 python PP-Parser.py
+"""
+
+import argparse
+import datetime
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import fixtures
+from benchmarks.common import REPO_ROOT
+
+DEFAULT_CONFIG = {
+    'latency_ms': 0.0,          # задержка ответа на страницу
+    'jitter_ms': 0.0,           # +- случайная добавка к задержке
+    'asset_latency_ms': 0.0,    # задержка на css/js/картинки/шрифты
+    'traders_per_sp': 3,
+    'ads_per_sp': 15,
+    'deals_per_sp': 40,         # сделок в споре за последние 30 дней
+    'statements_per_sp': 60,
+    'empty_ratio': 0.1,         # доля СП без сделок за период
+    'max_lines_per_page': 100,  # больше этого lines_per_page сервер не отдает
+}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def load_sp_names(path: str = None) -> dict:
+    """Названия СП из service_providers.txt - чтобы итоговые строки совпадали с тем, что ищет приложение"""
+    path = path or os.path.join(REPO_ROOT, "service_providers.txt")
+    names = {}
+    if not os.path.exists(path):
+        return names
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and '|' in line and not line.startswith('#'):
+                sp_id, sp_name = line.split('|', 1)
+                try:
+                    names[int(sp_id.strip())] = sp_name.strip()
+                except ValueError:
+                    continue
+    return names
+
+def parse_date(value: str, default: datetime.datetime) -> datetime.datetime:
+    try:
+        return datetime.datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return default
+
+class FakeServicedeskHandler(BaseHTTPRequestHandler):
+    server_version = "FakeServicedesk/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        config = self.server.config
+
+        if parsed.path.startswith(("/css/", "/js/", "/img/", "/fonts/")):
+            self.sleep(config['asset_latency_ms'], 0)
+            self.send_asset(parsed.path)
+            return
+
+        routes = {
+            "/traders-speed": self.speed_rows,
+            "/trader/ads": self.ads_rows,
+            "/trader-conversions": self.conversion_rows,
+            "/trader/deals": self.deals_rows,
+            "/trader/bank-statements": self.bank_statements_rows,
+        }
+        builder = routes.get(parsed.path)
+        if not builder:
+            self.send_error(404)
+            return
+
+        self.sleep(config['latency_ms'], config['jitter_ms'])
+        with self.server.stats_lock:
+            self.server.stats[parsed.path] = self.server.stats.get(parsed.path, 0) + 1
+
+        header, rows = builder(params)
+
+        lines_per_page = self.int_param(params, "lines_per_page", 20)
+        lines_per_page = max(1, min(lines_per_page, config['max_lines_per_page']))
+        page = max(1, self.int_param(params, "page", 1))
+        page_rows = rows[(page - 1) * lines_per_page:page * lines_per_page]
+        has_next = page * lines_per_page < len(rows)
+
+        body = fixtures.render_page(fixtures.render_table(header, page_rows), page, has_next, parsed.path)
+        self.send_body(body.encode('utf-8'), "text/html; charset=utf-8")
+
+    def sleep(self, latency_ms: float, jitter_ms: float):
+        delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def send_body(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_asset(self, path: str):
+        if path.endswith(".css"):
+            self.send_body(b"body { font-family: sans-serif; }\n" * 200, "text/css")
+        elif path.endswith(".js"):
+            self.send_body(b"window.servicedesk = window.servicedesk || {};\n" * 200, "application/javascript")
+        else:
+            self.send_body(b"\0" * 20000, "application/octet-stream")
+
+    @staticmethod
+    def int_param(params: dict, name: str, default: int) -> int:
+        try:
+            return int(params[name][0])
+        except (KeyError, IndexError, ValueError):
+            return default
+
+    @staticmethod
+    def sp_ids_param(params: dict, *names) -> list:
+        sp_ids = []
+        for name in names:
+            for value in params.get(name, []):
+                try:
+                    sp_ids.append(int(value))
+                except ValueError:
+                    continue
+        return sp_ids
+
+    def sp_name(self, sp_id: int) -> str:
+        return self.server.sp_names.get(sp_id, f"sp_{sp_id}|RUB|PayPort")
+
+    def window(self, params: dict):
+        now = datetime.datetime.now().replace(microsecond=0)
+        from_date = parse_date(params.get("from_date", [""])[0], now - datetime.timedelta(days=1))
+        to_date = parse_date(params.get("to_date", [""])[0], now)
+        return from_date, to_date
+
+    def rng(self, *key) -> random.Random:
+        return random.Random("|".join(str(part) for part in key))
+
+    def active_sps(self, sp_ids: list, from_date, to_date) -> dict:
+        """СП, у которых были сделки за период (часть СП намеренно пустая)"""
+        sps = {}
+        for sp_id in sp_ids:
+            if self.rng("empty", sp_id, from_date, to_date).random() >= self.server.config['empty_ratio']:
+                sps[sp_id] = self.sp_name(sp_id)
+        return sps
+
+    def speed_rows(self, params: dict):
+        from_date, to_date = self.window(params)
+        sp_ids = self.sp_ids_param(params, "service_provider_ids[]")
+        sps = self.active_sps(sp_ids, from_date, to_date)
+        rows = fixtures.speed_rows(sps, self.server.config['traders_per_sp'], self.rng("speed", sp_ids, from_date, to_date))
+        return fixtures.SPEED_HEADER, rows
+
+    def conversion_rows(self, params: dict):
+        from_date, to_date = self.window(params)
+        sp_ids = self.sp_ids_param(params, "service_provider_ids[]")
+        sps = self.active_sps(sp_ids, from_date, to_date)
+        rows = fixtures.conversion_rows(sps, self.server.config['traders_per_sp'], self.rng("conversion", sp_ids, from_date, to_date))
+        return fixtures.CONVERSION_HEADER, rows
+
+    def ads_rows(self, params: dict):
+        rows = []
+        for sp_id in self.sp_ids_param(params, "service_provider_id[]"):
+            rows.extend(fixtures.ads_rows(self.server.config['ads_per_sp'], self.rng("ads", sp_id)))
+        return fixtures.ADS_HEADER, rows
+
+    def deals_rows(self, params: dict):
+        from_date, to_date = self.window(params)
+        config = self.server.config
+        rows = []
+        for sp_id in self.sp_ids_param(params, "service_provider[]"):
+            # Сделки раскиданы по последним 30 дням, в ответ попадают только сделки из периода
+            now = datetime.datetime.now().replace(second=0, microsecond=0)
+            step_minutes = 30 * 24 * 60 // max(1, config['deals_per_sp'])
+            deal_rows = fixtures.arbitrage_rows(config['deals_per_sp'], 1.0, self.rng("deals", sp_id), now, step_minutes)
+            for index, row in enumerate(deal_rows):
+                created = now - datetime.timedelta(minutes=index * step_minutes)
+                if from_date <= created <= to_date:
+                    rows.append(row)
+        return fixtures.DEALS_HEADER, rows
+
+    def bank_statements_rows(self, params: dict):
+        rows = []
+        for sp_id in self.sp_ids_param(params, "service_provider[]"):
+            rows.extend(fixtures.bank_statements_rows(
+                self.server.config['statements_per_sp'], 5, datetime.date.today(), self.rng("bank", sp_id)))
+        return fixtures.BANK_STATEMENTS_HEADER, rows
+
+def start_server(host: str = "127.0.0.1", port: int = 0, verbose: bool = False, sp_names: dict = None, **config):
+    """Запустить стенд в фоновом потоке. Возвращает (server, url)."""
+    server = ThreadingHTTPServer((host, port), FakeServicedeskHandler)
+    server.daemon_threads = True
+    server.config = dict(DEFAULT_CONFIG, **config)
+    server.sp_names = sp_names if sp_names is not None else load_sp_names()
+    server.verbose = verbose
+    server.stats = {}
+    server.stats_lock = threading.Lock()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Локальный стенд servicedesk для замеров PP-Parser")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=DEFAULT_CONFIG['latency_ms'], help="задержка страницы, мс")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_CONFIG['jitter_ms'], help="разброс задержки, мс")
+    parser.add_argument("--asset-latency", type=float, default=DEFAULT_CONFIG['asset_latency_ms'], help="задержка css/js/картинок, мс")
+    parser.add_argument("--traders", type=int, default=DEFAULT_CONFIG['traders_per_sp'], help="трейдеров на СП")
+    parser.add_argument("--ads", type=int, default=DEFAULT_CONFIG['ads_per_sp'], help="объявлений на СП")
+    parser.add_argument("--deals", type=int, default=DEFAULT_CONFIG['deals_per_sp'], help="спорных сделок на СП за 30 дней")
+    parser.add_argument("--statements", type=int, default=DEFAULT_CONFIG['statements_per_sp'], help="выписок на СП")
+    parser.add_argument("--empty-ratio", type=float, default=DEFAULT_CONFIG['empty_ratio'], help="доля СП без сделок")
+    parser.add_argument("--max-lines-per-page", type=int, default=DEFAULT_CONFIG['max_lines_per_page'])
+    parser.add_argument("--verbose", action="store_true", help="печатать каждый запрос")
+    args = parser.parse_args(argv)
+
+    server, url = start_server(
+        args.host, args.port, args.verbose,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        asset_latency_ms=args.asset_latency,
+        traders_per_sp=args.traders,
+        ads_per_sp=args.ads,
+        deals_per_sp=args.deals,
+        statements_per_sp=args.statements,
+        empty_ratio=args.empty_ratio,
+        max_lines_per_page=args.max_lines_per_page,
+    )
+    print(f"Стенд servicedesk запущен: {url}")
+    print(f"Запуск приложения против стенда: PP_SERVICEDESK_URL={url} python PP-Parser.py")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"Запросов по страницам: {server.stats}")
+
+if __name__ == "__main__":
+    main()
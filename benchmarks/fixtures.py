@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Синтетические страницы servicedesk для бенчмарков и локального стенда.
+
+Разметка повторяет колонки, которые читают парсеры PP-Parser.py:
+скорость (итог СП, итоги трейдеров, строки Sell/Buy), объявления,
+конверсия, сделки (строки deal-disputed) и банковские выписки.
+Генераторы строк возвращают списки HTML-строк <tr>, чтобы их можно было
+резать на страницы.
+"""
+
+import datetime
+import html
+import random
+
+SPEED_HEADER = ["СП", "Трейдер", "Тип", "Сделок", "Среднее время", "Арбитражи", "Медиана"]
+ADS_HEADER = ["ID", "СП", "Трейдер", "Валюта", "Мин", "Макс", "Курс", "Метод оплаты", "Банк", "Тип"]
+CONVERSION_HEADER = ["СП", "Трейдер", "Тип", "Создано", "Оплачено", "Отменено", "Всего", "Спор", "Истекло", "Конверсия"]
+DEALS_HEADER = [
+    "ID", "Invoice", "СП", "Трейдер", "Валюта", "Курс", "Фиат", "Сумма", "Платежная система", "Тип",
+    "Банк", "Карта", "Клиент", "Комиссия", "Прибыль", "Статус", "Обновлено", "Закрыто", "Создано",
+]
+BANK_STATEMENTS_HEADER = ["ID", "СП", "Счет", "Трейдер", "Банк", "Сумма", "Валюта", "Статус", "Файл", "Дата"]
+
+PAYMENT_METHODS = ["Humo", "Uzcard", "Sber", "Tinkoff", "Mbank", "Optima", "Payme", "Click"]
+CURRENCIES = ["UZS", "KGS", "RUB", "TJS", "PKR"]
+
+def make_sp_names(count: int, rng: random.Random = None) -> dict:
+    """Словарь {sp_id: название} в формате service_providers.txt"""
+    rng = rng or random.Random(0)
+    return {
+        100 + i: f"bench_sp_{i}|{rng.choice(CURRENCIES)}|PayPort"
+        for i in range(count)
+    }
+
+def render_row(cells, css_class: str = "") -> str:
+    class_attr = f' class="{css_class}"' if css_class else ""
+    return f"<tr{class_attr}>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>"
+
+def render_table(header: list, rows: list) -> str:
+    head = "<thead><tr>" + "".join(f"<th>{html.escape(title)}</th>" for title in header) + "</tr></thead>"
+    return f'<table class="table table-striped">{head}<tbody>{"".join(rows)}</tbody></table>'
+
+def render_page(table_html: str, page: int = 1, has_next: bool = False, title: str = "Servicedesk") -> str:
+    """Полная страница с навигацией, скриптами и пагинацией как у настоящего servicedesk"""
+    nav = "".join(f'<li class="nav-item"><a class="nav-link" href="/section-{i}">Раздел {i}</a></li>' for i in range(20))
+    prev_link = f'<li class="page-item"><a class="page-link" href="?page={page - 1}" rel="prev">&lsaquo;</a></li>' if page > 1 else ""
+    if has_next:
+        next_link = f'<li class="page-item"><a class="page-link" href="?page={page + 1}" rel="next">&rsaquo;</a></li>'
+    else:
+        next_link = '<li class="page-item disabled"><span class="page-link">&rsaquo;</span></li>'
+
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>{html.escape(title)}</title>"
+        '<link rel="stylesheet" href="/css/app.css">'
+        '<script src="/js/app.js"></script>'
+        "</head><body>"
+        f'<nav><ul class="navbar-nav">{nav}</ul></nav>'
+        f'<main class="container">{table_html}'
+        f'<ul class="pagination">{prev_link}<li class="page-item active"><span class="page-link">{page}</span></li>{next_link}</ul>'
+        "</main></body></html>"
+    )
+
+def speed_rows(sps: dict, traders_per_sp: int = 3, rng: random.Random = None) -> list:
+    """Страница скорости: итог СП, затем по каждому трейдеру итог и строки Sell/Buy"""
+    rng = rng or random.Random(0)
+    rows = []
+
+    for sp_id, sp_name in sps.items():
+        label = sp_name.split('|')[0].strip()
+        trader_rows = []
+        sp_deals = 0
+
+        for t in range(traders_per_sp):
+            trader = f"{label}_trader_{t}"
+            sell_deals = rng.randint(0, 60)
+            buy_deals = rng.randint(0, 60)
+            sp_deals += sell_deals + buy_deals
+            trader_rows.append(render_row(["", f"Total ({trader})", "", sell_deals + buy_deals, f"{rng.uniform(2, 15):.2f}", rng.randint(0, 3), ""]))
+            trader_rows.append(render_row([label, trader, "Sell", sell_deals, f"{rng.uniform(2, 15):.2f}", 0, ""]))
+            trader_rows.append(render_row([label, trader, "Buy", buy_deals, f"{rng.uniform(2, 15):.2f}", 0, ""]))
+
+        rows.append(render_row([f"Total ({label})", "", "", sp_deals, f"{rng.uniform(2, 15):.2f}", rng.randint(0, 5), ""]))
+        rows.extend(trader_rows)
+
+    return rows
+
+def conversion_rows(sps: dict, traders_per_sp: int = 3, rng: random.Random = None) -> list:
+    rng = rng or random.Random(0)
+    rows = []
+
+    for sp_id, sp_name in sps.items():
+        label = sp_name.split('|')[0].strip()
+        paid = rng.randint(0, 500)
+        cancelled = rng.randint(0, 200)
+        total = paid + cancelled
+        percent = f"{(paid / total * 100) if total else 0:.2f}%"
+        rows.append(render_row([f"Total ({label})", "", "", total, paid, cancelled, total, 0, 0, percent]))
+
+        for t in range(traders_per_sp):
+            rows.append(render_row([label, f"{label}_trader_{t}", "Sell", 10, 8, 2, 10, 0, 0, "80.00%"]))
+
+    return rows
+
+def ads_rows(count: int, rng: random.Random = None) -> list:
+    rng = rng or random.Random(0)
+    return [
+        render_row([
+            i, "bench_sp", f"trader_{i % 7}", rng.choice(CURRENCIES), 1000, 50000, "12.5",
+            rng.choice(PAYMENT_METHODS), "Bank", rng.choice(["Sell", "Buy"]),
+        ])
+        for i in range(count)
+    ]
+
+def arbitrage_rows(count: int, disputed_ratio: float = 0.2, rng: random.Random = None,
+                   newest: datetime.datetime = None, step_minutes: int = 7) -> list:
+    """Сделки от новых к старым, каждая на step_minutes раньше предыдущей"""
+    rng = rng or random.Random(0)
+    newest = newest or datetime.datetime(2025, 11, 1, 12, 0, 0)
+    rows = []
+
+    for i in range(count):
+        disputed = rng.random() < disputed_ratio
+        created = newest - datetime.timedelta(minutes=i * step_minutes)
+        cells = [
+            1_000_000 + i, f'<a href="/invoice/{i}">INV-{i:07d}</a>', "bench_sp", f"trader_{i % 9}",
+            rng.choice(CURRENCIES), "12.5", "RUB", f"{rng.uniform(500, 90000):.2f}", rng.choice(PAYMENT_METHODS),
+            rng.choice(["Sell", "Buy"]), "Bank", "**** 1234", f"client_{i}", "1.5", "0.8",
+            "Pending Arbitration" if disputed else "Paid", created.strftime("%d.%m.%Y %H:%M"), "",
+            created.strftime("%d.%m.%Y %H:%M"),
+        ]
+        rows.append(render_row(cells, "deal-disputed" if disputed else ""))
+
+    return rows
+
+def bank_statements_rows(count: int, traders: int = 10, newest: datetime.date = None, rng: random.Random = None) -> list:
+    """Выписки от новых к старым, по несколько в день"""
+    rng = rng or random.Random(0)
+    newest = newest or datetime.date(2025, 11, 1)
+    rows = []
+
+    for i in range(count):
+        date = newest - datetime.timedelta(days=i // 5)
+        rows.append(render_row([
+            i, "bench_sp", f"ACC{i:06d}", f"trader_{rng.randrange(traders)}", "Bank",
+            f"{rng.uniform(100, 5000):.2f}", "RUB", "Processed", "statement.pdf",
+            f"{date.strftime('%d.%m.%Y')} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        ]))
+
+    return rows
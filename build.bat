@@ -5,7 +5,7 @@ echo    Сборка Payport SP Parser
 echo ===============================================
 
 echo Установка зависимостей...
-pip install selenium==4.15.0 beautifulsoup4==4.12.2 lxml==4.9.3
+pip install selenium==4.15.0 lxml==4.9.3
 
 echo Очистка предыдущих сборок...
 if exist build rmdir /s /q build
@@ -21,7 +21,7 @@ pyinstaller --windowed ^
 --hidden-import=selenium.webdriver.chrome.service ^
 --hidden-import=selenium.webdriver.support.ui ^
 --hidden-import=selenium.webdriver.support.expected_conditions ^
---hidden-import=bs4 ^
+--hidden-import=lxml.html ^
 --hidden-import=lxml ^
 --hidden-import=urllib.parse ^
 --exclude-module=matplotlib ^
@@ -0,0 +1,1392 @@
+# -*- coding: utf-8 -*-
+"""Интерфейс PP-Parser на tkinter. Импортируется из PP-Parser.py только при запуске с окном."""
+
+import datetime
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, simpledialog
+
+# Общие функции и данные - из PP-Parser.py, который регистрирует себя как pp_parser
+from pp_parser import *
+
+class ModernSPFrame(ttk.Frame):
+    def __init__(self, parent, sp_vars, log_callback):
+        super().__init__(parent)
+        self.sp_vars = sp_vars
+        self.log_callback = log_callback
+        self.all_sp_ids = list(SERVICE_PROVIDERS.keys())
+        self.filtered_sp_ids = self.all_sp_ids.copy()
+        # Выбранные СП дублируются множеством, чтобы не опрашивать каждый BooleanVar
+        self.selected_ids = {sp_id for sp_id, var in sp_vars.items() if var.get()}
+        # Значения уже созданных строк дерева: обновляются только изменившиеся
+        self.row_values = {}
+        # Группа каждого СП на момент последнего refresh_tree
+        self.row_groups = {}
+        self.virtual_mode = False
+        self.window_start = 0
+        
+        self.name_filter_var = tk.StringVar()
+        self.employee_group_var = tk.StringVar(value="Все группы")
+        
+        self.filter_update_job = None
+        
+        self.setup_ui()
+        self.setup_filter_bindings()
+    
+    def setup_ui(self):
+        main_container = ttk.Frame(self)
+        main_container.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        filter_frame = ttk.LabelFrame(main_container, text="🔍 Фильтры", padding=10)
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        filter_row = ttk.Frame(filter_frame)
+        filter_row.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(filter_row, text="Поиск:").pack(side=tk.LEFT, padx=(0, 5))
+        self.name_entry = ttk.Entry(filter_row, textvariable=self.name_filter_var, width=20)
+        self.name_entry.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(filter_row, text="Группа:").pack(side=tk.LEFT, padx=(0, 5))
+        employee_groups = ["Все группы"] + EMPLOYEE_GROUPS.names()
+        self.employee_combo = ttk.Combobox(filter_row, textvariable=self.employee_group_var, 
+                                     values=employee_groups, width=20, state="readonly")
+        self.employee_combo.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Button(filter_row, text="🧹 Сбросить", 
+                  command=self.clear_filters).pack(side=tk.LEFT, padx=(0, 10))
+        
+        control_frame = ttk.Frame(main_container)
+        control_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Button(control_frame, text="✅ Выбрать все", 
+                  command=self.select_all).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(control_frame, text="❌ Снять все", 
+                  command=self.deselect_all).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(control_frame, text="⭐ Выбрать отфильтрованные", 
+                  command=self.select_filtered).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Информация о количестве СП перенесена в эту строку
+        self.filter_info_var = tk.StringVar(value=f"Всего СП: {len(self.all_sp_ids)}")
+        ttk.Label(control_frame, textvariable=self.filter_info_var, 
+                 font=("Arial", 9, "bold")).pack(side=tk.RIGHT, padx=(0, 10))
+        
+        sp_display_frame = ttk.LabelFrame(main_container, text="Service Providers", padding=5)
+        sp_display_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.setup_sp_treeview(sp_display_frame)
+    
+    def setup_filter_bindings(self):
+        self.name_entry.bind('<KeyRelease>', self.schedule_filter_update)
+        self.employee_combo.bind('<<ComboboxSelected>>', self.schedule_filter_update)
+    
+    def setup_sp_treeview(self, parent):
+        tree_frame = ttk.Frame(parent)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        
+        columns = ("selected", "id", "name", "group")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="tree headings", height=12)
+        
+        self.tree.heading("selected", text="✅")
+        self.tree.heading("id", text="ID")
+        self.tree.heading("name", text="Название СП")
+        self.tree.heading("group", text="Группа")
+        
+        self.tree.column("selected", width=60, anchor="center")
+        self.tree.column("id", width=50, anchor="center")
+        self.tree.column("name", width=250, anchor="w")
+        self.tree.column("group", width=150, anchor="w")
+        
+        self.v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.on_vertical_scroll)
+        h_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(yscrollcommand=self.on_tree_yscroll, xscrollcommand=h_scroll.set)
+        
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.v_scroll.grid(row=0, column=1, sticky="ns")
+        h_scroll.grid(row=1, column=0, sticky="ew")
+        
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        
+        self.tree.bind('<Button-1>', self.on_tree_click)
+        self.tree.bind('<Configure>', self.on_tree_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_mouse_wheel)
+        
+        self.refresh_tree()
+    
+    def get_sp_group(self, sp_id):
+        return EMPLOYEE_GROUPS.group_of(sp_id) or NO_GROUP_LABEL
+    
+    def should_show_sp(self, sp_id, sp_name, filters, sp_group):
+        name_match = filters['name_matches'] is None or sp_id in filters['name_matches']
+        
+        group_match = True
+        if filters['employee_group'] != "Все группы":
+            group_match = sp_group == filters['employee_group']
+        
+        return all([name_match, group_match])
+    
+    def build_row_values(self, sp_id, sp_group):
+        selected_mark = "✅ ВЫБРАН" if sp_id in self.selected_ids else "☐ Выбрать"
+        return (selected_mark, sp_id, SERVICE_PROVIDERS[sp_id], sp_group)
+    
+    def show_row(self, sp_id):
+        """Создать строку СП, если ее еще нет, или обновить значения, если они изменились"""
+        values = self.build_row_values(sp_id, self.row_groups[sp_id])
+        current = self.row_values.get(sp_id)
+        if current is None:
+            self.tree.insert("", "end", iid=str(sp_id), values=values)
+        elif current != values:
+            self.tree.item(str(sp_id), values=values)
+        self.row_values[sp_id] = values
+    
+    def refresh_tree(self):
+        """Показать отфильтрованные СП, не пересоздавая строки.
+        
+        Существующие строки переподключаются (set_children отключает остальные),
+        у них обновляются только изменившиеся значения. Если СП больше
+        TREE_VIRTUAL_THRESHOLD, в дереве находятся только строки видимого окна.
+        """
+        # Строки удаленных СП
+        for sp_id in [sp_id for sp_id in self.row_values if sp_id not in SERVICE_PROVIDERS]:
+            self.tree.delete(str(sp_id))
+            del self.row_values[sp_id]
+        
+        name_matches, fuzzy = SP_SEARCH_INDEX.search(self.name_filter_var.get())
+        filters = {
+            'name_matches': name_matches,
+            'employee_group': self.employee_group_var.get()
+        }
+        
+        # Группа определяется один раз на строку - и для фильтра, и для колонки
+        self.row_groups = {sp_id: self.get_sp_group(sp_id) for sp_id in SERVICE_PROVIDERS}
+        self.filtered_sp_ids = [
+            sp_id for sp_id, sp_name in SERVICE_PROVIDERS.items()
+            if self.should_show_sp(sp_id, sp_name, filters, self.row_groups[sp_id])
+        ]
+        
+        self.virtual_mode = len(self.filtered_sp_ids) > TREE_VIRTUAL_THRESHOLD
+        if self.virtual_mode:
+            self.render_window()
+        else:
+            for sp_id in self.filtered_sp_ids:
+                self.show_row(sp_id)
+            self.tree.set_children("", *(str(sp_id) for sp_id in self.filtered_sp_ids))
+        
+        self.update_selection_counter()
+        
+        if not self.filtered_sp_ids and self.all_sp_ids:
+            self.log_callback("ℹ️ Нет СП, соответствующих фильтрам")
+        elif fuzzy and self.filtered_sp_ids:
+            self.log_callback("🔍 Точных совпадений нет, показаны похожие СП")
+    
+    def window_rows(self):
+        """Сколько строк помещается в дереве"""
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            row_height = 20
+        return max(int(self.tree['height']), self.tree.winfo_height() // row_height)
+    
+    def render_window(self):
+        total = len(self.filtered_sp_ids)
+        rows = self.window_rows()
+        self.window_start = max(0, min(self.window_start, total - rows))
+        
+        window = self.filtered_sp_ids[self.window_start:self.window_start + rows]
+        for sp_id in window:
+            self.show_row(sp_id)
+        self.tree.set_children("", *(str(sp_id) for sp_id in window))
+        
+        if total:
+            self.v_scroll.set(self.window_start / total, min(1.0, (self.window_start + rows) / total))
+        else:
+            self.v_scroll.set(0.0, 1.0)
+    
+    def on_tree_yscroll(self, first, last):
+        # В оконном режиме положение ползунка считает render_window
+        if not self.virtual_mode:
+            self.v_scroll.set(first, last)
+    
+    def on_vertical_scroll(self, *args):
+        if not self.virtual_mode:
+            self.tree.yview(*args)
+            return
+        
+        if args[0] == 'moveto':
+            self.window_start = int(float(args[1]) * len(self.filtered_sp_ids))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                amount *= self.window_rows()
+            self.window_start += amount
+        self.render_window()
+    
+    def on_mouse_wheel(self, event):
+        if not self.virtual_mode:
+            return None
+        
+        step = -3 if event.num == 4 or event.delta > 0 else 3
+        self.on_vertical_scroll('scroll', step, 'units')
+        return "break"
+    
+    def on_tree_resize(self, event=None):
+        if self.virtual_mode:
+            self.render_window()
+    
+    def update_tree_item(self, item_id):
+        if item_id in self.row_values:
+            self.show_row(item_id)
+    
+    def on_tree_click(self, event):
+        item = self.tree.identify_row(event.y)
+        
+        if item:
+            sp_id = int(item)
+            current_state = sp_id in self.selected_ids
+            self.sp_vars[sp_id].set(not current_state)
+            if current_state:
+                self.selected_ids.discard(sp_id)
+            else:
+                self.selected_ids.add(sp_id)
+            self.update_tree_item(sp_id)
+            self.update_selection_counter()
+    
+    def update_selection_counter(self):
+        selected_count = len(self.selected_ids)
+        visible_count = len(self.filtered_sp_ids)
+        self.filter_info_var.set(f"Показано: {visible_count} из {len(self.all_sp_ids)} | Выбрано: {selected_count}")
+    
+    def schedule_filter_update(self, event=None):
+        if self.filter_update_job:
+            self.after_cancel(self.filter_update_job)
+        self.filter_update_job = self.after(300, self.refresh_tree)
+    
+    def clear_filters(self):
+        self.name_filter_var.set("")
+        self.employee_group_var.set("Все группы")
+        self.refresh_tree()
+        self.log_callback("🧹 Все фильтры сброшены")
+    
+    def select_all(self):
+        for var in self.sp_vars.values():
+            var.set(True)
+        self.selected_ids = set(self.sp_vars.keys())
+        self.refresh_tree()
+        self.log_callback("✅ Выбраны все СП")
+    
+    def deselect_all(self):
+        for var in self.sp_vars.values():
+            var.set(False)
+        self.selected_ids = set()
+        self.refresh_tree()
+        self.log_callback("❌ Выбор снят со всех СП")
+    
+    def select_filtered(self):
+        for var in self.sp_vars.values():
+            var.set(False)
+        
+        for sp_id in self.filtered_sp_ids:
+            self.sp_vars[sp_id].set(True)
+        self.selected_ids = set(self.filtered_sp_ids)
+        
+        self.refresh_tree()
+        self.log_callback(f"⭐ Выбраны отфильтрованные СП: {len(self.filtered_sp_ids)}")
+    
+    def update_service_providers(self, new_service_providers, new_sp_vars):
+        """Обновить список СП в интерфейсе"""
+        self.sp_vars = new_sp_vars
+        self.all_sp_ids = list(new_service_providers.keys())
+        self.filtered_sp_ids = self.all_sp_ids.copy()
+        self.selected_ids = {sp_id for sp_id, var in new_sp_vars.items() if var.get()}
+        self.refresh_tree()
+        self.log_callback(f"🔄 Список СП обновлен: {len(self.all_sp_ids)} providers")
+    
+    def apply_service_providers_diff(self, added_ids, removed_ids):
+        """Учесть добавленные и удаленные СП, не трогая выбор остальных"""
+        self.all_sp_ids = list(SERVICE_PROVIDERS.keys())
+        self.selected_ids.difference_update(removed_ids)
+        self.selected_ids.update(sp_id for sp_id in added_ids if self.sp_vars[sp_id].get())
+        self.refresh_tree()
+    
+    def refresh_groups_display(self):
+        """Обновить отображение групп для всех СП"""
+        # Обновляем значения в комбобоксе фильтра
+        employee_groups = ["Все группы"] + EMPLOYEE_GROUPS.names()
+        self.employee_combo['values'] = employee_groups
+        
+        # Обновляем дерево
+        self.refresh_tree()
+
+class TimeFrame(ttk.LabelFrame):
+    def __init__(self, parent, log_callback):
+        super().__init__(parent, text="🕒 Временные промежутки", padding=10)
+        self.log_callback = log_callback
+        
+        now = datetime.datetime.now()
+        
+        self.speed_from_var = tk.StringVar(value=self.calculate_from_time(now, 'speed').strftime("%Y-%m-%d %H:%M:%S"))
+        self.speed_to_var = tk.StringVar(value="")
+        self.conversion_from_var = tk.StringVar(value=self.calculate_from_time(now, 'conversion').strftime("%Y-%m-%d %H:%M:%S"))
+        self.conversion_to_var = tk.StringVar(value="")
+        self.arbitrage_from_var = tk.StringVar(value=self.calculate_from_time(now, 'arbitrage').strftime("%Y-%m-%d %H:%M:%S"))
+        self.arbitrage_to_var = tk.StringVar(value="")
+        
+        self.setup_ui()
+    
+    def calculate_from_time(self, now: datetime.datetime, time_type: str) -> datetime.datetime:
+        return calculate_from_time(now, time_type)
+    
+    def setup_ui(self):
+        time_grid = ttk.Frame(self)
+        time_grid.pack(fill=tk.X)
+        
+        # Заголовки
+        ttk.Label(time_grid, text="", width=8).grid(row=0, column=0, padx=2, pady=2)
+        ttk.Label(time_grid, text="От", width=15).grid(row=0, column=1, padx=2, pady=2)
+        ttk.Label(time_grid, text="До", width=15).grid(row=0, column=2, padx=2, pady=2)
+        ttk.Label(time_grid, text="", width=10).grid(row=0, column=3, padx=2, pady=2)  # Пустая колонка для кнопок
+        
+        # Скорость
+        ttk.Label(time_grid, text="Скорость:").grid(row=1, column=0, padx=2, pady=2, sticky=tk.W)
+        ttk.Entry(time_grid, textvariable=self.speed_from_var, width=15).grid(row=1, column=1, padx=2, pady=2)
+        ttk.Entry(time_grid, textvariable=self.speed_to_var, width=15).grid(row=1, column=2, padx=2, pady=2)
+        
+        # Конверсия
+        ttk.Label(time_grid, text="Конверсия:").grid(row=2, column=0, padx=2, pady=2, sticky=tk.W)
+        ttk.Entry(time_grid, textvariable=self.conversion_from_var, width=15).grid(row=2, column=1, padx=2, pady=2)
+        ttk.Entry(time_grid, textvariable=self.conversion_to_var, width=15).grid(row=2, column=2, padx=2, pady=2)
+        
+        # Арбитражи
+        ttk.Label(time_grid, text="Арбитражи:").grid(row=3, column=0, padx=2, pady=2, sticky=tk.W)
+        ttk.Entry(time_grid, textvariable=self.arbitrage_from_var, width=15).grid(row=3, column=1, padx=2, pady=2)
+        ttk.Entry(time_grid, textvariable=self.arbitrage_to_var, width=15).grid(row=3, column=2, padx=2, pady=2)
+        
+        # Кнопки управления временем - теперь в той же строке что и поля
+        button_frame = ttk.Frame(time_grid)
+        button_frame.grid(row=1, column=3, rowspan=3, padx=10, pady=2, sticky=tk.N)
+        
+        ttk.Button(button_frame, text="🔄 Сбросить время", command=self.reset_time).pack(side=tk.TOP, pady=(0, 5))
+        ttk.Button(button_frame, text="⏰ Текущее время", command=self.set_current_time).pack(side=tk.TOP)
+    
+    def reset_time(self):
+        now = datetime.datetime.now()
+        
+        self.speed_from_var.set(self.calculate_from_time(now, 'speed').strftime("%Y-%m-%d %H:%M:%S"))
+        self.speed_to_var.set("")
+        self.conversion_from_var.set(self.calculate_from_time(now, 'conversion').strftime("%Y-%m-%d %H:%M:%S"))
+        self.conversion_to_var.set("")
+        self.arbitrage_from_var.set(self.calculate_from_time(now, 'arbitrage').strftime("%Y-%m-%d %H:%M:%S"))
+        self.arbitrage_to_var.set("")
+        
+        self.log_callback("🕒 Время сброшено к оригинальным значениям")
+    
+    def set_current_time(self):
+        now = datetime.datetime.now()
+        current_time = now.strftime("%Y-%m-%d %H:%M:%S")
+        
+        if not self.speed_to_var.get():
+            self.speed_to_var.set(current_time)
+        if not self.conversion_to_var.get():
+            self.conversion_to_var.set(current_time)
+        if not self.arbitrage_to_var.get():
+            self.arbitrage_to_var.set(current_time)
+        
+        self.log_callback(f"⏰ Установлено текущее время: {current_time}")
+
+class GroupManagementFrame(ttk.LabelFrame):
+    def __init__(self, parent, log_callback, main_app):
+        super().__init__(parent, text="👥 Управление группами", padding=10)
+        self.log_callback = log_callback
+        self.main_app = main_app
+        self.setup_ui()
+    
+    def setup_ui(self):
+        # Верхняя панель с управлением группами
+        group_control_frame = ttk.Frame(self)
+        group_control_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(group_control_frame, text="Группа:").pack(side=tk.LEFT, padx=(0, 5))
+        self.group_var = tk.StringVar()
+        self.group_combo = ttk.Combobox(group_control_frame, textvariable=self.group_var, 
+                                       values=EMPLOYEE_GROUPS.names(), width=25, state="readonly")
+        self.group_combo.pack(side=tk.LEFT, padx=(0, 10))
+        self.group_combo.bind('<<ComboboxSelected>>', self.on_group_selected)
+        
+        ttk.Button(group_control_frame, text="➕ Новая", 
+                  command=self.add_new_group).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(group_control_frame, text="✏️ Переим.", 
+                  command=self.rename_group).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(group_control_frame, text="🗑️ Удалить", 
+                  command=self.delete_group).pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Панель управления СП в группе
+        sp_management_frame = ttk.Frame(self)
+        sp_management_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Button(sp_management_frame, text="➕ Назначить группу", 
+                  command=self.assign_selected_to_group).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(sp_management_frame, text="🧹 Убрать из групп", 
+                  command=self.remove_from_all_groups).pack(side=tk.LEFT, padx=(0, 10))
+    
+    def on_group_selected(self, event=None):
+        pass
+    
+    def add_new_group(self):
+        new_name = simpledialog.askstring("Новая группа", "Введите название новой группы:")
+        if not new_name:
+            return
+        
+        new_name = new_name.strip()
+        if not new_name:
+            messagebox.showwarning("Внимание", "Название группы не может быть пустым!")
+            return
+        
+        if new_name in EMPLOYEE_GROUPS:
+            messagebox.showwarning("Внимание", "Группа с таким названием уже существует!")
+            return
+        
+        EMPLOYEE_GROUPS.add_group(new_name)
+        if EMPLOYEE_GROUPS.save():
+            self.group_combo['values'] = EMPLOYEE_GROUPS.names()
+            self.group_var.set(new_name)
+            # Обновляем комбобокс в основном интерфейсе
+            self.main_app.sp_frame.refresh_groups_display()
+            # Принудительно обновляем дерево
+            self.main_app.sp_frame.refresh_tree()
+            self.log_callback(f"✅ Добавлена новая группа: {new_name}")
+    
+    def rename_group(self):
+        old_name = self.group_var.get()
+        if not old_name:
+            messagebox.showwarning("Внимание", "Выберите группу для переименования!")
+            return
+        
+        new_name = simpledialog.askstring("Переименование группы", 
+                                         f"Введите новое название для группы '{old_name}':",
+                                         initialvalue=old_name)
+        if not new_name:
+            return
+        
+        new_name = new_name.strip()
+        if not new_name:
+            messagebox.showwarning("Внимание", "Название группы не может быть пустым!")
+            return
+        
+        if new_name in EMPLOYEE_GROUPS:
+            messagebox.showwarning("Внимание", "Группа с таким названием уже существует!")
+            return
+        
+        EMPLOYEE_GROUPS.rename_group(old_name, new_name)
+        if EMPLOYEE_GROUPS.save():
+            self.group_combo['values'] = EMPLOYEE_GROUPS.names()
+            self.group_var.set(new_name)
+            # Обновляем комбобокс в основном интерфейсе
+            self.main_app.sp_frame.refresh_groups_display()
+            # Принудительно обновляем дерево
+            self.main_app.sp_frame.refresh_tree()
+            self.log_callback(f"✏️ Группа переименована: {old_name} -> {new_name}")
+    
+    def delete_group(self):
+        group_name = self.group_var.get()
+        if not group_name:
+            messagebox.showwarning("Внимание", "Выберите группу для удаления!")
+            return
+        
+        result = messagebox.askyesno("Подтверждение", 
+                                   f"Вы уверены, что хотите удалить группу '{group_name}'?")
+        if not result:
+            return
+        
+        # Сохраняем количество СП в группе для лога
+        sp_count = EMPLOYEE_GROUPS.delete_group(group_name)
+        if EMPLOYEE_GROUPS.save():
+            self.group_combo['values'] = EMPLOYEE_GROUPS.names()
+            self.group_var.set("")
+            # Обновляем комбобокс в основном интерфейсе
+            self.main_app.sp_frame.refresh_groups_display()
+            # Принудительно обновляем дерево
+            self.main_app.sp_frame.refresh_tree()
+            self.log_callback(f"🗑️ Удалена группа '{group_name}' с {sp_count} СП")
+    
+    def assign_selected_to_group(self):
+        """Назначить выбранные СП в указанную группу (удаляя из других групп)"""
+        group_name = self.group_var.get()
+        if not group_name:
+            messagebox.showwarning("Внимание", "Выберите группу!")
+            return
+        
+        if self.main_app and hasattr(self.main_app, 'get_selected_sps'):
+            selected_sps = self.main_app.get_selected_sps()
+            if not selected_sps:
+                messagebox.showwarning("Внимание", "Не выбран ни один СП!")
+                return
+            
+            assigned_count = 0
+            moved_count = 0
+            
+            for sp_id in selected_sps.keys():
+                # СП убирается из всех других групп и добавляется в целевую, если его там еще нет
+                result = EMPLOYEE_GROUPS.assign(sp_id, group_name)
+                if result == 'moved':
+                    moved_count += 1
+                elif result == 'added':
+                    assigned_count += 1
+            
+            # Всегда сохраняем и обновляем интерфейс, даже если ничего не изменилось
+            if EMPLOYEE_GROUPS.save():
+                # ОБНОВЛЯЕМ ОТОБРАЖЕНИЕ ГРУПП В ОСНОВНОМ ИНТЕРФЕЙСЕ
+                self.main_app.sp_frame.refresh_groups_display()
+                # ПРИНУДИТЕЛЬНО ОБНОВЛЯЕМ ДЕРЕВО
+                self.main_app.sp_frame.refresh_tree()
+                
+                message_parts = []
+                if assigned_count > 0:
+                    message_parts.append(f"добавлено {assigned_count}")
+                if moved_count > 0:
+                    message_parts.append(f"перемещено {moved_count}")
+                
+                if assigned_count > 0 or moved_count > 0:
+                    self.log_callback(f"✅ {', '.join(message_parts)} СП в группу '{group_name}'")
+                else:
+                    self.log_callback(f"ℹ️ Все выбранные СП уже находятся в группе '{group_name}'")
+        else:
+            messagebox.showerror("Ошибка", "Не удалось получить доступ к списку выбранных СП!")
+    
+    def remove_from_all_groups(self):
+        """Убрать выбранные СП из всех групп"""
+        if self.main_app and hasattr(self.main_app, 'get_selected_sps'):
+            selected_sps = self.main_app.get_selected_sps()
+            if not selected_sps:
+                messagebox.showwarning("Внимание", "Не выбран ни один СП!")
+                return
+            
+            removed_count = 0
+            
+            for sp_id in selected_sps.keys():
+                # Удаляем СП из всех групп
+                removed_count += EMPLOYEE_GROUPS.remove_sp(sp_id)
+            
+            # Всегда сохраняем и обновляем интерфейс
+            if EMPLOYEE_GROUPS.save():
+                # ОБНОВЛЯЕМ ОТОБРАЖЕНИЕ ГРУПП В ОСНОВНОМ ИНТЕРФЕЙСЕ
+                self.main_app.sp_frame.refresh_groups_display()
+                # ПРИНУДИТЕЛЬНО ОБНОВЛЯЕМ ДЕРЕВО
+                self.main_app.sp_frame.refresh_tree()
+                
+                if removed_count > 0:
+                    self.log_callback(f"🧹 Убрано {removed_count} СП из всех групп")
+                else:
+                    self.log_callback("ℹ️ Выбранные СП не состоят ни в одной группе")
+        else:
+            messagebox.showerror("Ошибка", "Не удалось получить доступ к списку выбранных СП!")
+
+class PayportApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Payport SP Parser v10.8")
+        self.root.geometry("1400x900")
+        self.root.minsize(1000, 700)
+        
+        # Сначала инициализируем основные переменные
+        self.sp_vars = {sp_id: tk.BooleanVar(value=True) for sp_id in SERVICE_PROVIDERS.keys()}
+        self.auto_no_incidents_var = tk.BooleanVar(value=True)
+        self.batch_mode_var = tk.BooleanVar(value=False)
+        self.refresh_cache_var = tk.BooleanVar(value=False)
+        self.trace_var = tk.BooleanVar(value=False)
+        self.lean_fetch_var = tk.BooleanVar(value=True)
+        self.batch_size_var = tk.IntVar(value=BATCH_CHUNK_SIZE)
+        self.tab_count_var = tk.IntVar(value=1)
+        
+        self.stop_processing = False
+        self.processing_thread = None
+        self.driver = None
+        self.chrome_process = None
+        self.last_reports_folder = None
+        
+        # Инициализируем log_text как None
+        self.log_text = None
+        
+        self.ui_bus = UIEventBus()
+        setup_file_logging()
+        FILE_WRITER.error_func = self.log
+        self.session_log_path, self.session_log = self.open_session_log()
+        
+        self.setup_ui()
+        self.setup_sp_management()
+        
+        # Списки СП и групп читаются после того, как окно показано
+        self.root.after_idle(self.load_data)
+        self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_ui_events)
+    
+    def load_data(self):
+        load_data_files()
+        
+        self.sp_vars = {sp_id: tk.BooleanVar(value=True) for sp_id in SERVICE_PROVIDERS.keys()}
+        self.sp_frame.employee_combo['values'] = ["Все группы"] + EMPLOYEE_GROUPS.names()
+        self.group_frame.group_combo['values'] = EMPLOYEE_GROUPS.names()
+        self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
+        
+        self.file_watcher = DataFileWatcher([get_data_path("service_providers.txt"), get_data_path("employee_groups.json")])
+        self.root.after(FILE_WATCH_INTERVAL_MS, self.check_data_files)
+    
+    def check_data_files(self):
+        """Подхватить изменения service_providers.txt и employee_groups.json, сделанные вне приложения"""
+        try:
+            for path in self.file_watcher.check():
+                if os.path.basename(path) == "service_providers.txt":
+                    diff = self.apply_service_providers(read_service_providers(path))
+                    self.log(f"🔄 service_providers.txt изменен: +{len(diff['added'])} / "
+                             f"-{len(diff['removed'])} / переименовано {len(diff['renamed'])}")
+                else:
+                    self.apply_employee_groups(read_employee_groups(path))
+                    self.log("🔄 employee_groups.json изменен, группы обновлены")
+        except Exception as e:
+            self.log(f"⚠️ Не удалось применить изменения файла: {str(e)}")
+        finally:
+            self.root.after(FILE_WATCH_INTERVAL_MS, self.check_data_files)
+    
+    def apply_service_providers(self, new_providers: dict) -> dict:
+        """Привести список СП к new_providers, меняя только разницу.
+        
+        Переменные выбора создаются только для новых СП, у остальных
+        выбор пользователя сохраняется.
+        """
+        diff = diff_service_providers(SERVICE_PROVIDERS, new_providers)
+        if not any(diff.values()):
+            return diff
+        
+        for sp_id in diff['removed']:
+            SP_SEARCH_INDEX.remove(sp_id)
+            del self.sp_vars[sp_id]
+        for sp_id, sp_name in {**diff['added'], **diff['renamed']}.items():
+            SP_SEARCH_INDEX.add(sp_id, sp_name)
+        for sp_id in diff['added']:
+            self.sp_vars[sp_id] = tk.BooleanVar(value=True)
+        
+        # Порядок как в файле
+        SERVICE_PROVIDERS.clear()
+        SERVICE_PROVIDERS.update(new_providers)
+        
+        self.sp_frame.apply_service_providers_diff(diff['added'], diff['removed'])
+        return diff
+    
+    def apply_employee_groups(self, groups: dict):
+        EMPLOYEE_GROUPS.load(groups)
+        
+        self.group_frame.group_combo['values'] = EMPLOYEE_GROUPS.names()
+        if self.group_frame.group_var.get() not in EMPLOYEE_GROUPS:
+            self.group_frame.group_var.set("")
+        # Группа, выбранная в фильтре, могла исчезнуть из файла
+        if self.sp_frame.employee_group_var.get() not in EMPLOYEE_GROUPS:
+            self.sp_frame.employee_group_var.set("Все группы")
+        self.sp_frame.refresh_groups_display()
+    
+    def setup_ui(self):
+        style = ttk.Style()
+        style.configure("TButton", padding=6)
+        style.configure("TLabelframe", padding=10)
+        style.configure("TLabelframe.Label", font=("Arial", 10, "bold"))
+        
+        # Создаем основной контейнер с прокруткой
+        main_container = ttk.Frame(self.root)
+        main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        # Создаем панель с вкладками вместо PanedWindow
+        notebook = ttk.Notebook(main_container)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        
+        # Левая вкладка - основные функции
+        left_tab = ttk.Frame(notebook)
+        notebook.add(left_tab, text="📊 Основные функции")
+        
+        # Правая вкладка - логи
+        right_tab = ttk.Frame(notebook)
+        notebook.add(right_tab, text="📝 Логи выполнения")
+        
+        # СНАЧАЛА настраиваем правую панель с логами
+        self.setup_right_panel(right_tab)
+        
+        # ПОТОМ левую панель
+        self.setup_left_panel(left_tab)
+        
+        # Настройка весов для масштабирования
+        main_container.columnconfigure(0, weight=1)
+        main_container.rowconfigure(0, weight=1)
+        
+    def setup_left_panel(self, parent):
+        # Используем grid с весами для правильного масштабирования
+        parent.columnconfigure(0, weight=1)
+        parent.columnconfigure(1, weight=1)
+        parent.rowconfigure(0, weight=0)  # Время
+        parent.rowconfigure(1, weight=0)  # Управление СП и группы
+        parent.rowconfigure(2, weight=1)  # СП получают наибольший вес
+        parent.rowconfigure(3, weight=0)  # Управление обработкой
+        
+        # Временные промежутки - на самый верх
+        self.time_frame = TimeFrame(parent, self.log)
+        self.time_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        
+        # Блок управления СП и группами - рядом
+        management_frame = ttk.Frame(parent)
+        management_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(0, 10))
+        management_frame.columnconfigure(0, weight=1)
+        management_frame.columnconfigure(1, weight=1)
+        
+        # Управление СП - слева
+        self.sp_management_frame = ttk.LabelFrame(management_frame, text="🔧 Управление СП", padding=10)
+        self.sp_management_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
+        self.setup_sp_management_ui()
+        
+        # Управление группами - справа (ПЕРЕДАЕМ self КАК main_app)
+        self.group_frame = GroupManagementFrame(management_frame, self.log, self)
+        self.group_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
+        
+        # Список СП - под блоком управления
+        self.sp_frame = ModernSPFrame(parent, self.sp_vars, self.log)
+        self.sp_frame.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
+        
+        # Управление обработкой - внизу
+        control_frame = ttk.LabelFrame(parent, text="🚀 Управление обработкой", padding=10)
+        control_frame.grid(row=3, column=0, columnspan=2, sticky="ew")
+        
+        settings_frame = ttk.Frame(control_frame)
+        settings_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.auto_no_incidents_cb = ttk.Checkbutton(
+            settings_frame, 
+            text="Автоматически заполнять 'Инцидентов не найдено' в пункте 6",
+            variable=self.auto_no_incidents_var
+        )
+        self.auto_no_incidents_cb.pack(side=tk.LEFT)
+        
+        self.refresh_cache_cb = ttk.Checkbutton(
+            settings_frame,
+            text="Не брать страницы из кэша",
+            variable=self.refresh_cache_var
+        )
+        self.refresh_cache_cb.pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.trace_cb = ttk.Checkbutton(
+            settings_frame,
+            text="Сохранять таймлайн (trace.json)",
+            variable=self.trace_var
+        )
+        self.trace_cb.pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.lean_fetch_cb = ttk.Checkbutton(
+            settings_frame,
+            text="Не загружать стили и картинки",
+            variable=self.lean_fetch_var
+        )
+        self.lean_fetch_cb.pack(side=tk.LEFT, padx=(20, 0))
+        
+        batch_frame = ttk.Frame(control_frame)
+        batch_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        self.batch_mode_cb = ttk.Checkbutton(
+            batch_frame,
+            text="Пакетная загрузка скорости и конверсии, СП на страницу:",
+            variable=self.batch_mode_var
+        )
+        self.batch_mode_cb.pack(side=tk.LEFT)
+        
+        self.batch_size_spin = ttk.Spinbox(batch_frame, from_=2, to=200, width=5, textvariable=self.batch_size_var)
+        self.batch_size_spin.pack(side=tk.LEFT, padx=(5, 0))
+        
+        ttk.Label(batch_frame, text="Вкладок Chrome:").pack(side=tk.LEFT, padx=(20, 5))
+        self.tab_count_spin = ttk.Spinbox(batch_frame, from_=1, to=MAX_TAB_COUNT, width=5, textvariable=self.tab_count_var)
+        self.tab_count_spin.pack(side=tk.LEFT)
+        
+        btn_container = ttk.Frame(control_frame)
+        btn_container.pack(fill=tk.X)
+        
+        self.start_button = ttk.Button(btn_container, text="▶️ Запуск обработки", command=self.start_processing)
+        self.start_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.resume_button = ttk.Button(btn_container, text="⏯️ Продолжить прерванный", command=self.resume_last_run)
+        self.resume_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.stop_button = ttk.Button(btn_container, text="⏹️ Остановить", command=self.stop_processing_command, state="disabled")
+        self.stop_button.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.open_folder_button = ttk.Button(btn_container, text="📁 Открыть папку отчетов", command=self.open_last_reports_folder, state="disabled")
+        self.open_folder_button.pack(side=tk.LEFT)
+        
+        self.progress = ttk.Progressbar(control_frame, mode='determinate')
+        self.progress.pack(fill=tk.X, pady=(10, 0))
+        
+        self.status_var = tk.StringVar(value="Готов к работе")
+        status_label = ttk.Label(control_frame, textvariable=self.status_var, font=("Arial", 9))
+        status_label.pack(pady=(5, 0))
+    
+    def setup_right_panel(self, parent):
+        parent.columnconfigure(0, weight=1)
+        parent.rowconfigure(0, weight=1)
+        
+        log_frame = ttk.LabelFrame(parent, text="📝 Логи выполнения", padding=10)
+        log_frame.grid(row=0, column=0, sticky="nsew")
+        
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
+        
+        self.log_text = scrolledtext.ScrolledText(log_frame, height=20, width=60, font=("Consolas", 9))
+        self.log_text.grid(row=0, column=0, sticky="nsew")
+        
+        log_control = ttk.Frame(log_frame)
+        log_control.grid(row=1, column=0, sticky="ew", pady=(5, 0))
+        
+        ttk.Button(log_control, text="🧹 Очистить логи", command=self.clear_logs).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(log_control, text="💾 Сохранить логи", command=self.save_logs).pack(side=tk.LEFT)
+    
+    def setup_sp_management(self):
+        """Настройка управления СП - теперь это отдельный метод для инициализации переменных"""
+        pass
+    
+    def setup_sp_management_ui(self):
+        """Настройка UI управления СП"""
+        # Поля для ввода нового СП
+        input_frame = ttk.Frame(self.sp_management_frame)
+        input_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(input_frame, text="ID:").pack(side=tk.LEFT, padx=(0, 5))
+        self.new_sp_id_var = tk.StringVar()
+        self.new_sp_id_entry = ttk.Entry(input_frame, textvariable=self.new_sp_id_var, width=8)
+        self.new_sp_id_entry.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(input_frame, text="Название:").pack(side=tk.LEFT, padx=(0, 5))
+        self.new_sp_name_var = tk.StringVar()
+        self.new_sp_name_entry = ttk.Entry(input_frame, textvariable=self.new_sp_name_var, width=30)
+        self.new_sp_name_entry.pack(side=tk.LEFT, padx=(0, 10))
+        
+        # Кнопки управления
+        btn_frame = ttk.Frame(self.sp_management_frame)
+        btn_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(btn_frame, text="➕ Добавить СП", command=self.add_service_provider).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="➖ Удалить выбранные", command=self.delete_selected_providers).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="🔄 Обновить из файла", command=self.reload_service_providers).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(btn_frame, text="📝 Открыть файл СП", command=self.open_service_providers_file).pack(side=tk.LEFT)
+    
+    def add_service_provider(self):
+        """Добавить нового Service Provider"""
+        sp_id = self.new_sp_id_var.get().strip()
+        sp_name = self.new_sp_name_var.get().strip()
+        
+        if not sp_id or not sp_name:
+            messagebox.showerror("Ошибка", "Заполните ID и название СП!")
+            return
+        
+        try:
+            sp_id_int = int(sp_id)
+        except ValueError:
+            messagebox.showerror("Ошибка", "ID должен быть числом!")
+            return
+        
+        # Проверяем, существует ли уже такой ID
+        if sp_id_int in SERVICE_PROVIDERS:
+            result = messagebox.askyesno("Подтверждение", 
+                                       f"СП с ID {sp_id_int} уже существует:\n{SERVICE_PROVIDERS[sp_id_int]}\nЗаменить?")
+            if not result:
+                return
+        
+        try:
+            # Обновляем глобальные переменные
+            SERVICE_PROVIDERS[sp_id_int] = sp_name
+            SP_SEARCH_INDEX.add(sp_id_int, sp_name)
+            self.sp_vars[sp_id_int] = tk.BooleanVar(value=True)
+            
+            # Файл перезаписывается целиком, поэтому замененный ID не остается в нем дважды
+            save_service_providers(SERVICE_PROVIDERS)
+            
+            # Обновляем интерфейс
+            self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
+            
+            # Очищаем поля ввода
+            self.new_sp_id_var.set("")
+            self.new_sp_name_var.set("")
+            
+            self.log(f"✅ Добавлен СП: {sp_name} (ID {sp_id_int})")
+            
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось добавить СП: {str(e)}")
+    
+    def delete_selected_providers(self):
+        """Удалить выбранные Service Providers"""
+        selected_sps = self.get_selected_sps()
+        if not selected_sps:
+            messagebox.showwarning("Внимание", "Не выбран ни один Service Provider для удаления!")
+            return
+        
+        sp_list = "\n".join([f"ID {sp_id}: {sp_name}" for sp_id, sp_name in selected_sps.items()])
+        result = messagebox.askyesno("Подтверждение удаления", 
+                                   f"Вы уверены, что хотите удалить следующие СП?\n\n{sp_list}")
+        
+        if not result:
+            return
+        
+        try:
+            # Обновляем глобальные переменные
+            for sp_id in selected_sps.keys():
+                if sp_id in SERVICE_PROVIDERS:
+                    del SERVICE_PROVIDERS[sp_id]
+                SP_SEARCH_INDEX.remove(sp_id)
+                if sp_id in self.sp_vars:
+                    del self.sp_vars[sp_id]
+            
+            save_service_providers(SERVICE_PROVIDERS)
+            
+            # Обновляем интерфейс
+            self.sp_frame.update_service_providers(SERVICE_PROVIDERS, self.sp_vars)
+            
+            self.log(f"✅ Удалено СП: {len(selected_sps)} шт.")
+            
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось удалить СП: {str(e)}")
+    
+    def reload_service_providers(self):
+        """Перезагрузить список СП из файла"""
+        try:
+            FILE_WRITER.flush()
+            file_path = get_data_path("service_providers.txt")
+            diff = self.apply_service_providers(read_service_providers(file_path))
+            self.file_watcher.remember(file_path)
+            
+            self.log(f"✅ Список СП обновлен из файла: +{len(diff['added'])} / "
+                     f"-{len(diff['removed'])} / переименовано {len(diff['renamed'])}")
+                
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось обновить список СП: {str(e)}")
+    
+    def open_service_providers_file(self):
+        """Открыть файл service_providers.txt для редактирования"""
+        try:
+            file_path = get_data_path("service_providers.txt")
+            FILE_WRITER.flush()
+            
+            if platform.system() == "Windows":
+                os.startfile(file_path)
+            elif platform.system() == "Darwin":
+                subprocess.Popen(["open", file_path])
+            else:
+                subprocess.Popen(["xdg-open", file_path])
+                
+            self.log("📝 Открыт файл service_providers.txt для редактирования")
+            
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть файл: {str(e)}")
+    
+    def open_last_reports_folder(self):
+        if self.last_reports_folder and os.path.exists(self.last_reports_folder):
+            if open_folder(self.last_reports_folder):
+                self.log(f"📁 Открыта папка с отчетами: {self.last_reports_folder}")
+            else:
+                self.log(f"❌ Не удалось открыть папку: {self.last_reports_folder}")
+        else:
+            # Ищем в папке REPORTS
+            reports_main_folder = REPORTS_ROOT
+            if os.path.exists(reports_main_folder):
+                reports_folders = [f for f in os.listdir(reports_main_folder) if f.startswith('reports_') and os.path.isdir(os.path.join(reports_main_folder, f))]
+                if reports_folders:
+                    latest_folder = max(reports_folders, key=lambda x: os.path.getctime(os.path.join(reports_main_folder, x)))
+                    latest_folder_path = os.path.join(reports_main_folder, latest_folder)
+                    if open_folder(latest_folder_path):
+                        self.log(f"📁 Открыта последняя папка с отчетами: {latest_folder_path}")
+                    else:
+                        self.log(f"❌ Не удалось открыть папку: {latest_folder_path}")
+                else:
+                    messagebox.showwarning("Внимание", "В папке REPORTS не найдены отчеты!")
+            else:
+                messagebox.showwarning("Внимание", "Папка с отчетами не найдена!")
+    
+    def log(self, message):
+        """Можно вызывать из любого потока: сообщение уходит в файл лога и в очередь интерфейса"""
+        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        logger.log(log_level_for(message), message)
+        self.ui_bus.log(f"[{timestamp}] {message}\n")
+    
+    def drain_ui_events(self):
+        """Забрать накопленные события пачкой: одна вставка в лог и одна прокрутка на тик"""
+        try:
+            self.process_ui_events(self.ui_bus.drain())
+        except Exception as e:
+            print(f"Ошибка обновления интерфейса: {e}")
+        finally:
+            self.root.after(UI_DRAIN_INTERVAL_MS, self.drain_ui_events)
+    
+    def process_ui_events(self, events: list):
+        lines = []
+        progress = None
+        status = None
+        
+        for kind, value in events:
+            if kind == 'log':
+                lines.append(value)
+            elif kind == 'progress':
+                progress = value
+            elif kind == 'status':
+                status = value
+            elif kind == 'call':
+                # Вызовы выполняются по порядку, поэтому сначала выводим накопленный лог
+                self.flush_log_lines(lines)
+                lines = []
+                value()
+        
+        self.flush_log_lines(lines)
+        if progress is not None:
+            self.progress['value'] = progress
+        if status is not None:
+            self.status_var.set(status)
+    
+    def flush_log_lines(self, lines: list):
+        if not lines:
+            return
+        
+        text = "".join(lines)
+        if self.session_log:
+            try:
+                self.session_log.write(text)
+                self.session_log.flush()
+            except Exception as e:
+                print(f"Ошибка записи истории лога: {e}")
+        
+        if self.log_text is None:
+            print(text, end='')
+            return
+        
+        # Если за тик пришло больше строк, чем помещается в окне, вставляем только хвост
+        if len(lines) > LOG_VIEW_MAX_LINES:
+            text = "".join(lines[-LOG_VIEW_MAX_LINES:])
+        self.log_text.insert(tk.END, text)
+        
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_VIEW_MAX_LINES:
+            self.log_text.delete('1.0', f'{line_count - LOG_VIEW_MAX_LINES + 1}.0')
+        self.log_text.see(tk.END)
+    
+    def open_session_log(self):
+        """Файл полной истории лога за сеанс. Возвращает (путь, файл) или (None, None)."""
+        try:
+            logs_folder = get_data_path("logs")
+            os.makedirs(logs_folder, exist_ok=True)
+            path = os.path.join(logs_folder, f"session_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+            session_log = open(path, 'a', encoding='utf-8')
+            prune_session_logs(logs_folder)
+            return path, session_log
+        except Exception as e:
+            print(f"Не удалось открыть файл истории лога: {str(e)}")
+            return None, None
+    
+    def clear_logs(self):
+        # Очищается только окно, история сеанса на диске сохраняется
+        if hasattr(self, 'log_text') and self.log_text:
+            self.log_text.delete(1.0, tk.END)
+        self.log("🧹 Логи очищены")
+    
+    def save_logs(self):
+        try:
+            # Сохраняем логи в папку logs рядом с программой
+            logs_folder = get_data_path("logs")
+            os.makedirs(logs_folder, exist_ok=True)
+            filename = os.path.join(logs_folder, f"logs_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+            # Сначала выводим то, что еще в очереди, чтобы копия была полной
+            self.process_ui_events(self.ui_bus.drain(sys.maxsize))
+            if self.session_log:
+                shutil.copyfile(self.session_log_path, filename)
+            else:
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(self.log_text.get(1.0, tk.END))
+            self.log(f"💾 Логи сохранены в файл: {filename}")
+        except Exception as e:
+            self.log(f"❌ Ошибка сохранения логов: {str(e)}")
+    
+    def get_selected_sps(self):
+        return {sp_id: SERVICE_PROVIDERS[sp_id] for sp_id, var in self.sp_vars.items() if var.get()}
+    
+    def get_time_params(self):
+        return {
+            'speed': {
+                'from_date': self.time_frame.speed_from_var.get(),
+                'to_date': self.time_frame.speed_to_var.get()
+            },
+            'conversion': {
+                'from_date': self.time_frame.conversion_from_var.get(),
+                'to_date': self.time_frame.conversion_to_var.get()
+            },
+            'arbitrage': {
+                'from_date': self.time_frame.arbitrage_from_var.get(),
+                'to_date': self.time_frame.arbitrage_to_var.get()
+            }
+        }
+    
+    def start_processing(self):
+        if self.processing_thread and self.processing_thread.is_alive():
+            messagebox.showwarning("Внимание", "Обработка уже запущена!")
+            return
+            
+        selected_sps = self.get_selected_sps()
+        if not selected_sps:
+            messagebox.showwarning("Внимание", "Не выбран ни один Service Provider!")
+            return
+        
+        time_params = self.get_time_params()
+        
+        try:
+            validate_time_params(time_params)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Неверный формат времени!\nИспользуйте: ГГГГ-ММ-ДД ЧЧ:ММ:СС\n\nОшибка: {str(e)}")
+            return
+        
+        result = messagebox.askyesno("Подтверждение", f"Будет обработано {len(selected_sps)} Service Providers.\n\nПродолжить?")
+        if not result:
+            return
+        
+        self.launch_processing(selected_sps, time_params)
+    
+    def resume_last_run(self):
+        """Продолжить последний прерванный запуск в той же папке отчетов"""
+        if self.processing_thread and self.processing_thread.is_alive():
+            messagebox.showwarning("Внимание", "Обработка уже запущена!")
+            return
+        
+        folder = find_resumable_run()
+        if not folder:
+            messagebox.showinfo("Продолжение", "Прерванных запусков не найдено")
+            return
+        
+        try:
+            checkpoint = RunCheckpoint.load(folder)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать манифест запуска:\n{str(e)}")
+            return
+        
+        remaining = len(checkpoint.remaining())
+        total = len(checkpoint.selected_sps)
+        done = total - remaining - len(checkpoint.exhausted())
+        result = messagebox.askyesno(
+            "Продолжение",
+            f"Запуск {os.path.basename(folder)}: готово {done} из {total} СП.\n\n"
+            f"Обработать оставшиеся {remaining} СП с теми же периодами?"
+        )
+        if not result:
+            checkpoint.close()
+            return
+        
+        self.launch_processing(checkpoint.selected_sps, checkpoint.time_params, checkpoint)
+    
+    def launch_processing(self, selected_sps: dict, time_params: dict, checkpoint=None):
+        self.stop_processing = False
+        self.start_button.config(state="disabled")
+        self.resume_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+        self.open_folder_button.config(state="disabled")
+        
+        options = self.read_run_options()
+        self.processing_thread = threading.Thread(target=self.process_sps,
+                                                  args=(selected_sps, time_params, options, checkpoint))
+        self.processing_thread.daemon = True
+        self.processing_thread.start()
+    
+    def read_run_options(self) -> dict:
+        """Настройки запуска из переменных Tk - читаются в потоке интерфейса до старта обработки"""
+        batch_size = None
+        if self.batch_mode_var.get():
+            batch_size = self.get_spin_value(self.batch_size_var, BATCH_CHUNK_SIZE, 2, 200)
+        return {
+            "auto_no_incidents": self.auto_no_incidents_var.get(),
+            "batch_size": batch_size,
+            "tab_count": self.get_spin_value(self.tab_count_var, 1, 1, MAX_TAB_COUNT),
+            "refresh_cache": self.refresh_cache_var.get(),
+            "trace": self.trace_var.get(),
+            "lean_fetch": self.lean_fetch_var.get(),
+        }
+    
+    def stop_processing_command(self):
+        self.stop_processing = True
+        self.log("🛑 Запрошена остановка обработки...")
+        self.update_status("Останавливается...")
+    
+    def get_spin_value(self, var, default: int, minimum: int, maximum: int) -> int:
+        try:
+            value = int(var.get())
+        except (tk.TclError, ValueError):
+            value = default
+        return max(minimum, min(maximum, value))
+    
+    def update_progress(self, value):
+        self.ui_bus.progress(value)
+    
+    def update_status(self, status):
+        self.ui_bus.status(status)
+    
+    def process_sps(self, selected_sps, time_params, options: dict, checkpoint=None):
+        try:
+            self.log("=" * 60)
+            self.log("🚀 Начинаем обработку выбранных СП")
+            self.log(f"📋 Выбрано СП: {len(selected_sps)}")
+            
+            if not self.driver:
+                self.update_status("Запуск Chrome...")
+                self.driver, self.chrome_process = self.start_chrome_automatically()
+                
+                if not self.driver:
+                    self.log("❌ Не удалось запустить Chrome")
+                    return
+                
+                self.log("✅ Chrome успешно запущен")
+            else:
+                self.log("✅ Используем существующий браузер")
+            
+            if checkpoint:
+                # Продолжение: та же папка, те же периоды и настройки пункта 6
+                reports_folder = checkpoint.output_dir
+                auto_no_incidents = checkpoint.auto_no_incidents
+            else:
+                # Подпапка REPORTS для текущего запуска, отчеты пишутся по абсолютным путям
+                reports_folder = make_reports_folder()
+                auto_no_incidents = options["auto_no_incidents"]
+                checkpoint = RunCheckpoint.create(reports_folder, selected_sps, time_params, auto_no_incidents,
+                                                  os.path.basename(reports_folder))
+            self.last_reports_folder = reports_folder
+            self.log(f"📁 Отчеты будут сохранены в папку: {reports_folder}")
+            
+            total_count = len(selected_sps)
+            
+            batch_size = options["batch_size"]
+            if batch_size:
+                self.log(f"📦 Пакетный режим: по {batch_size} СП на страницу скорости и конверсии")
+            
+            tab_count = options["tab_count"]
+            drivers = [self.driver]
+            for _ in range(tab_count - 1):
+                tab_driver = open_tab_driver()
+                if not tab_driver:
+                    self.log("⚠️ Не удалось открыть дополнительную вкладку, продолжаем с меньшим числом")
+                    break
+                drivers.append(tab_driver)
+            
+            runner = SPJobRunner(
+                drivers,
+                selected_sps,
+                time_params,
+                self.log,
+                auto_no_incidents,
+                batch_size=batch_size,
+                stop_check=lambda: self.stop_processing,
+                progress_func=lambda done, total: self.update_progress((done / total) * 100),
+                status_func=self.update_status,
+                report_writer=ReportWriter(reports_folder, self.log, run_id=checkpoint.run_id,
+                                           history_path=HISTORY_DB_PATH, time_params=time_params),
+                refresh_cache=options["refresh_cache"],
+                checkpoint=checkpoint,
+                trace=options["trace"],
+                lean_fetch=options["lean_fetch"]
+            )
+            
+            try:
+                processed_count = runner.run()
+            finally:
+                runner.report_writer.close()
+                checkpoint.close()
+                for tab_driver in drivers[1:]:
+                    close_tab_driver(tab_driver)
+            
+            if self.stop_processing:
+                self.log("🛑 Обработка остановлена пользователем")
+            
+            self.update_progress(100)
+            
+            if self.stop_processing:
+                self.update_status("Обработка остановлена")
+                self.log(f"🛑 Обработка остановлена. Обработано: {processed_count}/{total_count}")
+                self.log("⏯️ Оставшиеся СП можно обработать кнопкой \"Продолжить прерванный\"")
+            else:
+                self.update_status("Обработка завершена")
+                self.log(f"\n🎉 Готово! Обработано СП: {processed_count}/{total_count}")
+                self.log(f"📁 Отчеты сохранены в папке: {reports_folder}")
+                self.log(f"🧾 Данные всех СП: {runner.report_writer.results_path}")
+            
+        except Exception as e:
+            error_message = str(e)
+            self.log(f"❌ Критическая ошибка: {error_message}")
+            self.ui_bus.call(lambda msg=error_message: messagebox.showerror("Ошибка", f"Произошла критическая ошибка:\n{msg}"))
+            if checkpoint:
+                checkpoint.close()
+        finally:
+            self.ui_bus.call(self.reset_ui_after_processing)
+    
+    def start_chrome_automatically(self):
+        try:
+            self.log("🔍 Проверяем запущенный Chrome...")
+            driver = get_or_connect_chrome()
+            if driver:
+                self.log("✅ Подключились к существующему Chrome")
+                return driver, None
+
+            self.log("🔄 Запускаем новый Chrome...")
+            
+            chrome_cmd = [
+                "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+                f"--remote-debugging-port={DEBUGGING_PORT}",
+                f"--user-data-dir=C:\\temp\\chrome_debug",
+                "--no-first-run",
+                "--no-default-browser-check",
+                "--disable-extensions",
+                "--disable-plugins",
+                "--disable-translate"
+            ]
+            
+            self.log("🚀 Запускаем процесс Chrome...")
+            process = subprocess.Popen(chrome_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            
+            self.log("⏳ Ожидаем запуск Chrome (макс 15 сек)...")
+            start_time = time.time()
+            
+            for i in range(30):
+                if self.stop_processing:
+                    self.log("🛑 Запуск Chrome прерван")
+                    try:
+                        process.terminate()
+                        process.wait(timeout=2)
+                    except:
+                        pass
+                    return None, None
+                
+                time.sleep(0.5)
+                
+                driver = get_or_connect_chrome()
+                if driver:
+                    elapsed = time.time() - start_time
+                    self.log(f"✅ Chrome запущен за {elapsed:.1f} сек")
+                    return driver, process
+                
+                if i % 4 == 0:
+                    self.log(f"⏳ Ожидание... ({i//2}/15 сек)")
+
+            self.log("❌ Chrome не запустился за 15 секунд")
+            try:
+                process.terminate()
+                process.wait(timeout=2)
+            except:
+                pass
+            return None, None
+            
+        except Exception as e:
+            self.log(f"❌ Ошибка при запуске Chrome: {str(e)}")
+            return None, None
+    
+    def reset_ui_after_processing(self):
+        self.start_button.config(state="normal")
+        self.resume_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.open_folder_button.config(state="normal")
+        self.stop_processing = False
+        self.update_status("Готов к работе")
+        self.update_progress(0)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Разбор пакетных страниц скорости и конверсии.
+
+Запуск из корня репозитория:
+
+    python -m pytest tests
+"""
+
+import unittest
+
+from benchmarks import fixtures
+from benchmarks.common import load_app_module
+
+# Страница скорости как в servicedesk: заголовок в thead, итог СП с текстом в <b>
+# и пробелами вокруг, имя СП в таблице - только первая часть названия из списка
+SPEED_PAGE = """
+<table class="table table-striped">
+  <thead><tr><th>Service provider</th><th>Trader</th><th>Type</th><th>Deals</th>
+  <th>Mean time</th><th>Arbitrages</th><th>Updated</th></tr></thead>
+  <tbody>
+    <tr class="table-info"><td> <b>Total (Payout_RUB_2.0)</b> </td><td></td><td></td>
+      <td>21</td><td>8.77</td><td>1</td><td></td></tr>
+    <tr><td></td><td>Total (Payout_PP_trader_22)</td><td></td><td>21</td><td>10.17</td><td>0</td><td></td></tr>
+    <tr><td>Payout_RUB_2.0</td><td>Payout_PP_trader_22</td><td>Buy</td><td>21</td><td>10.17</td><td>0</td><td></td></tr>
+    <tr class="table-info"><td><b>Total (blvck)</b></td><td></td><td></td>
+      <td>5</td><td>3.10</td><td>0</td><td></td></tr>
+    <tr><td></td><td>Total (blvck_1)</td><td></td><td>5</td><td>3.10</td><td>0</td><td></td></tr>
+    <tr><td>blvck</td><td>blvck_1</td><td>Sell</td><td>5</td><td>3.10</td><td>0</td><td></td></tr>
+  </tbody>
+</table>
+"""
+
+class SpeedBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def test_realistic_total_rows(self):
+        sps = {1: "Payout_RUB_2.0|PayPort", 2: "blvck|UZS|PayPort"}
+        results = self.pp.parse_speed_data_batch(SPEED_PAGE, sps)
+
+        self.assertEqual(set(results), {1, 2})
+        self.assertEqual(results[1]['total_deals'], "21")
+        self.assertEqual(results[1]['total_mean_time'], "8.77")
+        self.assertEqual(results[1]['arbitrage_count'], "1")
+        self.assertEqual(results[1]['traders'], [
+            {'name': 'Payout_PP_trader_22', 'sell_time': "0", 'buy_time': "10.17", 'total_deals': "21"},
+        ])
+        self.assertEqual([trader['name'] for trader in results[2]['traders']], ['blvck_1'])
+
+    def test_sp_without_section_is_left_for_single_fetch(self):
+        sps = {1: "Payout_RUB_2.0", 3: "rich_brothers|KGS"}
+        results = self.pp.parse_speed_data_batch(SPEED_PAGE, sps)
+
+        self.assertIn(1, results)
+        self.assertNotIn(3, results)
+
+    def test_ambiguous_sps_are_left_for_single_fetch(self):
+        sps = {2: "blvck|UZS", 4: "blvck|KGS"}
+        results = self.pp.parse_speed_data_batch(SPEED_PAGE, sps)
+
+        self.assertEqual(results, {})
+
+    def test_page_without_table(self):
+        self.assertEqual(self.pp.parse_speed_data_batch("<html><body>Ошибка</body></html>", {1: "Payout_RUB_2.0"}), {})
+
+    def test_fixture_page_matches_single_parser(self):
+        sps = fixtures.make_sp_names(10)
+        rows = self.pp.extract_table_rows(fixtures.render_table(fixtures.SPEED_HEADER, fixtures.speed_rows(sps)))
+        results = self.pp.parse_speed_rows_batch(rows, sps)
+
+        self.assertEqual(set(results), set(sps))
+        for sp_id, sp_name in sps.items():
+            single = self.pp.parse_speed_rows(rows, sp_name, self.pp.find_sp_in_table(rows, sp_name))
+            self.assertEqual(results[sp_id]['total_deals'], single['total_deals'])
+
+class ConversionBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def test_totals_after_trader_rows(self):
+        page = fixtures.render_table(
+            fixtures.CONVERSION_HEADER,
+            [
+                fixtures.render_row(["blvck", "blvck_1", "Sell", 10, 9, 1, 10, 0, 0, "90.00%"]),
+                fixtures.render_row(["Total (blvck)", "", "", 10, 9, 1, 10, 0, 0, "90.00%"]),
+                fixtures.render_row(["Payout_RUB_2.0", "trader_0", "Buy", 4, 1, 3, 4, 0, 0, "25.00%"]),
+                fixtures.render_row(["Total (Payout_RUB_2.0)", "", "", 4, 1, 3, 4, 0, 0, "25.00%"]),
+            ],
+        )
+        sps = {2: "blvck|UZS", 1: "Payout_RUB_2.0", 3: "rich_brothers|KGS"}
+        results = self.pp.parse_conversion_data_batch(page, sps)
+
+        self.assertEqual(set(results), {1, 2})
+        self.assertEqual(results[2]['conversion_percent'], "90.00%")
+        self.assertEqual(results[1]['paid_count'], "1")
+        self.assertEqual(results[1]['cancelled_count'], "3")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Кэш страниц (PageCache) и продолжение прерванного запуска (RunCheckpoint).
+
+Запуск из корня репозитория:
+
+    python -m pytest tests
+"""
+
+import datetime
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks import fixtures
+from benchmarks.common import load_app_module
+
+def make_temp_dir(test: unittest.TestCase) -> str:
+    path = tempfile.mkdtemp(prefix="pp_test_")
+    test.addCleanup(shutil.rmtree, path, True)
+    return path
+
+def page(html: str = None, state: str = "data", has_next=False) -> dict:
+    return {'state': state, 'html': html or fixtures.render_table(fixtures.ADS_HEADER, fixtures.ads_rows(3)),
+            'has_next': has_next}
+
+class PageCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def make_cache(self, **kwargs):
+        cache = self.pp.PageCache(os.path.join(make_temp_dir(self), "pages.db"), **kwargs)
+        self.addCleanup(lambda: cache.connection and cache.connection.close())
+        return cache
+
+    def test_round_trip_with_reordered_params(self):
+        cache = self.make_cache(ttls={'ads': 60})
+        stored = page(has_next=True)
+        cache.put("http://SD/trader/ads?b=2&a=1", 'ads', stored)
+
+        cached = cache.get("http://sd/trader/ads?a=1&b=2", 'ads')
+        self.assertEqual(cached['html'], stored['html'])
+        self.assertIs(cached['has_next'], True)
+        self.assertLess(cached['age'], 60)
+
+    def test_expired_page_is_deleted(self):
+        cache = self.make_cache(ttls={'ads': 60})
+        cache.put("http://sd/ads?a=1", 'ads', page())
+        self.assertGreater(cache.total_bytes, 0)
+
+        with mock.patch.object(self.pp.time, "time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("http://sd/ads?a=1", 'ads'))
+        self.assertEqual(cache.total_bytes, 0)
+        self.assertIsNone(cache.get("http://sd/ads?a=1", 'ads'))
+
+    def test_ttl_is_per_page_type(self):
+        cache = self.make_cache(ttls={'ads': 60, 'speed': 1})
+        cache.put("http://sd/ads", 'ads', page())
+        cache.put("http://sd/speed", 'speed', page())
+
+        with mock.patch.object(self.pp.time, "time", return_value=time.time() + 5):
+            self.assertIsNotNone(cache.get("http://sd/ads", 'ads'))
+            self.assertIsNone(cache.get("http://sd/speed", 'speed'))
+
+    def test_uncached_types_and_timeouts_are_not_stored(self):
+        cache = self.make_cache(ttls={'ads': 60})
+        cache.put("http://sd/bank", 'bank', page())
+        cache.put("http://sd/ads", 'ads', page(state=self.pp.TABLE_STATE_TIMEOUT))
+
+        self.assertEqual(cache.total_bytes, 0)
+        self.assertIsNone(cache.get("http://sd/bank", 'bank'))
+        self.assertIsNone(cache.get("http://sd/ads", 'ads'))
+
+    def test_least_recently_read_pages_are_evicted(self):
+        cache = self.make_cache(ttls={'ads': 60}, max_bytes=2500)
+        for i in range(20):
+            cache.put(f"http://sd/ads?p={i}", 'ads', page(os.urandom(200).hex()))
+
+        self.assertLessEqual(cache.total_bytes, 2500)
+        self.assertIsNone(cache.get("http://sd/ads?p=0", 'ads'))
+        self.assertIsNotNone(cache.get("http://sd/ads?p=19", 'ads'))
+
+    def test_open_window_is_not_cached(self):
+        time_params = {'speed': {'from_date': "2025-11-01 00:00:00", 'to_date': ""},
+                       'arbitrage': {'from_date': "2025-11-01 00:00:00", 'to_date': "2025-11-02 00:00:00"}}
+        self.assertIsNone(self.pp.window_cache_type(time_params, 'speed'))
+        self.assertEqual(self.pp.window_cache_type(time_params, 'arbitrage'), 'arbitrage')
+
+class FakeFetchers:
+    """Подмена PAGE_FETCHERS: считает загрузки и отдает пустые данные страниц"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetcher(self, page_type: str):
+        def fetch(driver, sp_id, sp_name, time_params, log_func):
+            self.calls.append((sp_id, page_type))
+            if page_type == 'speed':
+                return self.pp.empty_speed_data()
+            if page_type == 'conversion':
+                return self.pp.empty_conversion_data()
+            if page_type == 'ads':
+                return {'sell_methods': ["Humo"], 'buy_methods': [], 'sell_count': 1, 'buy_count': 0,
+                        'ads_count': 1, 'is_active': True}
+            if page_type == 'arbitrage':
+                return {'arbitrage_count': 0, 'arbitrage_deals': []}
+            return {'trader_dates': {'trader_1': datetime.date(2025, 11, 1)},
+                    'latest_overall': datetime.date(2025, 11, 1), 'cutoff_date': None}
+        return fetch
+
+    def patch(self, pp):
+        self.pp = pp
+        return mock.patch.dict(pp.PAGE_FETCHERS, {page_type: self.fetcher(page_type) for page_type in pp.PAGE_FETCHERS})
+
+class Driver:
+    pass
+
+class RunCheckpointTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def setUp(self):
+        self.folder = make_temp_dir(self)
+        self.sps = fixtures.make_sp_names(4)
+        self.time_params = self.pp.default_time_params()
+
+    def run_jobs(self, checkpoint, fetchers, stop_after: int = None):
+        writer = self.pp.ReportWriter(self.folder, lambda message: None, run_id=checkpoint.run_id)
+        runner = self.pp.SPJobRunner(
+            [Driver()], checkpoint.selected_sps, checkpoint.time_params, lambda message: None,
+            checkpoint.auto_no_incidents, report_writer=writer, checkpoint=checkpoint,
+            stop_check=(lambda: len(fetchers.calls) >= stop_after) if stop_after else None,
+        )
+        try:
+            with fetchers.patch(self.pp):
+                return runner.run()
+        finally:
+            writer.close()
+            checkpoint.close()
+
+    def test_resume_fetches_only_missing_pages(self):
+        first = FakeFetchers()
+        checkpoint = self.pp.RunCheckpoint.create(self.folder, self.sps, self.time_params, True, "run_1")
+        finished = self.run_jobs(checkpoint, first, stop_after=7)
+        self.assertEqual(finished, 1)
+
+        loaded = self.pp.RunCheckpoint.load(self.folder)
+        self.assertEqual(loaded.run_id, "run_1")
+        self.assertEqual(loaded.selected_sps, self.sps)
+        self.assertEqual(len(loaded.remaining()), 3)
+        # Даты выписок восстанавливаются как date, а не строки из JSON
+        bank_pages = [pages['bank'] for pages in loaded.pages.values() if 'bank' in pages]
+        self.assertIsInstance(bank_pages[0]['latest_overall'], datetime.date)
+
+        second = FakeFetchers()
+        self.assertEqual(self.run_jobs(loaded, second), len(self.sps))
+        self.assertEqual(len(second.calls), len(self.sps) * len(self.pp.PAGE_FETCHERS) - len(first.calls))
+        self.assertFalse(set(first.calls) & set(second.calls))
+
+        reports = [name for name in os.listdir(self.folder) if name.endswith(".txt")]
+        self.assertEqual(len(reports), len(self.sps))
+        with open(os.path.join(self.folder, "results.jsonl"), encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), len(self.sps))
+        self.assertEqual(self.pp.RunCheckpoint.load(self.folder).remaining(), [])
+
+    def test_truncated_last_line_is_skipped(self):
+        checkpoint = self.pp.RunCheckpoint.create(self.folder, self.sps, self.time_params, False)
+        sp_id = next(iter(self.sps))
+        checkpoint.record_page(sp_id, 'ads', {'ads_count': 1})
+        checkpoint.close()
+        with open(checkpoint.path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "page", "sp_id": ')
+
+        loaded = self.pp.RunCheckpoint.load(self.folder)
+        loaded.close()
+        self.assertEqual(loaded.pages, {sp_id: {'ads': {'ads_count': 1}}})
+        self.assertFalse(loaded.auto_no_incidents)
+
+    def test_failed_sp_is_not_retried_forever(self):
+        checkpoint = self.pp.RunCheckpoint.create(self.folder, self.sps, self.time_params, True)
+        sp_id = next(iter(self.sps))
+        for _ in range(self.pp.RESUME_MAX_ATTEMPTS):
+            checkpoint.record_failure(sp_id, "Chrome упал")
+        checkpoint.close()
+
+        loaded = self.pp.RunCheckpoint.load(self.folder)
+        loaded.close()
+        self.assertEqual(loaded.exhausted(), [sp_id])
+        self.assertNotIn(sp_id, loaded.remaining())
+
+    def test_missing_header_is_an_error(self):
+        with open(os.path.join(self.folder, self.pp.RunCheckpoint.FILENAME), 'w', encoding='utf-8') as f:
+            f.write('{"type": "page", "sp_id": 1, "page_type": "ads", "data": {}}\n')
+
+        with self.assertRaises(ValueError):
+            self.pp.RunCheckpoint.load(self.folder)
+
+if __name__ == "__main__":
+    unittest.main()
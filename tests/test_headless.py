@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Консольный режим не должен требовать tkinter.
+
+Запуск из корня репозитория:
+
+    python -m pytest tests
+"""
+
+import importlib.util
+import io
+import sys
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+
+from benchmarks.common import APP_PATH, load_app_module
+
+# None в sys.modules - import бросает ImportError, как на сервере без python3-tk
+BLOCKED_TKINTER = {name: None for name in (
+    "tkinter", "tkinter.ttk", "tkinter.messagebox", "tkinter.scrolledtext", "tkinter.simpledialog", "_tkinter",
+)}
+
+def load_without_tkinter():
+    spec = importlib.util.spec_from_file_location("pp_parser_headless", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+class HeadlessImportTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(sys.modules, BLOCKED_TKINTER)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # pp_gui, импортированный другим тестом, не должен подхватиться из кэша
+        sys.modules.pop("pp_gui", None)
+        self.pp = load_without_tkinter()
+    
+    def test_module_imports_without_tkinter(self):
+        self.assertFalse(hasattr(self.pp, "PayportApp"))
+        
+        args = self.pp.parse_cli_args(["--sp", "80,81", "--tabs", "2"])
+        self.assertEqual(args.tabs, 2)
+    
+    def test_gui_needs_tkinter(self):
+        with redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit) as exit_info:
+            self.pp.main([])
+        self.assertEqual(exit_info.exception.code, 1)
+        self.assertIn("tkinter", stderr.getvalue())
+
+class GuiModuleTest(unittest.TestCase):
+    def test_gui_module_uses_app_module(self):
+        try:
+            import tkinter  # noqa: F401
+        except ImportError:
+            self.skipTest("tkinter не установлен")
+        
+        pp = load_app_module()
+        import pp_gui
+        self.assertIs(pp_gui.SERVICE_PROVIDERS, pp.SERVICE_PROVIDERS)
+        self.assertTrue(issubclass(pp_gui.ModernSPFrame, pp_gui.ttk.Frame))
+
+if __name__ == "__main__":
+    unittest.main()
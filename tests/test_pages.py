@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Постраничное чтение таблиц (iter_table_rows): когда загружается следующая страница.
+
+Запуск из корня репозитория:
+
+    python -m pytest tests
+"""
+
+import unittest
+from unittest import mock
+
+from benchmarks import fixtures
+from benchmarks.common import load_app_module
+
+class FakeDriver:
+    """Отдает заранее заданные страницы по номеру из адресов вида page://N"""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.visited = []
+        self.url = None
+
+    def get(self, url):
+        self.url = url
+        self.visited.append(int(url.split("//")[1]))
+
+    def current_page(self, driver, log_func=None):
+        return driver.pages.get(int(driver.url.split("//")[1]))
+
+def table_page(first_id: int, count: int, has_next=None) -> dict:
+    rows = fixtures.ads_rows(count)
+    # Номера строк сквозные, чтобы соседние страницы не совпадали
+    rows = [row.replace(f"<td>{i}</td>", f"<td>{first_id + i}</td>", 1) for i, row in enumerate(rows)]
+    return {'state': 'data', 'html': fixtures.render_table(fixtures.ADS_HEADER, rows), 'has_next': has_next}
+
+class IterTableRowsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def read(self, pages: dict, limit: int = None, **kwargs):
+        driver = FakeDriver(pages)
+        log = []
+        with mock.patch.object(self.pp, "get_current_page", driver.current_page):
+            rows = self.pp.iter_table_rows(driver, lambda page: f"page://{page}", log.append, **kwargs)
+            if limit is None:
+                rows = list(rows)
+            else:
+                rows = [row for _, row in zip(range(limit), rows)]
+        return rows, driver.visited, log
+
+    def data_rows(self, rows):
+        return [row for row in rows if not row['header']]
+
+    def test_pagination_says_last_page(self):
+        rows, visited, _ = self.read({1: table_page(0, 10, True), 2: table_page(10, 10, False), 3: table_page(20, 10)},
+                                     lines_per_page=10)
+        self.assertEqual(visited, [1, 2])
+        self.assertEqual(len(self.data_rows(rows)), 20)
+
+    def test_header_only_from_first_page(self):
+        rows, _, _ = self.read({1: table_page(0, 5, True), 2: table_page(5, 5, False)}, lines_per_page=5)
+        self.assertEqual([i for i, row in enumerate(rows) if row['header']], [0])
+
+    def test_short_page_without_pagination(self):
+        rows, visited, _ = self.read({1: table_page(0, 10), 2: table_page(10, 4), 3: table_page(14, 10)},
+                                     lines_per_page=10)
+        self.assertEqual(visited, [1, 2])
+        self.assertEqual(len(self.data_rows(rows)), 14)
+
+    def test_server_page_smaller_than_requested(self):
+        # Просили 100 строк, сервер отдает по 10 - полной считается страница размером с первую
+        rows, visited, _ = self.read({1: table_page(0, 10), 2: table_page(10, 10), 3: table_page(20, 3)},
+                                     lines_per_page=100)
+        self.assertEqual(visited, [1, 2, 3])
+        self.assertEqual(len(self.data_rows(rows)), 23)
+
+    def test_empty_page_ends_reading(self):
+        empty = {'state': 'empty', 'html': fixtures.render_table(fixtures.ADS_HEADER, []), 'has_next': None}
+        rows, visited, _ = self.read({1: table_page(0, 10), 2: empty}, lines_per_page=10)
+        self.assertEqual(visited, [1, 2])
+        self.assertEqual(len(self.data_rows(rows)), 10)
+
+    def test_repeated_last_page_is_dropped(self):
+        page = table_page(0, 10)
+        rows, visited, _ = self.read({1: page, 2: page}, lines_per_page=10)
+        self.assertEqual(visited, [1, 2])
+        self.assertEqual(len(self.data_rows(rows)), 10)
+
+    def test_page_limit(self):
+        pages = {page: table_page(page * 10, 10, True) for page in range(1, 6)}
+        rows, visited, log = self.read(pages, lines_per_page=10, max_pages=3)
+        self.assertEqual(visited, [1, 2, 3])
+        self.assertTrue(any("лимит" in line for line in log))
+
+    def test_next_page_loaded_only_when_needed(self):
+        pages = {page: table_page(page * 10, 10, True) for page in range(1, 4)}
+        rows, visited, _ = self.read(pages, limit=5, lines_per_page=10)
+        self.assertEqual(visited, [1])
+
+    def test_first_page_failure_raises(self):
+        with self.assertRaises(self.pp.PageLoadError):
+            self.read({})
+
+    def test_later_page_failure_keeps_rows(self):
+        rows, visited, log = self.read({1: table_page(0, 10, True)}, lines_per_page=10)
+        self.assertEqual(visited, [1, 2])
+        self.assertEqual(len(self.data_rows(rows)), 10)
+        self.assertTrue(any("неполными" in line for line in log))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Разбор таблиц: extract_table_rows и секции многосписочных страниц.
+
+Запуск из корня репозитория:
+
+    python -m pytest tests
+"""
+
+import random
+import unittest
+
+from benchmarks import fixtures
+from benchmarks.common import load_app_module
+
+# Ячейки, на которых текст lxml и BeautifulSoup легко расходится
+TRICKY_CELLS = [
+    "<td> <span>Humo</span>&nbsp;</td>",
+    "<td><!-- комментарий -->Sell</td>",
+    "<td>\n  12 345\n</td>",
+    '<td><a href="/deal/1">INV-1</a> <small>(копия)</small></td>',
+    "<td><b>Total (</b>Payout_RUB_2.0<b>)</b></td>",
+    "<td></td>",
+    "<td>&lt;script&gt;</td>",
+]
+
+def random_table(rng: random.Random, rows: int = 40) -> str:
+    body = []
+    for _ in range(rows):
+        cells = "".join(rng.choice(TRICKY_CELLS) for _ in range(8))
+        body.append(f'<tr class="{rng.choice(["", "deal-disputed", "table-info"])}">{cells}</tr>')
+    head = "<thead><tr>" + "".join(f"<th> {title} </th>" for title in fixtures.ADS_HEADER) + "</tr></thead>"
+    return f"<html><body><table>{head}<tbody>{''.join(body)}</tbody></table></body></html>"
+
+class ExtractTableRowsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def test_cells_match_beautifulsoup(self):
+        try:
+            from bs4 import BeautifulSoup
+        except ImportError:
+            self.skipTest("bs4 не установлен")
+
+        html = random_table(random.Random(7))
+        rows = self.pp.extract_table_rows(html)
+        soup_rows = BeautifulSoup(html, "lxml").find("table").find_all("tr")
+
+        self.assertEqual(len(rows), len(soup_rows))
+        for row, soup_row in zip(rows, soup_rows):
+            cells = soup_row.find_all(["td", "th"])
+            self.assertEqual(row['cells'], [cell.get_text(strip=True) for cell in cells])
+            self.assertEqual(row['classes'], soup_row.get("class", []))
+
+    def test_header_tds_and_links(self):
+        html = fixtures.render_table(fixtures.DEALS_HEADER, fixtures.arbitrage_rows(5, rng=random.Random(1)))
+        rows = self.pp.extract_table_rows(html)
+
+        self.assertTrue(rows[0]['header'])
+        self.assertEqual(rows[0]['tds'], [])
+        self.assertFalse(any(row['header'] for row in rows[1:]))
+        for row in rows[1:]:
+            self.assertEqual(row['tds'], row['cells'])
+            self.assertEqual(len(row['links']), len(row['tds']))
+            self.assertTrue(row['links'][1].startswith("INV-"))
+            self.assertIsNone(row['links'][0])
+
+    def test_mixed_th_and_td_row(self):
+        rows = self.pp.extract_table_rows("<table><tr><th>Total (blvck)</th><td>5</td><td>3.10</td></tr></table>")
+
+        self.assertEqual(rows[0]['cells'], ["Total (blvck)", "5", "3.10"])
+        self.assertEqual(rows[0]['tds'], ["5", "3.10"])
+        self.assertFalse(rows[0]['header'])
+
+    def test_no_table(self):
+        self.assertIsNone(self.pp.extract_table_rows("<html><body><p>Нет данных</p></body></html>"))
+        self.assertIsNone(self.pp.extract_table_rows(""))
+
+class SpSectionsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pp = load_app_module()
+
+    def rows(self, *cells_list):
+        return [{'cells': list(cells), 'tds': list(cells)} for cells in cells_list]
+
+    def test_leading_totals(self):
+        sps = fixtures.make_sp_names(4, random.Random(3))
+        rows = self.pp.extract_table_rows(fixtures.render_table(fixtures.SPEED_HEADER, fixtures.speed_rows(sps, 2)))
+        sections = self.pp.split_rows_by_sp_total(rows)
+
+        self.assertEqual([label for label, _ in sections], [name.split('|')[0] for name in sps.values()])
+        for label, section_rows in sections:
+            # Итог СП, затем по каждому трейдеру итог и строки Sell/Buy
+            self.assertEqual(len(section_rows), 1 + 2 * 3)
+            self.assertEqual(section_rows[0]['cells'][0], f"Total ({label})")
+
+    def test_trailing_totals(self):
+        rows = self.rows(
+            ["alpha", "t1", "Sell"], ["Total (alpha)", "", ""],
+            ["beta", "t2", "Buy"], ["beta", "t3", "Buy"], ["Total (beta)", "", ""],
+        )
+        sections = self.pp.split_rows_by_sp_total(rows)
+
+        self.assertEqual([(label, len(section_rows)) for label, section_rows in sections], [("alpha", 2), ("beta", 3)])
+        self.assertEqual(sections[1][1][-1]['cells'][0], "Total (beta)")
+
+    def test_header_rows_are_skipped(self):
+        rows = [{'cells': ["СП", "Трейдер"], 'tds': []}] + self.rows(["Total (alpha)", ""], ["alpha", "t1"])
+        self.assertEqual([label for label, _ in self.pp.split_rows_by_sp_total(rows)], ["alpha"])
+
+    def test_match_by_name_part(self):
+        sections = [("alpha", []), ("beta", [])]
+        matched, ambiguous = self.pp.match_sp_sections(sections, {1: "alpha|UZS|PayPort", 2: "gamma|KGS"})
+
+        self.assertEqual(set(matched), {1})
+        self.assertEqual(matched[1][0], "alpha")
+        self.assertEqual(ambiguous, set())
+
+    def test_full_name_wins_over_part(self):
+        sections = [("alpha|UZS", []), ("alpha", [])]
+        matched, ambiguous = self.pp.match_sp_sections(sections, {1: "alpha|UZS"})
+
+        self.assertEqual(matched[1][0], "alpha|UZS")
+
+    def test_shared_or_repeated_sections_are_ambiguous(self):
+        sections = [("alpha", []), ("beta", []), ("beta", [])]
+        matched, ambiguous = self.pp.match_sp_sections(sections, {1: "alpha|UZS", 2: "alpha|KGS", 3: "beta"})
+
+        self.assertEqual(matched, {})
+        self.assertEqual(ambiguous, {1, 2, 3})
+
+if __name__ == "__main__":
+    unittest.main()